@@ -1,6 +1,14 @@
 from flask import Flask
 from flask_cors import CORS
 from app.models import db
+from app.utils.json_provider import FastJSONProvider
+from app.utils.data_version import data_version
+from app.utils.rate_limiter import rate_limiter
+from app.utils.function_cache import function_caches
+from app.utils.system_stats import system_stats
+from app.utils.metrics import metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from app.utils.sql_profiler import sql_profiler
+from app.utils.live_stream import live_broadcaster
 from sqlalchemy import event
 from sqlalchemy.engine import Engine
 import os
@@ -14,9 +22,17 @@ def set_sqlite_pragma(dbapi_conn, connection_record):
     cursor.execute("PRAGMA synchronous=NORMAL")  # Balance between safety and speed
     cursor.close()
 
+def ensure_indexes():
+    """Create indexes added to existing tables (create_all skips existing tables)"""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
 def create_app():
     """Application factory pattern"""
-    app = Flask(__name__)
+    # VOLTONIC_INSTANCE_PATH moves the database and the shared state files (tests)
+    app = Flask(__name__, instance_path=os.environ.get('VOLTONIC_INSTANCE_PATH'))
+    app.json = FastJSONProvider(app)  # orjson-backed when installed
     
     # Configuration
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///voltonic.db'
@@ -27,17 +43,45 @@ def create_app():
     }
     app.config['SECRET_KEY'] = 'voltonic-secret-key-2026'
     
+    # Cross-process state for multi-worker deployments (see wsgi.py)
+    os.makedirs(app.instance_path, exist_ok=True)
+    app.config['SHARED_STATE_PATH'] = os.path.join(app.instance_path, 'voltonic-state.bin')
+    app.config['SCHEDULER_LOCK_PATH'] = os.path.join(app.instance_path, 'scheduler.lock')
+    app.config['WORKER_SOCKET_PATH'] = os.path.join(app.instance_path, 'voltonic-worker.sock')
+    # 'all': API processes elect a scheduler leader; 'api': a separate worker.py runs the jobs
+    app.config['PROCESS_ROLE'] = os.environ.get('VOLTONIC_ROLE', 'all')
+    app.config['SHARED_RATE_LIMIT_PATH'] = os.path.join(app.instance_path, 'voltonic-ratelimit.bin')
+    app.config['SHARED_CACHE_PATH'] = os.path.join(app.instance_path, 'voltonic-cache.bin')
+    app.config['EXPORT_DIR'] = os.path.join(app.instance_path, 'exports')  # Export job files
+    data_version.attach_shared(app.config['SHARED_STATE_PATH'])
+    rate_limiter.attach_shared(app.config['SHARED_RATE_LIMIT_PATH'])
+    function_caches.attach_shared(app.config['SHARED_CACHE_PATH'])
+    app.config['METRICS_DIR'] = os.path.join(app.instance_path, 'metrics')  # Per-process metric snapshots
+    metrics.attach_dir(app.config['METRICS_DIR'])
+    # SQL profiler: Server-Timing headers and N+1 reports for requests and ticks
+    app.config['SQL_PROFILE'] = os.environ.get('VOLTONIC_SQL_PROFILE') == '1'
+    app.config['SQL_REPEAT_THRESHOLD'] = int(os.environ.get('VOLTONIC_SQL_REPEAT_THRESHOLD', sql_profiler.REPEAT_THRESHOLD))
+    sql_profiler.configure(app.config['SQL_PROFILE'], app.config['SQL_REPEAT_THRESHOLD'])
+    # /api/stream/live subscribers per process (each holds a thread; set by gunicorn.conf.py)
+    app.config['SSE_MAX_SUBSCRIBERS'] = int(os.environ.get('VOLTONIC_SSE_SUBSCRIBERS', live_broadcaster.MAX_SUBSCRIBERS))
+    live_broadcaster.configure(app.config['SSE_MAX_SUBSCRIBERS'])
+    
     # Initialize extensions
     db.init_app(app)
-    CORS(app)
+    CORS(app, expose_headers=['ETag', 'Last-Modified', 'X-Row-Count', 'Server-Timing'])
     
     # Register blueprints
     from app.api import api_bp
     app.register_blueprint(api_bp)
     
+    # Prometheus scrape endpoint (outside /api: not rate limited, compressed or itself measured)
+    app.add_url_rule('/metrics', 'metrics', lambda: (metrics.render(), 200, {'Content-Type': METRICS_CONTENT_TYPE}))
+    
     # Create database tables
     with app.app_context():
         db.create_all()
+        ensure_indexes()
+        system_stats.initialize()  # Counter rows for /health and /stats/summary
         print(" Database tables created")
         print(" API endpoints registered at /api")
     
@@ -1,4 +1,4 @@
-from app.models import db, EnergyLog, Room, Building, Faculty
+from app.models import db, EnergyLog, Room, Floor, Building, Faculty
 from sqlalchemy import func
 from datetime import datetime, timedelta
 
@@ -71,43 +71,64 @@ class EnergyAnalytics:
         }
     
     @staticmethod
-    def get_hourly_consumption(hours=24):
-        """Get hourly average consumption for last N hours"""
+    def hourly_consumption_query(hours=24):
+        """Hourly aggregate query (columns named as in the API response)"""
         cutoff_time = datetime.now() - timedelta(hours=hours)
         
-        hourly_data = db.session.query(
+        return db.session.query(
             func.strftime('%Y-%m-%d %H:00:00', EnergyLog.timestamp).label('hour'),
-            func.avg(EnergyLog.total_load).label('avg_load'),
-            func.sum(EnergyLog.total_load).label('total_load'),
-            func.count(EnergyLog.id).label('reading_count')
+            func.avg(EnergyLog.total_load).label('avg_load_kw'),
+            func.sum(EnergyLog.total_load).label('total_load_kw'),
+            func.count(EnergyLog.id).label('readings')
         ).filter(
             EnergyLog.timestamp >= cutoff_time
-        ).group_by('hour').order_by('hour').all()
+        ).group_by('hour').order_by('hour')
+    
+    @staticmethod
+    def get_hourly_consumption(hours=24):
+        """Get hourly average consumption for last N hours"""
+        hourly_data = EnergyAnalytics.hourly_consumption_query(hours).all()
         
         return [
             {
                 'hour': row.hour,
-                'avg_load_kw': round(row.avg_load, 2),
-                'total_load_kw': round(row.total_load, 2),
-                'readings': row.reading_count
+                'avg_load_kw': round(row.avg_load_kw, 2),
+                'total_load_kw': round(row.total_load_kw, 2),
+                'readings': row.readings
             }
             for row in hourly_data
         ]
     
     @staticmethod
     def get_building_comparison():
-        """Compare energy usage across all buildings"""
+        """Compare energy usage across all buildings (grouped queries, not one set per building)"""
         latest_timestamp = db.session.query(func.max(EnergyLog.timestamp)).scalar()
         
         if not latest_timestamp:
             return {'error': 'No data available'}
         
-        buildings = Building.query.all()
-        comparison = []
+        room_counts = dict(db.session.query(
+            Floor.building_id,
+            func.count(Room.id)
+        ).join(Room, Room.floor_id == Floor.id).group_by(Floor.building_id).all())
         
-        for building in buildings:
-            load_data = EnergyAnalytics.get_building_load(building.id)
-            comparison.append(load_data)
+        loads = dict(db.session.query(
+            Floor.building_id,
+            func.sum(EnergyLog.total_load)
+        ).select_from(EnergyLog).join(Room, Room.id == EnergyLog.room_id).join(Floor, Floor.id == Room.floor_id).filter(
+            EnergyLog.timestamp == latest_timestamp
+        ).group_by(Floor.building_id).all())
+        
+        comparison = [
+            {
+                'building_id': building.id,
+                'building_name': building.name,
+                'timestamp': latest_timestamp.isoformat(),
+                'total_load_kw': round(loads.get(building.id) or 0.0, 2),
+                'total_rooms': room_counts.get(building.id, 0)
+            }
+            for building in Building.query.all()
+        ]
         
         # Sort by load descending
         comparison.sort(key=lambda x: x.get('total_load_kw', 0), reverse=True)
@@ -115,26 +136,33 @@ class EnergyAnalytics:
         return comparison
     
     @staticmethod
-    def get_daily_summary(days=7):
-        """Get daily consumption summary for last N days"""
+    def daily_summary_query(days=7):
+        """Daily aggregate query (columns named as in the API response)"""
         cutoff_time = datetime.now() - timedelta(days=days)
+        optimized = func.count(func.nullif(EnergyLog.optimized, False))
         
-        daily_data = db.session.query(
+        return db.session.query(
             func.date(EnergyLog.timestamp).label('date'),
-            func.sum(EnergyLog.total_load).label('total_load'),
-            func.count(EnergyLog.id).label('reading_count'),
-            func.count(func.nullif(EnergyLog.optimized, False)).label('optimized_count')
+            func.sum(EnergyLog.total_load).label('total_load_kw'),
+            func.count(EnergyLog.id).label('readings'),
+            optimized.label('optimized'),
+            (optimized * 100.0 / func.count(EnergyLog.id)).label('optimization_rate')
         ).filter(
             EnergyLog.timestamp >= cutoff_time
-        ).group_by('date').order_by('date').all()
+        ).group_by('date').order_by('date')
+    
+    @staticmethod
+    def get_daily_summary(days=7):
+        """Get daily consumption summary for last N days"""
+        daily_data = EnergyAnalytics.daily_summary_query(days).all()
         
         return [
             {
                 'date': row.date,
-                'total_load_kw': round(row.total_load, 2),
-                'readings': row.reading_count,
-                'optimized': row.optimized_count,
-                'optimization_rate': round((row.optimized_count / row.reading_count) * 100, 2) if row.reading_count > 0 else 0
+                'total_load_kw': round(row.total_load_kw, 2),
+                'readings': row.readings,
+                'optimized': row.optimized,
+                'optimization_rate': round((row.optimized / row.readings) * 100, 2) if row.readings > 0 else 0
             }
             for row in daily_data
-        ]
\ No newline at end of file
+        ]
@@ -0,0 +1,215 @@
+"""
+Multi-resolution campus history for charts
+- The simulator folds each tick's campus totals into tick, hour and day rows
+  (one small upsert per tick)
+- Chart reads pick the coarsest-needed resolution so at most
+  OVERSAMPLE * max_points rows are read whatever the time span, then
+  downsample them with LTTB or min/max buckets
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.models import db, EnergyLog, CampusSeries
+from app.analytics.downsampling import lttb_indices, bucket_ranges
+
+
+class CampusSeriesStore:
+    """Writes and reads the campus_series rollup"""
+    
+    # (name, bucket width in seconds), finest first
+    RESOLUTIONS = (('tick', 60), ('hour', 3600), ('day', 86400))
+    OVERSAMPLE = 4  # Rows read per returned point, at most
+    METHODS = ('lttb', 'minmax')
+    
+    SUM_COLUMNS = ('sample_count', 'load_sum', 'temperature_sum', 'occupied_sum', 'optimized_sum')
+    
+    @staticmethod
+    def bucket_of(resolution, timestamp):
+        if resolution == 'hour':
+            return timestamp.replace(minute=0, second=0, microsecond=0)
+        if resolution == 'day':
+            return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+        return timestamp
+    
+    @staticmethod
+    def _upsert(rows):
+        if not rows:
+            return
+        
+        table = CampusSeries.__table__
+        stmt = sqlite_insert(table)
+        set_ = {col: table.c[col] + stmt.excluded[col] for col in CampusSeriesStore.SUM_COLUMNS}
+        set_['load_min'] = func.min(table.c.load_min, stmt.excluded.load_min)
+        set_['load_max'] = func.max(table.c.load_max, stmt.excluded.load_max)
+        stmt = stmt.on_conflict_do_update(index_elements=['resolution', 'bucket_start'], set_=set_)
+        db.session.execute(stmt, rows)
+    
+    @staticmethod
+    def _tick_rows(timestamp, total_load, avg_temperature, occupied, optimized):
+        """One row per resolution for a single tick"""
+        return [
+            {
+                'resolution': resolution,
+                'bucket_start': CampusSeriesStore.bucket_of(resolution, timestamp),
+                'sample_count': 1,
+                'load_sum': total_load,
+                'load_min': total_load,
+                'load_max': total_load,
+                'temperature_sum': avg_temperature,
+                'occupied_sum': occupied,
+                'optimized_sum': optimized
+            }
+            for resolution, _ in CampusSeriesStore.RESOLUTIONS
+        ]
+    
+    @staticmethod
+    def process_tick(timestamp, readings, temperature_sum):
+        """
+        Fold one tick's campus totals into the tick/hour/day rows
+        
+        Args:
+            timestamp: Tick timestamp
+            readings: Sequence of (room_id, building_id, total_load, occupancy, optimized)
+            temperature_sum: Sum of the rooms' temperatures this tick
+        
+        Caller commits
+        """
+        if not readings:
+            return
+        
+        total_load = sum(r[2] for r in readings)
+        occupied = sum(1 for r in readings if r[3])
+        optimized = sum(1 for r in readings if r[4])
+        CampusSeriesStore._upsert(CampusSeriesStore._tick_rows(
+            timestamp, total_load, temperature_sum / len(readings), occupied, optimized
+        ))
+    
+    @staticmethod
+    def rebuild(start=None, end=None):
+        """
+        Recompute the series from EnergyLog (backfills)
+        
+        Args:
+            start, end: Optional datetime bounds (default: all data); start is
+                aligned to midnight so day rows are rebuilt whole
+        
+        Returns:
+            int: Number of series rows written
+        """
+        if start:
+            start = CampusSeriesStore.bucket_of('day', start)
+        
+        query = db.session.query(
+            EnergyLog.timestamp,
+            func.sum(EnergyLog.total_load),
+            func.avg(EnergyLog.temperature),
+            func.count(db.case((EnergyLog.occupancy == True, 1))),
+            func.count(db.case((EnergyLog.optimized == True, 1)))
+        )
+        delete = CampusSeries.query
+        if start:
+            query = query.filter(EnergyLog.timestamp >= start)
+            delete = delete.filter(CampusSeries.bucket_start >= start)
+        if end:
+            query = query.filter(EnergyLog.timestamp <= end)
+            delete = delete.filter(CampusSeries.bucket_start <= end)
+        query = query.group_by(EnergyLog.timestamp).order_by(EnergyLog.timestamp)
+        delete.delete(synchronize_session=False)
+        
+        merged = {}  # (resolution, bucket_start) -> row
+        for timestamp, total_load, avg_temperature, occupied, optimized in query.yield_per(10000):
+            for row in CampusSeriesStore._tick_rows(
+                timestamp, total_load or 0.0, avg_temperature or 0.0, occupied, optimized
+            ):
+                key = (row['resolution'], row['bucket_start'])
+                current = merged.get(key)
+                if current is None:
+                    merged[key] = row
+                    continue
+                for col in CampusSeriesStore.SUM_COLUMNS:
+                    current[col] += row[col]
+                current['load_min'] = min(current['load_min'], row['load_min'])
+                current['load_max'] = max(current['load_max'], row['load_max'])
+        
+        rows = list(merged.values())
+        for i in range(0, len(rows), 5000):
+            CampusSeriesStore._upsert(rows[i:i + 5000])
+        db.session.commit()
+        return len(rows)
+    
+    @staticmethod
+    def pick_resolution(span_seconds, max_points):
+        """Finest resolution reading at most OVERSAMPLE * max_points rows for the span"""
+        for name, width in CampusSeriesStore.RESOLUTIONS:
+            if span_seconds / width <= max_points * CampusSeriesStore.OVERSAMPLE:
+                return name
+        return CampusSeriesStore.RESOLUTIONS[-1][0]
+    
+    @staticmethod
+    def _point(rows):
+        """Chart point for one or more consecutive series rows"""
+        samples = sum(r.sample_count for r in rows)
+        point = {
+            'timestamp': rows[0].bucket_start.isoformat(),
+            'total_load_kw': round(sum(r.load_sum for r in rows) / samples, 2),
+            'min_load_kw': round(min(r.load_min for r in rows), 2),
+            'max_load_kw': round(max(r.load_max for r in rows), 2),
+            'avg_temperature': round(sum(r.temperature_sum for r in rows) / samples, 2),
+            'samples': samples
+        }
+        if samples == 1:
+            point['occupied_rooms'] = rows[0].occupied_sum
+            point['optimized_rooms'] = rows[0].optimized_sum
+        else:
+            point['occupied_rooms'] = round(sum(r.occupied_sum for r in rows) / samples, 1)
+            point['optimized_rooms'] = round(sum(r.optimized_sum for r in rows) / samples, 1)
+        return point
+    
+    @staticmethod
+    def get_series(hours=24, max_points=500, method='lttb', end=None):
+        """
+        Campus history downsampled to at most max_points points (newest first)
+        
+        Args:
+            hours: Window length ending at `end`
+            max_points: Point budget (e.g. chart width in pixels)
+            method: 'lttb' keeps shape-preserving rows; 'minmax' merges rows
+                into buckets carrying min_load_kw/max_load_kw envelopes
+            end: Window end (default: now)
+        
+        Returns:
+            dict: resolution, method, source_rows and data
+        """
+        if method not in CampusSeriesStore.METHODS:
+            raise ValueError(f"method must be one of: {list(CampusSeriesStore.METHODS)}")
+        if max_points < 3:
+            raise ValueError('max_points must be at least 3')
+        
+        end = end or datetime.now()
+        start = end - timedelta(hours=hours)
+        resolution = CampusSeriesStore.pick_resolution(hours * 3600, max_points)
+        
+        rows = CampusSeries.query.filter(
+            CampusSeries.resolution == resolution,
+            CampusSeries.bucket_start >= CampusSeriesStore.bucket_of(resolution, start),
+            CampusSeries.bucket_start <= end
+        ).order_by(CampusSeries.bucket_start).all()
+        
+        if method == 'lttb':
+            indices = lttb_indices(
+                [r.bucket_start.timestamp() for r in rows],
+                [r.load_sum / r.sample_count for r in rows],
+                max_points
+            )
+            data = [CampusSeriesStore._point([rows[i]]) for i in indices]
+        else:
+            data = [CampusSeriesStore._point(rows[s:e]) for s, e in bucket_ranges(len(rows), max_points)]
+        
+        data.reverse()
+        return {
+            'resolution': resolution,
+            'method': method,
+            'source_rows': len(rows),
+            'data': data
+        }
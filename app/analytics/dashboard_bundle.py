@@ -0,0 +1,252 @@
+"""
+Composite dashboard bundle
+Computes several dashboard panels in one request from a shared snapshot:
+the latest tick timestamp, its campus/building aggregates, the room count and
+the power source configs are each queried at most once per bundle.
+Every panel returns the same shape as its standalone endpoint.
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import func, case
+from app.models import db, EnergyLog, Room, Floor, Building, PowerSourceConfig, AutonomousLog
+from app.optimization.optimizer import EnergyOptimizer
+from app.optimization.smart_power_controller import SmartPowerController
+from app.prediction.predictor import cached_next_hour_prediction, cached_30_minute_prediction
+from app.utils.live_stream import format_notification
+from app.utils.system_stats import system_stats
+
+
+class DashboardSnapshot:
+    """Lazily computed intermediate results shared by all panels of a bundle"""
+    
+    def __init__(self):
+        self._cache = {}
+    
+    def _memo(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+    
+    @property
+    def latest_timestamp(self):
+        return self._memo('latest_timestamp', lambda: db.session.query(func.max(EnergyLog.timestamp)).scalar())
+    
+    @property
+    def room_count(self):
+        return self._memo('room_count', lambda: Room.query.count())
+    
+    @property
+    def tick_totals(self):
+        """(total load, optimized rooms) of the latest tick in one query"""
+        def compute():
+            if not self.latest_timestamp:
+                return 0.0, 0
+            total_load, optimized = db.session.query(
+                func.sum(EnergyLog.total_load),
+                func.sum(case((EnergyLog.optimized == True, 1), else_=0))
+            ).filter(
+                EnergyLog.timestamp == self.latest_timestamp
+            ).one()
+            return total_load or 0.0, optimized or 0
+        return self._memo('tick_totals', compute)
+    
+    @property
+    def building_loads(self):
+        """building_id -> (name, rooms, latest load) with two grouped queries"""
+        def compute():
+            rooms = db.session.query(
+                Building.id, Building.name, func.count(Room.id)
+            ).outerjoin(Floor, Floor.building_id == Building.id).outerjoin(
+                Room, Room.floor_id == Floor.id
+            ).group_by(Building.id).all()
+            
+            loads = {}
+            if self.latest_timestamp:
+                loads = dict(db.session.query(
+                    Floor.building_id, func.sum(EnergyLog.total_load)
+                ).join(Room, Room.id == EnergyLog.room_id).join(
+                    Floor, Floor.id == Room.floor_id
+                ).filter(
+                    EnergyLog.timestamp == self.latest_timestamp
+                ).group_by(Floor.building_id).all())
+            
+            return {
+                building_id: (name, room_count, loads.get(building_id) or 0.0)
+                for building_id, name, room_count in rooms
+            }
+        return self._memo('building_loads', compute)
+    
+    @property
+    def power_configs(self):
+        """[(PowerSourceConfig, building name)] in one joined query"""
+        return self._memo('power_configs', lambda: db.session.query(
+            PowerSourceConfig, Building.name
+        ).outerjoin(Building, Building.id == PowerSourceConfig.building_id).all())
+
+
+class DashboardBundle:
+    """Panel builders for /api/dashboard/bundle"""
+    
+    @staticmethod
+    def panel_live(snapshot, **_):
+        latest = snapshot.latest_timestamp
+        if not latest:
+            campus_load = {'error': 'No data available'}
+        else:
+            total_load, optimized = snapshot.tick_totals
+            total_rooms = snapshot.room_count
+            campus_load = {
+                'timestamp': latest.isoformat(),
+                'total_load_kw': round(total_load, 2),
+                'total_rooms': total_rooms,
+                'optimized_rooms': optimized,
+                'optimization_percentage': round((optimized / total_rooms) * 100, 2) if total_rooms > 0 else 0
+            }
+        
+        return {
+            'campus_load': campus_load,
+            'optimization_savings': EnergyOptimizer.get_savings_summary(
+                total_optimized=system_stats.count(system_stats.get_counters(), 'energy_log.optimized')
+            ),
+            'last_updated': latest.isoformat() if latest else None
+        }
+    
+    @staticmethod
+    def panel_optimization(snapshot, **_):
+        latest = snapshot.latest_timestamp
+        if not latest:
+            raise LookupError('No data available')
+        
+        total_load, optimized = snapshot.tick_totals
+        total_rooms = snapshot.room_count
+        return {
+            'timestamp': latest.isoformat(),
+            'total_rooms': total_rooms,
+            'optimized_rooms': optimized,
+            'non_optimized_rooms': total_rooms - optimized,
+            'optimization_rate': round((optimized / total_rooms) * 100, 2) if total_rooms > 0 else 0,
+            'current_campus_load_kw': round(total_load, 2)
+        }
+    
+    @staticmethod
+    def panel_buildings(snapshot, **_):
+        latest = snapshot.latest_timestamp
+        if not latest:
+            return {'error': 'No data available'}
+        
+        comparison = [
+            {
+                'building_id': building_id,
+                'building_name': name,
+                'timestamp': latest.isoformat(),
+                'total_load_kw': round(load, 2),
+                'total_rooms': room_count
+            }
+            for building_id, (name, room_count, load) in snapshot.building_loads.items()
+        ]
+        comparison.sort(key=lambda x: x['total_load_kw'], reverse=True)
+        return comparison
+    
+    @staticmethod
+    def panel_prediction(snapshot, predictor=None, **_):
+        prediction, hit = cached_next_hour_prediction.lookup(predictor)
+        return dict(prediction, cached=hit)
+    
+    @staticmethod
+    def panel_prediction_30min(snapshot, predictor=None, **_):
+        return cached_30_minute_prediction(predictor)
+    
+    @staticmethod
+    def panel_solar(snapshot, **_):
+        current_hour = datetime.now().hour
+        solar_availability = SmartPowerController.get_solar_availability(current_hour)
+        
+        buildings_status = [
+            {
+                'building_id': config.building_id,
+                'building_name': building_name or 'Unknown',
+                'solar_capacity_kw': config.solar_capacity_kw,
+                'effective_capacity_kw': round(config.solar_capacity_kw * solar_availability, 2),
+                'current_output_kw': config.current_solar_output_kw,
+                'hybrid_mode_active': config.hybrid_mode_active,
+                'last_source_switch': config.last_source_switch.isoformat() if config.last_source_switch else None
+            }
+            for config, building_name in snapshot.power_configs
+        ]
+        
+        return {
+            'current_hour': current_hour,
+            'solar_availability_factor': solar_availability,
+            'is_peak_solar': 6 <= current_hour < 18,
+            'is_evening': 18 <= current_hour < 20,
+            'is_night': current_hour >= 20 or current_hour < 6,
+            'buildings': buildings_status
+        }
+    
+    @staticmethod
+    def panel_hybrid(snapshot, **_):
+        hybrid_buildings = [
+            {
+                'building_id': config.building_id,
+                'building_name': building_name or 'Unknown',
+                'solar_output_kw': config.current_solar_output_kw,
+                'grid_capacity_kw': config.grid_capacity_kw,
+                'activated_at': config.last_source_switch.isoformat() if config.last_source_switch else None
+            }
+            for config, building_name in snapshot.power_configs
+            if config.hybrid_mode_active
+        ]
+        
+        return {
+            'hybrid_buildings_count': len(hybrid_buildings),
+            'buildings': hybrid_buildings
+        }
+    
+    @staticmethod
+    def panel_notifications(snapshot, minutes=10, **_):
+        cutoff = datetime.now() - timedelta(minutes=minutes)
+        rows = db.session.query(AutonomousLog, Room.name, Building.name).outerjoin(
+            Room, Room.id == AutonomousLog.room_id
+        ).outerjoin(
+            Building, Building.id == AutonomousLog.building_id
+        ).filter(
+            AutonomousLog.timestamp >= cutoff
+        ).order_by(AutonomousLog.timestamp.desc()).limit(20).all()
+        
+        notifications = [format_notification(log, room_name, building_name) for log, room_name, building_name in rows]
+        return {
+            'notifications': notifications,
+            'count': len(notifications),
+            'period_minutes': minutes
+        }
+    
+    PANELS = ('live', 'optimization', 'buildings', 'prediction', 'prediction_30min', 'solar', 'hybrid', 'notifications')
+    DEFAULT_PANELS = ('live', 'optimization', 'prediction', 'solar', 'hybrid', 'notifications')
+    
+    @staticmethod
+    def build(panels=None, **options):
+        """
+        Compute the requested panels from one shared snapshot
+        
+        Args:
+            panels: Iterable of panel names (default: DEFAULT_PANELS)
+            **options: Passed to panel builders (predictor, minutes)
+        
+        Returns:
+            tuple: (panels dict, errors dict) - a failing panel does not fail the bundle
+        """
+        panels = list(panels or DashboardBundle.DEFAULT_PANELS)
+        unknown = [name for name in panels if name not in DashboardBundle.PANELS]
+        if unknown:
+            raise ValueError(f"Unknown panels: {unknown}. Available: {list(DashboardBundle.PANELS)}")
+        
+        snapshot = DashboardSnapshot()
+        results = {}
+        errors = {}
+        for name in panels:
+            try:
+                results[name] = getattr(DashboardBundle, f'panel_{name}')(snapshot, **options)
+            except Exception as e:
+                errors[name] = str(e)
+        
+        return results, errors
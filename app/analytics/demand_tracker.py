@@ -0,0 +1,387 @@
+"""
+Streaming demand tracking
+Maintains, per simulation tick and without scanning EnergyLog:
+- Wasted energy per room for the current day (load drawn while unoccupied)
+  with a cached top-K ranking
+- Running peak / mean / p95 demand per building and for the campus,
+  for the current day and month
+Closed windows are persisted to DemandPeak / WasterRanking.
+
+Only the process running the simulator tick holds the live state; other
+processes read it from the leader over the worker socket (live_top_wasters,
+live_peaks), or rebuild it from EnergyLog / DemandPeak while no leader is
+reachable.
+"""
+
+import threading
+import numpy as np
+from datetime import datetime
+from sqlalchemy import func
+from app.models import db, EnergyLog, Room, Floor, DemandPeak, WasterRanking
+from app.utils.worker_ipc import worker_channel, call_leader, WorkerUnavailable
+
+
+class P2Quantile:
+    """Single-quantile streaming estimator (Jain & Chlamtac P² algorithm), O(1) memory"""
+    
+    def __init__(self, p):
+        self.p = p
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+    
+    def add(self, x):
+        q = self.heights
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+        
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        
+        # Adjust the three middle markers
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if q[i - 1] < parabolic < q[i + 1]:
+                    q[i] = parabolic
+                else:
+                    q[i] = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+    
+    def value(self):
+        if not self.heights:
+            return None
+        if len(self.heights) < 5:
+            idx = min(len(self.heights) - 1, int(round(self.p * (len(self.heights) - 1))))
+            return self.heights[idx]
+        return self.heights[2]
+
+
+class WindowStats:
+    """Running peak/mean/p95 for one scope within one time window"""
+    
+    __slots__ = ('peak_kw', 'peak_at', 'total_kw', 'count', 'p95')
+    
+    def __init__(self):
+        self.peak_kw = None
+        self.peak_at = None
+        self.total_kw = 0.0
+        self.count = 0
+        self.p95 = P2Quantile(0.95)
+    
+    def add(self, load_kw, timestamp):
+        if self.peak_kw is None or load_kw > self.peak_kw:
+            self.peak_kw = load_kw
+            self.peak_at = timestamp
+        self.total_kw += load_kw
+        self.count += 1
+        self.p95.add(load_kw)
+    
+    def to_dict(self):
+        p95 = self.p95.value()
+        return {
+            'peak_kw': round(self.peak_kw, 2) if self.peak_kw is not None else None,
+            'peak_at': self.peak_at.isoformat() if self.peak_at else None,
+            'mean_kw': round(self.total_kw / self.count, 2) if self.count else None,
+            'p95_kw': round(p95, 2) if p95 is not None else None,
+            'samples': self.count
+        }
+
+
+class DemandTracker:
+    """Per-tick top-K waster ranking and peak demand trackers"""
+    
+    TOP_K = 20
+    TICK_HOURS = 1 / 60  # Simulation ticks every 60 seconds
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.day = None
+        self.month_start = None
+        self._wasted_kwh = np.zeros(0, dtype=np.float64)  # Indexed by room_id
+        self._top_wasters = []  # Cached [(room_id, kWh)] for O(1) reads
+        self._day_stats = {}  # (scope, scope_id) -> WindowStats
+        self._month_stats = {}
+        self._month_closed_peaks = {}  # (scope, scope_id) -> (peak_kw, peak_at) of closed days this month
+        self._rebuild_lock = threading.Lock()
+        self._rebuilt = None  # (latest tick, DemandTracker) while the leader is unreachable
+    
+    @staticmethod
+    def _month_start_of(day):
+        return datetime(day.year, day.month, 1)
+    
+    def _add_waste(self, room_ids, wasted_kwh):
+        max_id = int(room_ids.max()) if len(room_ids) else -1
+        if max_id >= len(self._wasted_kwh):
+            grown = np.zeros(max(max_id + 1, 2 * len(self._wasted_kwh)), dtype=np.float64)
+            grown[:len(self._wasted_kwh)] = self._wasted_kwh
+            self._wasted_kwh = grown
+        np.add.at(self._wasted_kwh, room_ids, wasted_kwh)
+    
+    def _refresh_top(self):
+        waste = self._wasted_kwh
+        k = min(self.TOP_K, int(np.count_nonzero(waste)))
+        if k == 0:
+            self._top_wasters = []
+            return
+        # Rank on waste rounded to the reported precision, ties by room id:
+        # the incremental sums and a rebuild from the database differ in the
+        # last bits, and equal values would otherwise come out in any order
+        rounded = np.round(waste, 3)
+        threshold = np.partition(rounded, -k)[-k]
+        idx = np.flatnonzero(rounded >= threshold)  # Ascending room ids
+        idx = idx[np.lexsort((idx, -rounded[idx]))][:k]
+        self._top_wasters = [(int(i), float(waste[i])) for i in idx]
+    
+    def _record_loads(self, timestamp, scope_loads):
+        for key, load in scope_loads.items():
+            self._day_stats.setdefault(key, WindowStats()).add(load, timestamp)
+            self._month_stats.setdefault(key, WindowStats()).add(load, timestamp)
+    
+    def _persist_window(self, window, window_start, stats):
+        for (scope, scope_id), s in stats.items():
+            if not s.count:
+                continue
+            db.session.add(DemandPeak(
+                window=window,
+                window_start=window_start,
+                scope=scope,
+                scope_id=scope_id,
+                peak_kw=round(s.peak_kw, 3),
+                peak_at=s.peak_at,
+                mean_kw=round(s.total_kw / s.count, 3),
+                p95_kw=round(s.p95.value(), 3),
+                sample_count=s.count
+            ))
+    
+    def _close_day(self):
+        """Persist the finished day's peaks and waster ranking, then reset day state"""
+        day_start = datetime.combine(self.day, datetime.min.time())
+        DemandPeak.query.filter_by(window='day', window_start=day_start).delete()
+        WasterRanking.query.filter_by(day=self.day).delete()
+        
+        self._persist_window('day', day_start, self._day_stats)
+        for rank, (room_id, kwh) in enumerate(self._top_wasters, 1):
+            db.session.add(WasterRanking(day=self.day, rank=rank, room_id=room_id, wasted_kwh=round(kwh, 4)))
+        
+        for key, s in self._day_stats.items():
+            closed = self._month_closed_peaks.get(key)
+            if s.peak_kw is not None and (closed is None or s.peak_kw > closed[0]):
+                self._month_closed_peaks[key] = (s.peak_kw, s.peak_at)
+        
+        self._day_stats = {}
+        self._wasted_kwh[:] = 0.0
+        self._top_wasters = []
+    
+    def _close_month(self):
+        # Peaks of days closed before a restart are only known from DemandPeak rows
+        for key, (peak_kw, peak_at) in self._month_closed_peaks.items():
+            s = self._month_stats.get(key)
+            if s is not None and peak_kw > s.peak_kw:
+                s.peak_kw = peak_kw
+                s.peak_at = peak_at
+        
+        DemandPeak.query.filter_by(window='month', window_start=self.month_start).delete()
+        self._persist_window('month', self.month_start, self._month_stats)
+        self._month_stats = {}
+        self._month_closed_peaks = {}
+    
+    def _seed(self, timestamp, inclusive=False):
+        """
+        Rebuild current-window state after a restart (bounded to today's rows)
+        
+        Args:
+            inclusive: Also fold in the tick at `timestamp` (otherwise
+                process_tick adds it)
+        """
+        day = timestamp.date()
+        self.day = day
+        self.month_start = self._month_start_of(day)
+        day_start = datetime.combine(day, datetime.min.time())
+        # The tick being processed may already be flushed; process_tick folds it in
+        until = EnergyLog.timestamp <= timestamp if inclusive else EnergyLog.timestamp < timestamp
+        
+        # Month peaks from already-closed days
+        closed_days = DemandPeak.query.filter(
+            DemandPeak.window == 'day',
+            DemandPeak.window_start >= self.month_start,
+            DemandPeak.window_start < day_start
+        ).all()
+        for row in closed_days:
+            key = (row.scope, row.scope_id)
+            closed = self._month_closed_peaks.get(key)
+            if closed is None or row.peak_kw > closed[0]:
+                self._month_closed_peaks[key] = (row.peak_kw, row.peak_at)
+        
+        # Today's waste per room
+        waste = db.session.query(
+            EnergyLog.room_id,
+            func.sum(EnergyLog.total_load)
+        ).filter(
+            EnergyLog.timestamp >= day_start,
+            until,
+            EnergyLog.occupancy == False
+        ).group_by(EnergyLog.room_id).all()
+        if waste:
+            room_ids = np.array([w[0] for w in waste], dtype=np.int64)
+            kwh = np.array([w[1] for w in waste], dtype=np.float64) * self.TICK_HOURS
+            self._add_waste(room_ids, kwh)
+        
+        # Today's per-tick building loads, replayed in order
+        per_tick = db.session.query(
+            EnergyLog.timestamp,
+            Floor.building_id,
+            func.sum(EnergyLog.total_load)
+        ).join(Room, Room.id == EnergyLog.room_id).join(Floor, Floor.id == Room.floor_id).filter(
+            EnergyLog.timestamp >= day_start,
+            until
+        ).group_by(EnergyLog.timestamp, Floor.building_id).order_by(EnergyLog.timestamp).all()
+        
+        tick_loads = {}
+        for timestamp, building_id, load in per_tick:
+            tick_loads.setdefault(timestamp, {})[('building', building_id)] = load
+        for timestamp, loads in tick_loads.items():
+            loads[('campus', 0)] = sum(loads.values())
+            self._record_loads(timestamp, loads)
+        
+        self._refresh_top()
+    
+    def process_tick(self, timestamp, readings):
+        """
+        Fold one simulation tick into the trackers
+        
+        Args:
+            timestamp: Tick timestamp
+            readings: Sequence of (room_id, building_id, total_load, occupancy, optimized)
+        
+        Caller commits (window-close rows are added to the tick's session)
+        """
+        with self._lock:
+            today = timestamp.date()
+            if self.day is None:
+                self._seed(timestamp)
+            elif today != self.day:
+                self._close_day()
+                if self._month_start_of(today) != self.month_start:
+                    self._close_month()
+                self.day = today
+                self.month_start = self._month_start_of(today)
+            
+            if not readings:
+                return
+            
+            room_ids = np.fromiter((r[0] for r in readings), dtype=np.int64, count=len(readings))
+            wasted = np.fromiter(
+                ((0.0 if r[3] else r[2]) for r in readings), dtype=np.float64, count=len(readings)
+            ) * self.TICK_HOURS
+            self._add_waste(room_ids, wasted)
+            self._refresh_top()
+            
+            loads = {}
+            for _, building_id, total_load, _, _ in readings:
+                key = ('building', building_id)
+                loads[key] = loads.get(key, 0.0) + total_load
+            loads[('campus', 0)] = sum(loads.values())
+            self._record_loads(timestamp, loads)
+    
+    def get_top_wasters(self, limit=None):
+        """Current day's top rooms by wasted kWh (cached list, no scan)"""
+        with self._lock:
+            top = self._top_wasters[:limit or self.TOP_K]
+            return {
+                'day': self.day.isoformat() if self.day else None,
+                'wasters': [{'room_id': room_id, 'wasted_kwh': round(kwh, 3)} for room_id, kwh in top]
+            }
+    
+    def get_peaks(self, window='month'):
+        """Running peak/mean/p95 per scope for the current day or month"""
+        if window not in ('day', 'month'):
+            raise ValueError("window must be 'day' or 'month'")
+        
+        with self._lock:
+            if window == 'day':
+                window_start = datetime.combine(self.day, datetime.min.time()) if self.day else None
+                stats = {key: s.to_dict() for key, s in self._day_stats.items()}
+            else:
+                window_start = self.month_start
+                stats = {}
+                for key, s in self._month_stats.items():
+                    data = s.to_dict()
+                    closed = self._month_closed_peaks.get(key)
+                    if closed and (data['peak_kw'] is None or closed[0] > data['peak_kw']):
+                        data['peak_kw'] = round(closed[0], 2)
+                        data['peak_at'] = closed[1].isoformat()
+                    stats[key] = data
+                for key, (peak_kw, peak_at) in self._month_closed_peaks.items():
+                    if key not in stats:
+                        stats[key] = {'peak_kw': round(peak_kw, 2), 'peak_at': peak_at.isoformat(),
+                                      'mean_kw': None, 'p95_kw': None, 'samples': 0}
+            
+            return {
+                'window': window,
+                'window_start': window_start.isoformat() if window_start else None,
+                'campus': stats.get(('campus', 0)),
+                'buildings': [
+                    {'building_id': scope_id, **data}
+                    for (scope, scope_id), data in sorted(stats.items()) if scope == 'building'
+                ]
+            }
+    
+    def _rebuild(self):
+        """State as of the latest logged tick, from the database (cached until the next tick)"""
+        latest = db.session.query(func.max(EnergyLog.timestamp)).scalar()
+        with self._rebuild_lock:
+            if self._rebuilt is None or self._rebuilt[0] != latest:
+                tracker = DemandTracker()
+                if latest is not None:
+                    tracker._seed(latest, inclusive=True)
+                self._rebuilt = (latest, tracker)
+            return self._rebuilt[1]
+    
+    def _read_live(self, op, method, **params):
+        """
+        A read of the live state: local when this process runs the ticks,
+        else from the leader, else rebuilt from the database
+        """
+        if self.day is not None:
+            return getattr(self, method)(**params)
+        try:
+            return call_leader(op, **params)
+        except WorkerUnavailable:
+            return getattr(self._rebuild(), method)(**params)
+    
+    def live_top_wasters(self, limit=None):
+        """get_top_wasters() of the process running the simulator tick"""
+        return self._read_live('demand.top_wasters', 'get_top_wasters', limit=limit)
+    
+    def live_peaks(self, window='month'):
+        """get_peaks() of the process running the simulator tick"""
+        if window not in ('day', 'month'):
+            raise ValueError("window must be 'day' or 'month'")
+        return self._read_live('demand.peaks', 'get_peaks', window=window)
+
+
+# Global tracker instance (fed by the simulator tick)
+demand_tracker = DemandTracker()
+worker_channel.register('demand.top_wasters', demand_tracker.get_top_wasters)
+worker_channel.register('demand.peaks', demand_tracker.get_peaks)
@@ -0,0 +1,60 @@
+"""
+Time-series downsampling for charts
+- LTTB (Largest-Triangle-Three-Buckets) keeps the points that preserve the
+  visual shape of a line, so a few hundred points look like the full series
+- Min/max bucketing splits a series into equal index ranges; callers emit one
+  envelope point per range so spikes survive the reduction
+"""
+
+import numpy as np
+
+
+def lttb_indices(x, y, max_points):
+    """
+    Indices of the points LTTB keeps (first and last always included)
+    
+    Args:
+        x: Ascending x values (e.g. epoch seconds)
+        y: y values, same length as x
+        max_points: Number of points to keep (>= 3)
+    
+    Returns:
+        list: Ascending indices into x/y
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return list(range(n))
+    
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    every = (n - 2) / (max_points - 2)
+    
+    selected = [0]
+    a = 0
+    for i in range(max_points - 2):
+        # Average of the next bucket is the third triangle vertex
+        next_start = int(np.floor((i + 1) * every)) + 1
+        next_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        
+        start = int(np.floor(i * every)) + 1
+        end = int(np.floor((i + 1) * every)) + 1
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected.append(a)
+    
+    selected.append(n - 1)
+    return selected
+
+
+def bucket_ranges(n, buckets):
+    """Split range(n) into at most `buckets` contiguous (start, end) index ranges"""
+    if n == 0:
+        return []
+    buckets = max(1, min(buckets, n))
+    bounds = np.linspace(0, n, buckets + 1).astype(int)
+    return [(int(s), int(e)) for s, e in zip(bounds[:-1], bounds[1:]) if e > s]
@@ -0,0 +1,149 @@
+"""
+Energy flow view (latest tick per room, grouped floor -> building -> faculty)
+- One joined EnergyLog/EnergySource query per scope (building, faculty or
+  campus) for the latest tick; names and the hierarchy come from the
+  topology snapshot
+- Results are cached per scope until the next tick or topology edit, with
+  concurrent viewers coalesced onto one computation and shared across
+  workers (see function_cache)
+"""
+
+from sqlalchemy import func
+from app.models import db, EnergyLog, EnergySource
+from app.analytics.topology import topology
+from app.utils.function_cache import cached
+
+
+class EnergyFlow:
+    """Builds energy flow payloads for one building, one faculty or the campus"""
+    
+    @staticmethod
+    def _latest_readings(latest_time, room_ids=None):
+        """room_id -> reading row of the latest tick, in one joined query"""
+        query = db.session.query(
+            EnergyLog.room_id,
+            EnergyLog.occupancy,
+            EnergyLog.total_load,
+            EnergyLog.optimized,
+            EnergySource.name.label('source_name'),
+            EnergySource.cost_per_kwh
+        ).join(
+            EnergySource, EnergySource.id == EnergyLog.energy_source_id
+        ).filter(
+            EnergyLog.timestamp == latest_time
+        )
+        if room_ids is not None:
+            query = query.filter(EnergyLog.room_id.in_(room_ids))
+        return {row.room_id: row for row in query}
+    
+    @staticmethod
+    def _building_payload(snapshot, building, readings):
+        floors_data = []
+        for floor_id in building.floor_ids:
+            floor = snapshot.floors[floor_id]
+            rooms_data = []
+            for room_id in floor.room_ids:
+                reading = readings.get(room_id)
+                if reading is None:
+                    continue
+                room = snapshot.rooms[room_id]
+                rooms_data.append({
+                    'room_id': room.id,
+                    'room_name': room.name,
+                    'room_type': room.type,
+                    'capacity': room.capacity,
+                    'occupancy': reading.occupancy,
+                    'total_load': reading.total_load,
+                    'energy_source': reading.source_name,
+                    'energy_source_cost': reading.cost_per_kwh,
+                    'optimized': reading.optimized
+                })
+            
+            floors_data.append({
+                'floor_id': floor.id,
+                'floor_number': floor.number,
+                'total_load': sum(r['total_load'] for r in rooms_data),
+                'rooms': rooms_data
+            })
+        
+        return {
+            'building_id': building.id,
+            'building_name': building.name,
+            'total_load': sum(f['total_load'] for f in floors_data),
+            'floors': floors_data
+        }
+    
+    @staticmethod
+    def _faculty_payload(snapshot, faculty, readings):
+        buildings_data = [
+            EnergyFlow._building_payload(snapshot, snapshot.buildings[building_id], readings)
+            for building_id in faculty.building_ids
+        ]
+        return {
+            'faculty_id': faculty.id,
+            'faculty_name': faculty.name,
+            'total_load': sum(b['total_load'] for b in buildings_data),
+            'buildings': buildings_data
+        }
+    
+    @staticmethod
+    def compute(scope, scope_id=0):
+        """
+        Energy flow of the latest tick
+        
+        Args:
+            scope: 'building', 'faculty' or 'campus'
+            scope_id: Building or faculty id (ignored for campus)
+        
+        Returns:
+            dict: Building payload (floors -> rooms), faculty payload
+                (buildings -> floors -> rooms) or campus payload (faculties -> ...),
+                each with 'timestamp' and 'total_load'
+        
+        Raises:
+            LookupError: Unknown building/faculty, or no energy data yet
+        """
+        snapshot = topology.get()
+        if scope == 'building':
+            node = snapshot.buildings.get(scope_id)
+            room_ids = snapshot.building_room_ids(scope_id) if node else None
+        elif scope == 'faculty':
+            node = snapshot.faculties.get(scope_id)
+            room_ids = [
+                room_id for building_id in node.building_ids
+                for room_id in snapshot.building_room_ids(building_id)
+            ] if node else None
+        elif scope == 'campus':
+            node, room_ids = True, None
+        else:
+            raise ValueError("scope must be one of: ['building', 'faculty', 'campus']")
+        if node is None:
+            raise LookupError(f'{scope.capitalize()} not found')
+        
+        latest_time = db.session.query(func.max(EnergyLog.timestamp)).scalar()
+        if not latest_time:
+            raise LookupError('No energy data available')
+        readings = EnergyFlow._latest_readings(latest_time, room_ids)
+        
+        if scope == 'building':
+            payload = EnergyFlow._building_payload(snapshot, node, readings)
+        elif scope == 'faculty':
+            payload = EnergyFlow._faculty_payload(snapshot, node, readings)
+        else:
+            faculties_data = [
+                EnergyFlow._faculty_payload(snapshot, faculty, readings)
+                for faculty in snapshot.faculties.values()
+            ]
+            payload = {
+                'total_load': sum(f['total_load'] for f in faculties_data),
+                'faculties': faculties_data
+            }
+        payload['timestamp'] = latest_time.isoformat()
+        return payload
+
+
+@cached(ttl_seconds=300, max_entries=64, depends_on=('tick', 'topology'), shared=True, name='energy_flow',
+        key=lambda scope, scope_id=0: f'{scope}:{scope_id}')
+def cached_energy_flow(scope, scope_id=0):
+    """EnergyFlow.compute() shared by every viewer and worker until the next tick"""
+    return EnergyFlow.compute(scope, scope_id)
@@ -0,0 +1,223 @@
+"""
+Hourly load rollups with quantile sketches
+- The simulator adds each tick's building/campus totals to in-memory sketches
+  for the current hour and upserts them (one small batch per tick)
+- Percentiles and load-duration curves merge the hourly sketches of any
+  window at query time (relative error <= LoadSketch.ALPHA)
+"""
+
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.models import db, EnergyLog, Room, Floor, LoadRollup
+from app.analytics.quantile_sketch import LoadSketch
+
+
+class LoadRollupWriter:
+    """Maintains current-hour sketches per scope and persists them every tick"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.bucket_start = None
+        self._sketches = {}  # (scope, scope_id) -> LoadSketch
+    
+    @staticmethod
+    def bucket_of(timestamp):
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    
+    def _load_bucket(self, bucket_start):
+        """Resume a partially written hour (e.g. after a restart)"""
+        self._sketches = {}
+        rows = LoadRollup.query.filter_by(bucket_start=bucket_start).all()
+        for row in rows:
+            self._sketches[(row.scope, row.scope_id)] = LoadSketch.from_bytes(
+                row.sketch, row.sample_count, row.load_sum, row.load_min, row.load_max
+            )
+        self.bucket_start = bucket_start
+    
+    @staticmethod
+    def _upsert(bucket_start, sketches):
+        rows = [
+            {
+                'scope': scope,
+                'scope_id': scope_id,
+                'bucket_start': bucket_start,
+                'sample_count': sketch.count,
+                'load_sum': sketch.total,
+                'load_min': sketch.min,
+                'load_max': sketch.max,
+                'sketch': sketch.to_bytes()
+            }
+            for (scope, scope_id), sketch in sketches.items()
+        ]
+        if not rows:
+            return
+        
+        table = LoadRollup.__table__
+        stmt = sqlite_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['scope', 'scope_id', 'bucket_start'],
+            set_={col: stmt.excluded[col] for col in
+                  ('sample_count', 'load_sum', 'load_min', 'load_max', 'sketch')}
+        )
+        db.session.execute(stmt, rows)
+    
+    def process_tick(self, timestamp, readings):
+        """
+        Add one tick's building and campus totals to the hourly rollups
+        
+        Args:
+            timestamp: Tick timestamp
+            readings: Sequence of (room_id, building_id, total_load, occupancy, optimized)
+        
+        Caller commits
+        """
+        if not readings:
+            return
+        
+        loads = {}
+        for _, building_id, total_load, _, _ in readings:
+            loads[building_id] = loads.get(building_id, 0.0) + total_load
+        
+        with self._lock:
+            bucket_start = self.bucket_of(timestamp)
+            if bucket_start != self.bucket_start:
+                self._load_bucket(bucket_start)
+            
+            for building_id, load in loads.items():
+                self._sketches.setdefault(('building', building_id), LoadSketch()).add(load)
+            self._sketches.setdefault(('campus', 0), LoadSketch()).add(sum(loads.values()))
+            
+            self._upsert(bucket_start, self._sketches)
+    
+    def rebuild(self, start=None, end=None):
+        """
+        Recompute rollups from EnergyLog (backfills)
+        
+        Args:
+            start, end: Optional datetime bounds (default: all data)
+        
+        Returns:
+            int: Number of hourly rollup rows written
+        """
+        query = db.session.query(
+            EnergyLog.timestamp,
+            Floor.building_id,
+            func.sum(EnergyLog.total_load)
+        ).join(Room, Room.id == EnergyLog.room_id).join(Floor, Floor.id == Room.floor_id)
+        if start:
+            query = query.filter(EnergyLog.timestamp >= self.bucket_of(start))
+        if end:
+            query = query.filter(EnergyLog.timestamp <= end)
+        query = query.group_by(EnergyLog.timestamp, Floor.building_id).order_by(EnergyLog.timestamp)
+        
+        delete = LoadRollup.query
+        if start:
+            delete = delete.filter(LoadRollup.bucket_start >= self.bucket_of(start))
+        if end:
+            delete = delete.filter(LoadRollup.bucket_start <= end)
+        delete.delete(synchronize_session=False)
+        
+        buckets = {}
+        campus = {}  # timestamp -> campus total
+        for timestamp, building_id, load in query.yield_per(10000):
+            bucket = buckets.setdefault(self.bucket_of(timestamp), {})
+            bucket.setdefault(('building', building_id), LoadSketch()).add(load)
+            campus[timestamp] = campus.get(timestamp, 0.0) + load
+        
+        for timestamp, load in campus.items():
+            buckets[self.bucket_of(timestamp)].setdefault(('campus', 0), LoadSketch()).add(load)
+        
+        written = 0
+        for bucket_start, sketches in buckets.items():
+            self._upsert(bucket_start, sketches)
+            written += len(sketches)
+        db.session.commit()
+        
+        with self._lock:
+            self.bucket_start = None  # Reload current hour on next tick
+        
+        return written
+    
+    @staticmethod
+    def merged_sketch(scope='campus', scope_id=0, start=None, end=None):
+        """Merge hourly sketches of [start, end] into one sketch (single query)"""
+        query = db.session.query(
+            LoadRollup.sketch,
+            LoadRollup.sample_count,
+            LoadRollup.load_sum,
+            LoadRollup.load_min,
+            LoadRollup.load_max
+        ).filter(
+            LoadRollup.scope == scope,
+            LoadRollup.scope_id == scope_id
+        )
+        if start:
+            query = query.filter(LoadRollup.bucket_start >= LoadRollupWriter.bucket_of(start))
+        if end:
+            query = query.filter(LoadRollup.bucket_start <= end)
+        
+        return LoadSketch.merge_blobs(query.all())
+    
+    @staticmethod
+    def _window(hours=None, start=None, end=None):
+        if start is None and hours:
+            start = datetime.now() - timedelta(hours=hours)
+        return start, end
+    
+    @staticmethod
+    def get_percentiles(building_id=None, quantiles=(0.5, 0.95, 0.99), hours=720, start=None, end=None):
+        """Approximate load percentiles for a building (or campus) over a window"""
+        start, end = LoadRollupWriter._window(hours, start, end)
+        scope, scope_id = ('building', building_id) if building_id else ('campus', 0)
+        sketch = LoadRollupWriter.merged_sketch(scope, scope_id, start, end)
+        values = sketch.quantiles(quantiles)
+        
+        return {
+            'scope': scope,
+            'building_id': building_id,
+            'start': start.isoformat() if start else None,
+            'end': end.isoformat() if end else None,
+            'samples': sketch.count,
+            'min_kw': round(sketch.min, 2) if sketch.min is not None else None,
+            'max_kw': round(sketch.max, 2) if sketch.max is not None else None,
+            'mean_kw': round(sketch.total / sketch.count, 2) if sketch.count else None,
+            'percentiles': {
+                f"p{round(q * 100, 1):g}": (round(v, 2) if v is not None else None)
+                for q, v in zip(quantiles, values)
+            },
+            'relative_error': LoadSketch.ALPHA
+        }
+    
+    @staticmethod
+    def get_load_duration_curve(building_id=None, points=100, hours=720, start=None, end=None):
+        """
+        Load-duration curve: load exceeded for each share of the window's time
+        
+        Returns points sorted from 0% (peak) to 100% (base load)
+        """
+        start, end = LoadRollupWriter._window(hours, start, end)
+        scope, scope_id = ('building', building_id) if building_id else ('campus', 0)
+        sketch = LoadRollupWriter.merged_sketch(scope, scope_id, start, end)
+        
+        points = max(2, min(points, 1000))
+        shares = [i / (points - 1) for i in range(points)]
+        values = sketch.quantiles([1 - s for s in shares])
+        
+        return {
+            'scope': scope,
+            'building_id': building_id,
+            'start': start.isoformat() if start else None,
+            'end': end.isoformat() if end else None,
+            'samples': sketch.count,
+            'curve': [
+                {'percent_time': round(s * 100, 2), 'load_kw': round(v, 2)}
+                for s, v in zip(shares, values) if v is not None
+            ],
+            'relative_error': LoadSketch.ALPHA
+        }
+
+
+# Global rollup writer (fed by the simulator tick)
+load_rollup = LoadRollupWriter()
@@ -0,0 +1,283 @@
+"""
+Hour-of-week OLAP cube
+Keeps per (room|building, weekday, hour) aggregates so heatmaps and
+"when is energy wasted" questions never scan EnergyLog:
+- Updated incrementally at the end of every simulation tick (one upsert batch)
+- Rebuildable from EnergyLog for backfills
+"""
+
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.models import db, EnergyLog, Room, Floor, Building, OccupancyCubeCell
+
+
+class OccupancyCube:
+    """Incrementally maintained hour-of-week cube for occupancy and load heatmaps"""
+    
+    SCOPES = ('room', 'building', 'room_type')
+    METRICS = ('occupancy_rate', 'mean_load_kw', 'peak_load_kw', 'optimized_share', 'wasted_kw')
+    
+    @staticmethod
+    def _upsert(rows):
+        """Merge cell deltas into the cube in a single executemany statement"""
+        if not rows:
+            return
+        
+        table = OccupancyCubeCell.__table__
+        stmt = sqlite_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['scope', 'scope_id', 'day_of_week', 'hour'],
+            set_={
+                'tick_count': table.c.tick_count + stmt.excluded.tick_count,
+                'sample_count': table.c.sample_count + stmt.excluded.sample_count,
+                'occupied_count': table.c.occupied_count + stmt.excluded.occupied_count,
+                'optimized_count': table.c.optimized_count + stmt.excluded.optimized_count,
+                'load_sum': table.c.load_sum + stmt.excluded.load_sum,
+                'load_sq_sum': table.c.load_sq_sum + stmt.excluded.load_sq_sum,
+                'peak_load': func.max(table.c.peak_load, stmt.excluded.peak_load),
+                'wasted_load_sum': table.c.wasted_load_sum + stmt.excluded.wasted_load_sum,
+                'last_updated': stmt.excluded.last_updated,
+            }
+        )
+        db.session.execute(stmt, rows)
+    
+    @staticmethod
+    def record_tick(timestamp, readings):
+        """
+        Fold one simulation tick into the cube
+        
+        Args:
+            timestamp: Tick timestamp (determines the hour-of-week cell)
+            readings: Iterable of (room_id, building_id, total_load, occupancy, optimized)
+        
+        Caller commits (runs inside the simulator's tick transaction)
+        """
+        day_of_week = timestamp.weekday()
+        hour = timestamp.hour
+        now = datetime.now()
+        
+        rows = []
+        buildings = {}
+        
+        for room_id, building_id, total_load, occupancy, optimized in readings:
+            wasted = 0.0 if occupancy else total_load
+            rows.append({
+                'scope': 'room',
+                'scope_id': room_id,
+                'day_of_week': day_of_week,
+                'hour': hour,
+                'tick_count': 1,
+                'sample_count': 1,
+                'occupied_count': int(bool(occupancy)),
+                'optimized_count': int(bool(optimized)),
+                'load_sum': total_load,
+                'load_sq_sum': total_load * total_load,
+                'peak_load': total_load,
+                'wasted_load_sum': wasted,
+                'last_updated': now
+            })
+            
+            agg = buildings.setdefault(building_id, [0, 0, 0, 0.0, 0.0])
+            agg[0] += 1
+            agg[1] += int(bool(occupancy))
+            agg[2] += int(bool(optimized))
+            agg[3] += total_load
+            agg[4] += wasted
+        
+        for building_id, (samples, occupied, optimized, load, wasted) in buildings.items():
+            rows.append({
+                'scope': 'building',
+                'scope_id': building_id,
+                'day_of_week': day_of_week,
+                'hour': hour,
+                'tick_count': 1,
+                'sample_count': samples,
+                'occupied_count': occupied,
+                'optimized_count': optimized,
+                'load_sum': load,
+                'load_sq_sum': load * load,
+                'peak_load': load,
+                'wasted_load_sum': wasted,
+                'last_updated': now
+            })
+        
+        OccupancyCube._upsert(rows)
+    
+    @staticmethod
+    def rebuild():
+        """
+        Recompute the whole cube from EnergyLog (backfills, after bulk imports)
+        Returns number of cells written
+        """
+        # SQLite %w is 0=Sunday; cube uses Python weekday (0=Monday)
+        day_expr = (func.cast(func.strftime('%w', EnergyLog.timestamp), db.Integer) + 6) % 7
+        hour_expr = func.cast(func.strftime('%H', EnergyLog.timestamp), db.Integer)
+        wasted_expr = func.sum(db.case((EnergyLog.occupancy == False, EnergyLog.total_load), else_=0.0))
+        now = datetime.now()
+        
+        OccupancyCubeCell.query.delete()
+        
+        room_rows = db.session.query(
+            EnergyLog.room_id,
+            day_expr.label('day_of_week'),
+            hour_expr.label('hour'),
+            func.count(EnergyLog.id),
+            func.count(db.case((EnergyLog.occupancy == True, 1))),
+            func.count(db.case((EnergyLog.optimized == True, 1))),
+            func.sum(EnergyLog.total_load),
+            func.sum(EnergyLog.total_load * EnergyLog.total_load),
+            func.max(EnergyLog.total_load),
+            wasted_expr
+        ).group_by(EnergyLog.room_id, 'day_of_week', 'hour').all()
+        
+        cells = [
+            {
+                'scope': 'room', 'scope_id': r[0], 'day_of_week': r[1], 'hour': r[2],
+                'tick_count': r[3], 'sample_count': r[3], 'occupied_count': r[4],
+                'optimized_count': r[5], 'load_sum': r[6] or 0.0, 'load_sq_sum': r[7] or 0.0,
+                'peak_load': r[8] or 0.0, 'wasted_load_sum': r[9] or 0.0, 'last_updated': now
+            }
+            for r in room_rows
+        ]
+        
+        # Building cells aggregate per-tick building totals first
+        per_tick = db.session.query(
+            Floor.building_id.label('building_id'),
+            EnergyLog.timestamp.label('timestamp'),
+            func.count(EnergyLog.id).label('samples'),
+            func.count(db.case((EnergyLog.occupancy == True, 1))).label('occupied'),
+            func.count(db.case((EnergyLog.optimized == True, 1))).label('optimized'),
+            func.sum(EnergyLog.total_load).label('load'),
+            wasted_expr.label('wasted')
+        ).join(Room, Room.id == EnergyLog.room_id).join(Floor, Floor.id == Room.floor_id).group_by(
+            Floor.building_id, EnergyLog.timestamp
+        ).subquery()
+        
+        tick_day = (func.cast(func.strftime('%w', per_tick.c.timestamp), db.Integer) + 6) % 7
+        tick_hour = func.cast(func.strftime('%H', per_tick.c.timestamp), db.Integer)
+        
+        building_rows = db.session.query(
+            per_tick.c.building_id,
+            tick_day.label('day_of_week'),
+            tick_hour.label('hour'),
+            func.count(),
+            func.sum(per_tick.c.samples),
+            func.sum(per_tick.c.occupied),
+            func.sum(per_tick.c.optimized),
+            func.sum(per_tick.c.load),
+            func.sum(per_tick.c.load * per_tick.c.load),
+            func.max(per_tick.c.load),
+            func.sum(per_tick.c.wasted)
+        ).group_by(per_tick.c.building_id, 'day_of_week', 'hour').all()
+        
+        cells.extend(
+            {
+                'scope': 'building', 'scope_id': r[0], 'day_of_week': r[1], 'hour': r[2],
+                'tick_count': r[3], 'sample_count': r[4], 'occupied_count': r[5],
+                'optimized_count': r[6], 'load_sum': r[7] or 0.0, 'load_sq_sum': r[8] or 0.0,
+                'peak_load': r[9] or 0.0, 'wasted_load_sum': r[10] or 0.0, 'last_updated': now
+            }
+            for r in building_rows
+        )
+        
+        if cells:
+            db.session.execute(db.insert(OccupancyCubeCell), cells)
+        db.session.commit()
+        
+        return len(cells)
+    
+    @staticmethod
+    def _metric_value(metric, ticks, samples, occupied, optimized, load, peak, wasted):
+        """Derive a heatmap metric from summed cell counters"""
+        if metric == 'occupancy_rate':
+            return round(occupied / samples, 3) if samples else None
+        if metric == 'optimized_share':
+            return round(optimized / samples, 3) if samples else None
+        if metric == 'mean_load_kw':
+            return round(load / ticks, 2) if ticks else None
+        if metric == 'peak_load_kw':
+            return round(peak, 2) if ticks else None
+        if metric == 'wasted_kw':
+            return round(wasted / ticks, 2) if ticks else None
+        return None
+    
+    @staticmethod
+    def get_heatmap(scope='building', scope_id=None, building_id=None, metric='occupancy_rate'):
+        """
+        Build 7x24 (weekday x hour) heatmaps from the cube in a single query
+        
+        Args:
+            scope: 'building', 'room' or 'room_type' (room cells grouped by Room.type)
+            scope_id: Restrict to one building/room id (optional)
+            building_id: Restrict room/room_type heatmaps to one building (optional)
+            metric: One of METRICS
+        
+        Returns:
+            dict with one matrix per entity (None where no samples yet)
+        """
+        if scope not in OccupancyCube.SCOPES:
+            raise ValueError(f"scope must be one of: {list(OccupancyCube.SCOPES)}")
+        if metric not in OccupancyCube.METRICS:
+            raise ValueError(f"metric must be one of: {list(OccupancyCube.METRICS)}")
+        
+        cell = OccupancyCubeCell
+        
+        if scope == 'room_type':
+            # Per-room means: sum over rooms of load / sum over rooms of ticks
+            query = db.session.query(
+                Room.type,
+                Room.type,
+                cell.day_of_week,
+                cell.hour,
+                func.sum(cell.tick_count),
+                func.sum(cell.sample_count),
+                func.sum(cell.occupied_count),
+                func.sum(cell.optimized_count),
+                func.sum(cell.load_sum),
+                func.max(cell.peak_load),
+                func.sum(cell.wasted_load_sum)
+            ).join(Room, Room.id == cell.scope_id).filter(cell.scope == 'room')
+            if building_id:
+                query = query.join(Floor, Floor.id == Room.floor_id).filter(Floor.building_id == building_id)
+            query = query.group_by(Room.type, cell.day_of_week, cell.hour)
+        else:
+            entity = Building if scope == 'building' else Room
+            query = db.session.query(
+                cell.scope_id,
+                entity.name,
+                cell.day_of_week,
+                cell.hour,
+                cell.tick_count,
+                cell.sample_count,
+                cell.occupied_count,
+                cell.optimized_count,
+                cell.load_sum,
+                cell.peak_load,
+                cell.wasted_load_sum
+            ).join(entity, entity.id == cell.scope_id).filter(cell.scope == scope)
+            if scope_id:
+                query = query.filter(cell.scope_id == scope_id)
+            if scope == 'room' and building_id:
+                query = query.join(Floor, Floor.id == Room.floor_id).filter(Floor.building_id == building_id)
+        
+        heatmaps = {}
+        for key, name, day, hour, ticks, samples, occupied, optimized, load, peak, wasted in query.all():
+            entry = heatmaps.get(key)
+            if entry is None:
+                entry = heatmaps[key] = {
+                    'id': key,
+                    'name': name,
+                    'matrix': [[None] * 24 for _ in range(7)]
+                }
+            entry['matrix'][day][hour] = OccupancyCube._metric_value(
+                metric, ticks, samples, occupied, optimized, load, peak, wasted
+            )
+        
+        return {
+            'scope': scope,
+            'metric': metric,
+            'rows': 'day_of_week (0=Monday)',
+            'columns': 'hour (0-23)',
+            'heatmaps': sorted(heatmaps.values(), key=lambda h: h['id'])
+        }
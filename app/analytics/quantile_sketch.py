@@ -0,0 +1,135 @@
+"""
+Mergeable quantile sketch for load values (DDSketch-style log buckets)
+- Relative-error guarantee: every quantile estimate is within ±ALPHA (1%)
+  of the exact sample value at that rank, independent of data size
+- Merging is exact (bucket counts add), so hourly sketches can be combined
+  into arbitrary windows at query time without losing accuracy
+- An hour of per-tick loads needs ~60 buckets (< 1 KB serialized)
+"""
+
+import math
+import struct
+import numpy as np
+
+
+class LoadSketch:
+    """Logarithmically bucketed quantile sketch with relative accuracy ALPHA"""
+    
+    ALPHA = 0.01
+    GAMMA = (1 + ALPHA) / (1 - ALPHA)
+    LOG_GAMMA = math.log(GAMMA)
+    MIN_VALUE = 0.001  # kW; smaller loads (cutoffs) are counted exactly as zero
+    _HEADER = struct.Struct('<II')  # zero_count, bucket count
+    
+    def __init__(self):
+        self.buckets = {}  # bucket index -> count
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+    
+    @classmethod
+    def _index(cls, value):
+        return int(math.ceil(math.log(value) / cls.LOG_GAMMA))
+    
+    @classmethod
+    def _value(cls, index):
+        # Midpoint (in relative terms) of (gamma^(i-1), gamma^i]
+        return 2 * cls.GAMMA ** index / (cls.GAMMA + 1)
+    
+    def add(self, value):
+        if value < self.MIN_VALUE:
+            self.zero_count += 1
+            value = 0.0 if value < 0 else value
+        else:
+            idx = self._index(value)
+            self.buckets[idx] = self.buckets.get(idx, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+    
+    def merge(self, other):
+        for idx, c in other.buckets.items():
+            self.buckets[idx] = self.buckets.get(idx, 0) + c
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+    
+    def quantiles(self, qs):
+        """Estimate several quantiles (0-1) in one pass over the sorted buckets"""
+        if not self.count:
+            return [None] * len(qs)
+        
+        indexes = sorted(self.buckets)
+        counts = np.cumsum([self.zero_count] + [self.buckets[i] for i in indexes])
+        results = []
+        for q in qs:
+            rank = q * (self.count - 1)
+            pos = int(np.searchsorted(counts, rank, side='right'))
+            if pos == 0:
+                value = 0.0
+            else:
+                value = self._value(indexes[min(pos - 1, len(indexes) - 1)])
+            results.append(min(max(value, self.min), self.max))
+        return results
+    
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+    
+    def to_bytes(self):
+        """Compact binary form: header + int32 bucket indexes + uint32 counts"""
+        indexes = np.fromiter(self.buckets.keys(), dtype=np.int32, count=len(self.buckets))
+        counts = np.fromiter(self.buckets.values(), dtype=np.uint32, count=len(self.buckets))
+        return self._HEADER.pack(self.zero_count, len(indexes)) + indexes.tobytes() + counts.tobytes()
+    
+    @classmethod
+    def from_bytes(cls, blob, count=0, total=0.0, minimum=None, maximum=None):
+        """Rebuild a sketch; count/total/min/max are stored beside the blob"""
+        sketch = cls()
+        zero_count, n = cls._HEADER.unpack_from(blob)
+        offset = cls._HEADER.size
+        indexes = np.frombuffer(blob, dtype=np.int32, count=n, offset=offset)
+        counts = np.frombuffer(blob, dtype=np.uint32, count=n, offset=offset + 4 * n)
+        sketch.buckets = dict(zip(indexes.tolist(), counts.tolist()))
+        sketch.zero_count = zero_count
+        sketch.count = count
+        sketch.total = total
+        sketch.min = minimum
+        sketch.max = maximum
+        return sketch
+    
+    @classmethod
+    def merge_blobs(cls, rows):
+        """
+        Merge many serialized sketches at once (vectorized)
+        
+        Args:
+            rows: Iterable of (blob, count, total, min, max)
+        """
+        sketch = cls()
+        all_indexes = []
+        all_counts = []
+        for blob, count, total, minimum, maximum in rows:
+            zero_count, n = cls._HEADER.unpack_from(blob)
+            offset = cls._HEADER.size
+            all_indexes.append(np.frombuffer(blob, dtype=np.int32, count=n, offset=offset))
+            all_counts.append(np.frombuffer(blob, dtype=np.uint32, count=n, offset=offset + 4 * n))
+            sketch.zero_count += zero_count
+            sketch.count += count
+            sketch.total += total
+            if minimum is not None:
+                sketch.min = minimum if sketch.min is None else min(sketch.min, minimum)
+                sketch.max = maximum if sketch.max is None else max(sketch.max, maximum)
+        
+        if all_indexes:
+            indexes = np.concatenate(all_indexes)
+            counts = np.concatenate(all_counts).astype(np.int64)
+            unique, inverse = np.unique(indexes, return_inverse=True)
+            sketch.buckets = dict(zip(unique.tolist(), np.bincount(inverse, weights=counts).astype(np.int64).tolist()))
+        
+        return sketch
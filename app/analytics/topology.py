@@ -0,0 +1,151 @@
+"""
+Campus topology snapshot (faculty -> building -> floor -> room)
+- Loaded with one column-only query per level (no ORM objects, no lazy
+  relationship loads) into read-only maps of named tuples plus numpy index
+  arrays: room_id -> floor / building / faculty is one array lookup
+- Versioned by the data_version 'topology' domain: create/update/delete of
+  rooms, floors and buildings bump it after their commit and the next reader
+  rebuilds; every other request shares the same immutable snapshot
+- The version is shared across workers, so an edit in one process is seen
+  by all of them
+"""
+
+import threading
+from types import MappingProxyType
+from collections import namedtuple
+import numpy as np
+from app.models import db, Faculty, Building, Floor, Room
+from app.utils.data_version import data_version
+
+FacultyNode = namedtuple('FacultyNode', 'id name building_ids')
+BuildingNode = namedtuple('BuildingNode', 'id name faculty_id floor_ids room_count')
+FloorNode = namedtuple('FloorNode', 'id number building_id room_ids')
+RoomNode = namedtuple('RoomNode', 'id name type capacity base_load_kw floor_id')
+
+
+def _index_array(size, pairs):
+    """Read-only int32 array: array[key] = value, -1 where unset"""
+    array = np.full(size, -1, dtype=np.int32)
+    for key, value in pairs:
+        array[key] = value
+    array.flags.writeable = False
+    return array
+
+
+class TopologySnapshot:
+    """Immutable campus hierarchy at one topology version (maps are ordered by id)"""
+    
+    def __init__(self, version, faculty_rows, building_rows, floor_rows, room_rows):
+        self.version = version
+        
+        rooms_of_floor = {}
+        for row in room_rows:
+            rooms_of_floor.setdefault(row.floor_id, []).append(row.id)
+        floors_of_building = {}
+        for row in floor_rows:
+            floors_of_building.setdefault(row.building_id, []).append(row.id)
+        buildings_of_faculty = {}
+        for row in building_rows:
+            buildings_of_faculty.setdefault(row.faculty_id, []).append(row.id)
+        
+        self.rooms = MappingProxyType({row.id: RoomNode(*row) for row in room_rows})
+        self.floors = MappingProxyType({
+            row.id: FloorNode(row.id, row.number, row.building_id, tuple(rooms_of_floor.get(row.id, ())))
+            for row in floor_rows
+        })
+        self.buildings = MappingProxyType({
+            row.id: BuildingNode(
+                row.id, row.name, row.faculty_id,
+                tuple(floors_of_building.get(row.id, ())),
+                sum(len(self.floors[floor_id].room_ids) for floor_id in floors_of_building.get(row.id, ()))
+            )
+            for row in building_rows
+        })
+        self.faculties = MappingProxyType({
+            row.id: FacultyNode(row.id, row.name, tuple(buildings_of_faculty.get(row.id, ())))
+            for row in faculty_rows
+        })
+        
+        # room_id -> floor_id / building_id / faculty_id (-1: no such room)
+        size = max(self.rooms, default=0) + 1
+        self.room_floor = _index_array(size, ((room.id, room.floor_id) for room in self.rooms.values()))
+        self.room_building = _index_array(size, (
+            (room.id, self.floors[room.floor_id].building_id)
+            for room in self.rooms.values() if room.floor_id in self.floors
+        ))
+        self.room_faculty = _index_array(size, (
+            (room_id, self.buildings[building_id].faculty_id)
+            for room_id, building_id in enumerate(self.room_building.tolist())
+            if building_id in self.buildings
+        ))
+    
+    def building_of(self, room_id):
+        """Building id of a room (None if unknown)"""
+        if 0 <= room_id < len(self.room_building):
+            building_id = int(self.room_building[room_id])
+            return building_id if building_id >= 0 else None
+        return None
+    
+    def building_room_ids(self, building_id):
+        """Room ids of a building, floor by floor"""
+        building = self.buildings.get(building_id)
+        if building is None:
+            return []
+        return [room_id for floor_id in building.floor_ids for room_id in self.floors[floor_id].room_ids]
+    
+    def get_statistics(self):
+        return {
+            'total_faculties': len(self.faculties),
+            'total_buildings': len(self.buildings),
+            'total_floors': len(self.floors),
+            'total_rooms': len(self.rooms)
+        }
+
+
+class TopologyStore:
+    """Holds the current snapshot; rebuilds it when the topology version moves"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self.builds = 0
+    
+    @staticmethod
+    def _load(version):
+        faculty_rows = db.session.query(Faculty.id, Faculty.name).order_by(Faculty.id).all()
+        building_rows = db.session.query(Building.id, Building.name, Building.faculty_id).order_by(Building.id).all()
+        floor_rows = db.session.query(Floor.id, Floor.number, Floor.building_id).order_by(Floor.id).all()
+        room_rows = db.session.query(
+            Room.id, Room.name, Room.type, Room.capacity, Room.base_load_kw, Room.floor_id
+        ).order_by(Room.id).all()
+        return TopologySnapshot(version, faculty_rows, building_rows, floor_rows, room_rows)
+    
+    def get(self):
+        """
+        Current snapshot (built on first use and after each topology bump)
+        
+        The version is read before loading: an edit committed during the load
+        leaves the snapshot looking stale, so it is simply rebuilt again.
+        """
+        version = data_version.get('topology')
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = self._load(version)
+                self.builds += 1
+            return self._snapshot
+    
+    def get_stats(self):
+        snapshot = self._snapshot
+        return {
+            'version': snapshot.version if snapshot else None,
+            'builds': self.builds,
+            **(snapshot.get_statistics() if snapshot else {})
+        }
+
+
+# Global store (used by the hierarchy endpoints and the simulator)
+topology = TopologyStore()
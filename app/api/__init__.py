@@ -1,5 +1,57 @@
-from flask import Blueprint
+import time
+from flask import Blueprint, request, g
+from app.utils.compression import compress_response
+from app.utils.metrics import metrics, query_count
+from app.utils.sql_profiler import sql_profiler
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+
+@api_bp.before_request
+def start_request_metrics():
+    g.metrics_started = (time.perf_counter(), query_count())
+
+
+# Registered before compression so it runs after it (after_request hooks run in reverse)
+@api_bp.after_request
+def record_request_metrics(response):
+    """Latency, status, DB queries and response bytes per route template"""
+    started = g.get('metrics_started')
+    if started is None:
+        return response
+    seconds = time.perf_counter() - started[0]
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    labels = {'route': route, 'method': request.method}
+    
+    metrics.inc('voltonic_http_requests_total', status=str(response.status_code), **labels)
+    metrics.observe('voltonic_http_request_duration_seconds', seconds, **labels)
+    metrics.inc('voltonic_http_db_queries_total', query_count() - started[1], **labels)
+    if response.content_length:  # Unknown for streamed bodies
+        metrics.inc('voltonic_http_response_bytes_total', response.content_length, **labels)
+    metrics.publish()
+    return response
+
+
+@api_bp.before_request
+def start_sql_profile():
+    if sql_profiler.enabled:
+        g.sql_profile = sql_profiler.start(f'{request.method} {request.full_path.rstrip("?")}')
+
+
+@api_bp.after_request
+def finish_sql_profile(response):
+    """Server-Timing header and N+1 report (VOLTONIC_SQL_PROFILE=1 only)"""
+    profile = g.pop('sql_profile', None)
+    if profile is not None:
+        sql_profiler.finish(profile)
+        response.headers['Server-Timing'] = profile.server_timing()
+    return response
+
+
+@api_bp.after_request
+def compress_api_response(response):
+    """gzip/br large API responses when the client accepts it"""
+    return compress_response(response, request.headers.get('Accept-Encoding'))
+
+
 from app.api import routes
@@ -1,17 +1,44 @@
-from flask import jsonify, request
+import os
+import json
+import time
+from flask import jsonify, request, Response, stream_with_context, current_app, send_file
 from datetime import datetime, timedelta
+from sqlalchemy.orm import joinedload
 from app.api import api_bp
 from app.models import (
     db, Room, Building, Floor, Faculty, EnergyLog, Timetable, EnergySource, GridStatus,
-    AutonomousLog, CancellationPattern, PowerSourceConfig
+    AutonomousLog, CancellationPattern, PowerSourceConfig, DemandPeak, WasterRanking, Job
 )
 from app.analytics.analytics import EnergyAnalytics
+from app.analytics.occupancy_cube import OccupancyCube
+from app.analytics.anomaly_detector import anomaly_detector
+from app.analytics.demand_tracker import demand_tracker
+from app.analytics.load_rollup import LoadRollupWriter
+from app.analytics.dashboard_bundle import DashboardBundle
+from app.analytics.campus_series import CampusSeriesStore
+from app.analytics.downsampling import lttb_indices
+from app.analytics.topology import topology
+from app.analytics.energy_flow import cached_energy_flow
 from app.optimization.optimizer import EnergyOptimizer
 from app.optimization.smart_power_controller import SmartPowerController
-from app.prediction.predictor import EnergyPredictor
+from app.prediction.predictor import EnergyPredictor, cached_next_hour_prediction, cached_30_minute_prediction
 from app.simulation.engine import IoTSimulator
-from app.utils.rate_limiter import rate_limit
-from app.utils.prediction_cache import prediction_cache
+from app.utils.rate_limiter import rate_limit, rate_limiter
+from app.utils.admission import admission_control, admission
+from app.utils.function_cache import function_caches
+from app.utils.response_cache import response_cache
+from app.utils.data_version import data_version, conditional_get, TICK_SECONDS
+from app.utils.live_stream import live_broadcaster, format_notification
+from app.utils.pagination import keyset_paginate, parse_limit
+from app.utils.export_data import stream_export, FORMATS, DATASETS, GZIP_MIMETYPE
+from app.utils.arrow_format import wants_arrow, fetch_columns, arrow_response
+from app.utils.change_feed import change_feed, SyncCursorExpired, KINDS as CHANGE_KINDS
+from app.utils.leader import scheduler_leader
+from app.utils.worker_ipc import worker_channel, worker_client
+from app.utils.jobs import job_queue, serialize_job, STATUSES as JOB_STATUSES
+from app.utils.system_stats import system_stats
+from app.utils.metrics import metrics
+from app.utils.sql_profiler import sql_profiler
 
 # Initialize predictor
 predictor = EnergyPredictor()
@@ -21,13 +48,16 @@ predictor = EnergyPredictor()
 # ============================================================================
 
 @api_bp.route('/dashboard/live', methods=['GET'])
+@conditional_get('tick', 'topology', 'grid')
 def get_live_dashboard():
     """Get real-time campus dashboard data"""
     try:
         campus_load = EnergyAnalytics.get_live_campus_load()
         
-        # Get optimization savings
-        savings = EnergyOptimizer.get_savings_summary()
+        # Get optimization savings (all-time count from the maintained counter)
+        savings = EnergyOptimizer.get_savings_summary(
+            total_optimized=system_stats.count(system_stats.get_counters(), 'energy_log.optimized')
+        )
         
         # Get latest timestamp
         latest_time = db.session.query(db.func.max(EnergyLog.timestamp)).scalar()
@@ -44,7 +74,36 @@ def get_live_dashboard():
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+@api_bp.route('/dashboard/bundle', methods=['GET'])
+@conditional_get('tick', 'topology', 'grid', 'model')
+def get_dashboard_bundle():
+    """Several dashboard panels in one request, computed from one shared snapshot
+    
+    Query params:
+    - panels: Comma-separated panel names (default: live,optimization,prediction,solar,hybrid,notifications)
+      Available: live, optimization, buildings, prediction, prediction_30min, solar, hybrid, notifications
+    - minutes: Notification window (default: 10)
+    """
+    try:
+        panels_arg = request.args.get('panels')
+        panels = [p.strip() for p in panels_arg.split(',') if p.strip()] if panels_arg else None
+        minutes = request.args.get('minutes', default=10, type=int)
+        
+        results, errors = DashboardBundle.build(panels, predictor=predictor, minutes=minutes)
+        
+        return jsonify({
+            'status': 'success',
+            'data': results,
+            'errors': errors
+        }), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
 @api_bp.route('/live/campus', methods=['GET'])
+@conditional_get('tick', 'topology')
 def get_campus_live_load():
     """Get current total campus energy consumption"""
     try:
@@ -55,6 +114,7 @@ def get_campus_live_load():
 
 
 @api_bp.route('/live/buildings', methods=['GET'])
+@conditional_get('tick', 'topology')
 def get_all_buildings_live():
     """Get current load for all buildings"""
     try:
@@ -65,6 +125,7 @@ def get_all_buildings_live():
 
 
 @api_bp.route('/live/building/<int:building_id>', methods=['GET'])
+@conditional_get('tick', 'topology')
 def get_building_live_load(building_id):
     """Get current load for a specific building"""
     try:
@@ -79,10 +140,15 @@ def get_building_live_load(building_id):
 # ============================================================================
 
 @api_bp.route('/analytics/hourly', methods=['GET'])
+@conditional_get('tick')
 def get_hourly_analytics():
-    """Get hourly consumption data"""
+    """Get hourly consumption data (JSON, or Arrow IPC via Accept header)"""
     try:
         hours = request.args.get('hours', default=24, type=int)
+        if wants_arrow():
+            names, columns = fetch_columns(EnergyAnalytics.hourly_consumption_query(hours).statement)
+            return arrow_response(names, columns, {'hour': 'timestamp', 'readings': 'int'})
+        
         data = EnergyAnalytics.get_hourly_consumption(hours=hours)
         return jsonify({'status': 'success', 'data': data}), 200
     except Exception as e:
@@ -90,10 +156,15 @@ def get_hourly_analytics():
 
 
 @api_bp.route('/analytics/daily', methods=['GET'])
+@conditional_get('tick')
 def get_daily_analytics():
-    """Get daily consumption summary"""
+    """Get daily consumption summary (JSON, or Arrow IPC via Accept header)"""
     try:
         days = request.args.get('days', default=7, type=int)
+        if wants_arrow():
+            names, columns = fetch_columns(EnergyAnalytics.daily_summary_query(days).statement)
+            return arrow_response(names, columns, {'date': 'date', 'readings': 'int', 'optimized': 'int'})
+        
         data = EnergyAnalytics.get_daily_summary(days=days)
         return jsonify({'status': 'success', 'data': data}), 200
     except Exception as e:
@@ -101,6 +172,7 @@ def get_daily_analytics():
 
 
 @api_bp.route('/analytics/building-comparison', methods=['GET'])
+@conditional_get('tick', 'topology')
 def get_building_comparison():
     """Compare energy usage across all buildings"""
     try:
@@ -110,11 +182,204 @@ def get_building_comparison():
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+@api_bp.route('/analytics/heatmap', methods=['GET'])
+@conditional_get('tick', 'topology')
+def get_hour_of_week_heatmap():
+    """Get weekday x hour heatmaps from the hour-of-week cube
+    
+    Query params:
+    - scope: building | room | room_type (default: building)
+    - id: Restrict to one building/room (optional)
+    - building_id: Restrict room/room_type heatmaps to one building (optional)
+    - metric: occupancy_rate | mean_load_kw | peak_load_kw | optimized_share | wasted_kw
+    """
+    try:
+        scope = request.args.get('scope', default='building')
+        scope_id = request.args.get('id', type=int)
+        building_id = request.args.get('building_id', type=int)
+        metric = request.args.get('metric', default='occupancy_rate')
+        
+        data = OccupancyCube.get_heatmap(scope, scope_id, building_id, metric)
+        return jsonify({'status': 'success', 'data': data}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+
+@api_bp.route('/analytics/top-wasters', methods=['GET'])
+@conditional_get('tick', 'topology')
+def get_top_wasters():
+    """Get rooms wasting the most energy (load drawn while unoccupied)
+    
+    Query params:
+    - limit: Number of rooms (default: 20, max: 20)
+    - day: YYYY-MM-DD for a closed day (default: today, live ranking)
+    """
+    try:
+        limit = min(request.args.get('limit', default=20, type=int), demand_tracker.TOP_K)
+        day_str = request.args.get('day')
+        live = demand_tracker.live_top_wasters(limit)
+        
+        if day_str and day_str != live['day']:
+            day = datetime.fromisoformat(day_str).date()
+            rankings = WasterRanking.query.filter_by(day=day).order_by(WasterRanking.rank).limit(limit).all()
+            day_label = day.isoformat()
+            wasters = [{'room_id': r.room_id, 'wasted_kwh': r.wasted_kwh} for r in rankings]
+            source = 'persisted'
+        else:
+            day_label = live['day']
+            wasters = live['wasters']
+            source = 'live'
+        
+        # Resolve names for the (at most TOP_K) ranked rooms in one query
+        names = {}
+        if wasters:
+            rows = db.session.query(Room.id, Room.name, Room.type, Floor.building_id).join(
+                Floor, Floor.id == Room.floor_id
+            ).filter(Room.id.in_([w['room_id'] for w in wasters])).all()
+            names = {r.id: r for r in rows}
+        
+        for rank, waster in enumerate(wasters, 1):
+            room = names.get(waster['room_id'])
+            waster['rank'] = rank
+            waster['room_name'] = room.name if room else None
+            waster['room_type'] = room.type if room else None
+            waster['building_id'] = room.building_id if room else None
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'day': day_label,
+                'source': source,
+                'wasters': wasters
+            }
+        }), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@api_bp.route('/analytics/peak-demand', methods=['GET'])
+@conditional_get('tick', 'topology')
+def get_peak_demand():
+    """Get running peak/mean/p95 demand for the campus and each building
+    
+    Query params:
+    - window: day | month (default: month)
+    """
+    try:
+        window = request.args.get('window', default='month')
+        data = demand_tracker.live_peaks(window)
+        return jsonify({'status': 'success', 'data': data}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@api_bp.route('/analytics/peak-demand/history', methods=['GET'])
+@conditional_get('tick', 'topology')
+def get_peak_demand_history():
+    """Get persisted peak demand for closed day/month windows
+    
+    Query params:
+    - window: day | month (default: day)
+    - building_id: Building scope (default: campus)
+    - limit: Number of windows (default: 31)
+    """
+    try:
+        window = request.args.get('window', default='day')
+        building_id = request.args.get('building_id', type=int)
+        limit = request.args.get('limit', default=31, type=int)
+        
+        query = DemandPeak.query.filter(
+            DemandPeak.window == window,
+            DemandPeak.scope == ('building' if building_id else 'campus'),
+            DemandPeak.scope_id == (building_id or 0)
+        ).order_by(DemandPeak.window_start.desc()).limit(limit)
+        
+        data = [{
+            'window_start': row.window_start.isoformat(),
+            'peak_kw': row.peak_kw,
+            'peak_at': row.peak_at.isoformat(),
+            'mean_kw': row.mean_kw,
+            'p95_kw': row.p95_kw,
+            'samples': row.sample_count
+        } for row in query.all()]
+        
+        return jsonify({'status': 'success', 'data': data, 'count': len(data)}), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+def _parse_window_args():
+    """Read hours/start/end query params shared by rollup endpoints"""
+    hours = request.args.get('hours', default=720, type=int)
+    start_str = request.args.get('start')
+    end_str = request.args.get('end')
+    start = datetime.fromisoformat(start_str) if start_str else None
+    end = datetime.fromisoformat(end_str) if end_str else None
+    return hours, start, end
+
+
+@api_bp.route('/analytics/percentiles', methods=['GET'])
+@conditional_get('tick')
+def get_load_percentiles():
+    """Get approximate load percentiles from merged hourly sketches
+    
+    Query params:
+    - building_id: Building scope (default: campus)
+    - q: Comma-separated quantiles (default: 0.5,0.95,0.99)
+    - hours: Window length ending now (default: 720), or
+    - start / end: ISO datetimes
+    """
+    try:
+        building_id = request.args.get('building_id', type=int)
+        q_str = request.args.get('q', default='0.5,0.95,0.99')
+        quantiles = [float(q) for q in q_str.split(',') if q.strip()]
+        if not quantiles or any(q < 0 or q > 1 for q in quantiles):
+            return jsonify({'status': 'error', 'message': 'q must be values between 0 and 1'}), 400
+        
+        hours, start, end = _parse_window_args()
+        data = LoadRollupWriter.get_percentiles(building_id, quantiles, hours, start, end)
+        return jsonify({'status': 'success', 'data': data}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@api_bp.route('/analytics/load-duration', methods=['GET'])
+@conditional_get('tick')
+def get_load_duration_curve():
+    """Get a load-duration curve from merged hourly sketches
+    
+    Query params:
+    - building_id: Building scope (default: campus)
+    - points: Curve resolution (default: 100, max: 1000)
+    - hours: Window length ending now (default: 720), or
+    - start / end: ISO datetimes
+    """
+    try:
+        building_id = request.args.get('building_id', type=int)
+        points = request.args.get('points', default=100, type=int)
+        hours, start, end = _parse_window_args()
+        data = LoadRollupWriter.get_load_duration_curve(building_id, points, hours, start, end)
+        return jsonify({'status': 'success', 'data': data}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 # ============================================================================
 # OPTIMIZATION ENDPOINTS
 # ============================================================================
 
 @api_bp.route('/optimization/savings', methods=['GET'])
+@conditional_get('tick')
 def get_optimization_savings():
     """Get total energy savings from optimization"""
     try:
@@ -132,6 +397,7 @@ def get_optimization_savings():
 
 
 @api_bp.route('/optimization/status', methods=['GET'])
+@conditional_get('tick', 'topology')
 def get_optimization_status():
     """Get current optimization statistics"""
     try:
@@ -172,35 +438,19 @@ def get_optimization_status():
 
 @api_bp.route('/prediction/next-hour', methods=['GET'])
 @rate_limit(max_requests=10, window_seconds=60)
+@conditional_get('tick', 'model')
 def predict_next_hour():
-    """Predict energy consumption for next hour (cached for 10 minutes)"""
+    """Predict energy consumption for next hour (cached until the next tick, 10 minutes at most)"""
     try:
-        # Check cache first
-        cached_prediction = prediction_cache.get('next_hour_prediction')
-        if cached_prediction:
-            return jsonify({
-                'status': 'success', 
-                'data': cached_prediction,
-                'cached': True
-            }), 200
-        
-        # Load model if not already loaded
-        if not predictor.is_trained:
-            predictor.load_model()
-        
-        prediction, error = predictor.predict_next_hour()
-        
-        if error:
-            return jsonify({'status': 'error', 'message': error}), 400
-        
-        # Cache the prediction
-        prediction_cache.set(prediction, 'next_hour_prediction')
+        prediction, hit = cached_next_hour_prediction.lookup(predictor)
         
         return jsonify({
             'status': 'success', 
             'data': prediction,
-            'cached': False
+            'cached': hit
         }), 200
+    except LookupError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -208,25 +458,24 @@ def predict_next_hour():
 @api_bp.route('/prediction/train', methods=['POST'])
 @rate_limit(max_requests=5, window_seconds=60)
 def train_prediction_model():
-    """Manually trigger model training (rate limited to prevent abuse)"""
+    """Queue model training as a background job (rate limited to prevent abuse)
+    
+    Returns 202 with the job at once; poll /jobs/<id> for progress. While a
+    training job is queued or running, that job is returned instead of a new one.
+    """
     try:
-        hours_back = request.json.get('hours_back', 168) if request.json else 168
-        
-        success, result = predictor.train_model(hours_back=hours_back)
-        
-        if not success:
-            return jsonify({'status': 'error', 'message': result}), 400
-        
-        # Clear prediction cache after retraining
-        prediction_cache.clear('next_hour_prediction')
-        
-        return jsonify({'status': 'success', 'data': result}), 200
+        params = {'hours_back': request.json.get('hours_back', 168) if request.json else 168}
+        job, created = job_queue.submit('train', params)
+        return _job_accepted(job, created)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
 @api_bp.route('/prediction/model-info', methods=['GET'])
 @rate_limit(max_requests=10, window_seconds=60)
+@conditional_get('model')
 def get_model_info():
     """Get ML model information and feature importance"""
     try:
@@ -239,8 +488,11 @@ def get_model_info():
         if error:
             return jsonify({'status': 'error', 'message': error}), 400
         
-        # Get cache info
-        cache_info = prediction_cache.get_cache_info()
+        # Prediction cache stats (hits, misses, coalesced, evictions)
+        cache_info = {
+            cache.name: cache.get_stats()
+            for cache in (cached_next_hour_prediction.cache, cached_30_minute_prediction.cache)
+        }
         
         return jsonify({
             'status': 'success',
@@ -260,42 +512,37 @@ def get_model_info():
 # ============================================================================
 
 @api_bp.route('/campus/structure', methods=['GET'])
+@conditional_get('topology', cache=True)
 def get_campus_structure():
     """Get complete campus hierarchy"""
     try:
-        faculties = Faculty.query.all()
+        snapshot = topology.get()
         
         structure = []
-        for faculty in faculties:
+        for faculty in snapshot.faculties.values():
             faculty_data = {
                 'id': faculty.id,
                 'name': faculty.name,
                 'buildings': []
             }
             
-            for building in faculty.buildings:
+            for building_id in faculty.building_ids:
+                building = snapshot.buildings[building_id]
                 building_data = {
                     'id': building.id,
                     'name': building.name,
-                    'floor_count': len(building.floors),
-                    'room_count': sum(len(floor.rooms) for floor in building.floors)
+                    'floor_count': len(building.floor_ids),
+                    'room_count': building.room_count
                 }
                 faculty_data['buildings'].append(building_data)
             
             structure.append(faculty_data)
         
-        total_stats = {
-            'total_faculties': Faculty.query.count(),
-            'total_buildings': Building.query.count(),
-            'total_floors': Floor.query.count(),
-            'total_rooms': Room.query.count()
-        }
-        
         return jsonify({
             'status': 'success',
             'data': {
                 'structure': structure,
-                'statistics': total_stats
+                'statistics': snapshot.get_statistics()
             }
         }), 200
     except Exception as e:
@@ -303,29 +550,30 @@ def get_campus_structure():
 
 
 @api_bp.route('/campus/faculties', methods=['GET'])
+@conditional_get('topology')
 def get_faculties():
     """Get all faculties"""
     try:
-        faculties = Faculty.query.all()
-        data = [{'id': f.id, 'name': f.name} for f in faculties]
+        data = [{'id': f.id, 'name': f.name} for f in topology.get().faculties.values()]
         return jsonify({'status': 'success', 'data': data}), 200
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
 @api_bp.route('/campus/buildings', methods=['GET'])
+@conditional_get('topology')
 def get_buildings():
     """Get all buildings"""
     try:
-        buildings = Building.query.all()
+        snapshot = topology.get()
         data = [
             {
                 'id': b.id,
                 'name': b.name,
                 'faculty_id': b.faculty_id,
-                'faculty_name': b.faculty.name
+                'faculty_name': snapshot.faculties[b.faculty_id].name
             }
-            for b in buildings
+            for b in snapshot.buildings.values()
         ]
         return jsonify({'status': 'success', 'data': data}), 200
     except Exception as e:
@@ -333,11 +581,20 @@ def get_buildings():
 
 
 @api_bp.route('/campus/rooms', methods=['GET'])
+@conditional_get('topology')
 def get_rooms():
-    """Get rooms with optional filtering"""
+    """Get rooms with optional filtering (cursor-paginated by id)
+    
+    Query params:
+    - type: Filter by room type (optional)
+    - building_id: Filter by building (optional)
+    - limit: Page size (default: 100, max: 1000)
+    - cursor: next_cursor/prev_cursor from a previous page (optional)
+    """
     try:
         room_type = request.args.get('type')
         building_id = request.args.get('building_id', type=int)
+        limit = parse_limit(request.args.get('limit', type=int), default=100, maximum=1000)
         
         query = Room.query
         
@@ -347,7 +604,9 @@ def get_rooms():
         if building_id:
             query = query.join(Floor).filter(Floor.building_id == building_id)
         
-        rooms = query.limit(100).all()  # Limit to prevent huge responses
+        rooms, pagination = keyset_paginate(
+            query, [Room.id], limit, request.args.get('cursor'), descending=False
+        )
         
         data = [
             {
@@ -360,20 +619,28 @@ def get_rooms():
             for r in rooms
         ]
         
-        return jsonify({'status': 'success', 'data': data, 'count': len(data)}), 200
+        return jsonify({'status': 'success', 'data': data, 'count': len(data), 'pagination': pagination}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
 @api_bp.route('/campus/room/<int:room_id>', methods=['GET'])
+@conditional_get('tick', 'topology')
 def get_room_details(room_id):
     """Get detailed information for a specific room"""
     try:
-        room = Room.query.get(room_id)
+        snapshot = topology.get()
+        room = snapshot.rooms.get(room_id)
         
         if not room:
             return jsonify({'status': 'error', 'message': 'Room not found'}), 404
         
+        floor = snapshot.floors[room.floor_id]
+        building = snapshot.buildings[floor.building_id]
+        faculty = snapshot.faculties[building.faculty_id]
+        
         # Get latest energy log for this room
         latest_log = EnergyLog.query.filter_by(room_id=room_id).order_by(
             EnergyLog.timestamp.desc()
@@ -389,16 +656,16 @@ def get_room_details(room_id):
             'capacity': room.capacity,
             'base_load_kw': room.base_load_kw,
             'floor': {
-                'id': room.floor.id,
-                'number': room.floor.number
+                'id': floor.id,
+                'number': floor.number
             },
             'building': {
-                'id': room.floor.building.id,
-                'name': room.floor.building.name
+                'id': building.id,
+                'name': building.name
             },
             'faculty': {
-                'id': room.floor.building.faculty.id,
-                'name': room.floor.building.faculty.name
+                'id': faculty.id,
+                'name': faculty.name
             },
             'latest_reading': {
                 'timestamp': latest_log.timestamp.isoformat(),
@@ -420,10 +687,11 @@ def get_room_details(room_id):
 # ============================================================================
 
 @api_bp.route('/buildings', methods=['GET'])
+@conditional_get('tick', 'topology', cache=True)
 def get_all_buildings():
     """Get all buildings with their structure and active energy sources"""
     try:
-        buildings = Building.query.all()
+        snapshot = topology.get()
         
         # Get latest active sources for all rooms to determine building connections
         latest_time = db.session.query(db.func.max(EnergyLog.timestamp)).scalar()
@@ -437,29 +705,29 @@ def get_all_buildings():
                 .all()
             # SQLAlchemy returns tuples for specific column queries
             room_sources = {log[0]: log[1] for log in logs}
-            
+        
         buildings_data = []
         
-        for building in buildings:
+        for building in snapshot.buildings.values():
             building_sources = set()
             floors_data = []
             
-            for floor in building.floors:
+            for floor_id in building.floor_ids:
+                floor = snapshot.floors[floor_id]
                 rooms_by_type = {}
-                for room in floor.rooms:
-                    if room.type not in rooms_by_type:
-                        rooms_by_type[room.type] = 0
-                    rooms_by_type[room.type] += 1
+                for room_id in floor.room_ids:
+                    room_type = snapshot.rooms[room_id].type
+                    rooms_by_type[room_type] = rooms_by_type.get(room_type, 0) + 1
                     
                     # Track active source for this room
-                    if room.id in room_sources:
+                    if room_id in room_sources:
                         # Normalize source name to lowercase just in case
-                        building_sources.add(room_sources[room.id].lower())
+                        building_sources.add(room_sources[room_id].lower())
                 
                 floors_data.append({
                     'id': floor.id,
                     'number': floor.number,
-                    'total_rooms': len(floor.rooms),
+                    'total_rooms': len(floor.room_ids),
                     'rooms_by_type': rooms_by_type
                 })
             
@@ -471,9 +739,9 @@ def get_all_buildings():
                 'id': building.id,
                 'name': building.name,
                 'faculty_id': building.faculty_id,
-                'faculty_name': building.faculty.name,
-                'total_floors': len(building.floors),
-                'total_rooms': sum(len(floor.rooms) for floor in building.floors),
+                'faculty_name': snapshot.faculties[building.faculty_id].name,
+                'total_floors': len(building.floor_ids),
+                'total_rooms': building.room_count,
                 'active_sources': list(building_sources),
                 'floors': floors_data
             })
@@ -487,56 +755,37 @@ def get_all_buildings():
 
 
 @api_bp.route('/buildings/<int:building_id>/energy-flow', methods=['GET'])
+@conditional_get('tick', 'topology', 'grid', cache=True)
 def get_building_energy_flow(building_id):
     """Get real-time energy flow visualization for a building"""
     try:
-        building = Building.query.get_or_404(building_id)
-        
-        # Get latest energy logs for all rooms in this building
-        latest_time = db.session.query(db.func.max(EnergyLog.timestamp)).scalar()
-        if not latest_time:
-            return jsonify({'status': 'error', 'message': 'No energy data available'}), 404
-        
-        floors_data = []
-        for floor in building.floors:
-            rooms_data = []
-            for room in floor.rooms:
-                # Get latest log for this room
-                latest_log = EnergyLog.query.filter_by(
-                    room_id=room.id,
-                    timestamp=latest_time
-                ).first()
-                
-                if latest_log:
-                    rooms_data.append({
-                        'room_id': room.id,
-                        'room_name': room.name,
-                        'room_type': room.type,
-                        'capacity': room.capacity,
-                        'occupancy': latest_log.occupancy,
-                        'total_load': latest_log.total_load,
-                        'energy_source': latest_log.energy_source.name,
-                        'energy_source_cost': latest_log.energy_source.cost_per_kwh,
-                        'optimized': latest_log.optimized
-                    })
-            
-            floors_data.append({
-                'floor_id': floor.id,
-                'floor_number': floor.number,
-                'total_load': sum(r['total_load'] for r in rooms_data),
-                'rooms': rooms_data
-            })
-        
-        return jsonify({
-            'status': 'success',
-            'data': {
-                'building_id': building.id,
-                'building_name': building.name,
-                'timestamp': latest_time.isoformat(),
-                'total_load': sum(f['total_load'] for f in floors_data),
-                'floors': floors_data
-            }
-        }), 200
+        return jsonify({'status': 'success', 'data': cached_energy_flow('building', building_id)}), 200
+    except LookupError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 404
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@api_bp.route('/faculties/<int:faculty_id>/energy-flow', methods=['GET'])
+@conditional_get('tick', 'topology', 'grid', cache=True)
+def get_faculty_energy_flow(faculty_id):
+    """Get real-time energy flow for every building of a faculty"""
+    try:
+        return jsonify({'status': 'success', 'data': cached_energy_flow('faculty', faculty_id)}), 200
+    except LookupError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 404
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@api_bp.route('/campus/energy-flow', methods=['GET'])
+@conditional_get('tick', 'topology', 'grid', cache=True)
+def get_campus_energy_flow():
+    """Get real-time energy flow for the whole campus (faculties -> buildings -> floors -> rooms)"""
+    try:
+        return jsonify({'status': 'success', 'data': cached_energy_flow('campus')}), 200
+    except LookupError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 404
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -582,6 +831,7 @@ def create_room():
         
         db.session.add(room)
         db.session.commit()
+        data_version.bump('topology')
         
         return jsonify({
             'status': 'success',
@@ -623,6 +873,7 @@ def update_room(room_id):
             room.base_load_kw = data['base_load_kw']
         
         db.session.commit()
+        data_version.bump('topology')
         
         return jsonify({
             'status': 'success',
@@ -649,6 +900,7 @@ def delete_room(room_id):
         
         db.session.delete(room)
         db.session.commit()
+        data_version.bump('topology')
         
         return jsonify({
             'status': 'success',
@@ -685,6 +937,7 @@ def create_floor():
         
         db.session.add(floor)
         db.session.commit()
+        data_version.bump('topology')
         
         return jsonify({
             'status': 'success',
@@ -726,6 +979,7 @@ def create_building():
         
         db.session.add(building)
         db.session.commit()
+        data_version.bump('topology')
         
         return jsonify({
             'status': 'success',
@@ -783,6 +1037,7 @@ def control_room_power(room_id):
         
         room.base_load_kw = new_load
         db.session.commit()
+        data_version.bump('topology')
         
         return jsonify({
             'status': 'success',
@@ -800,15 +1055,15 @@ def control_room_power(room_id):
 
 
 @api_bp.route('/faculties', methods=['GET'])
+@conditional_get('topology')
 def get_all_faculties():
     """Get all faculties"""
     try:
-        faculties = Faculty.query.all()
         faculties_data = [{
             'id': f.id,
             'name': f.name,
-            'total_buildings': len(f.buildings)
-        } for f in faculties]
+            'total_buildings': len(f.building_ids)
+        } for f in topology.get().faculties.values()]
         
         return jsonify({
             'status': 'success',
@@ -823,16 +1078,65 @@ def get_all_faculties():
 # ============================================================================
 
 @api_bp.route('/history/room/<int:room_id>', methods=['GET'])
+@conditional_get('tick')
+@admission_control('heavy')
 def get_room_history(room_id):
-    """Get historical energy logs for a specific room"""
+    """Get historical energy logs for a specific room (newest first, cursor-paginated)
+    
+    Query params:
+    - hours: Number of hours to look back (default: 24)
+    - limit: Page size (default: 1000, max: 1000)
+    - cursor: next_cursor/prev_cursor from a previous page (optional)
+    - max_points: Downsample the whole window to this many points with LTTB
+      on total_load instead of paginating (optional, 3-5000)
+    
+    With Accept: application/vnd.apache.arrow.stream the whole window is
+    returned as one Arrow IPC stream (limit/cursor do not apply).
+    """
     try:
         hours = request.args.get('hours', default=24, type=int)
+        limit = parse_limit(request.args.get('limit', type=int), default=1000, maximum=1000)
+        max_points = request.args.get('max_points', type=int)
         cutoff_time = datetime.now() - timedelta(hours=hours)
+        if max_points is not None and not 3 <= max_points <= 5000:
+            raise ValueError('max_points must be between 3 and 5000')
         
-        logs = EnergyLog.query.filter(
+        query = EnergyLog.query.filter(
             EnergyLog.room_id == room_id,
             EnergyLog.timestamp >= cutoff_time
-        ).order_by(EnergyLog.timestamp.desc()).limit(1000).all()
+        )
+        if wants_arrow():
+            names, columns = fetch_columns(query.with_entities(
+                EnergyLog.timestamp, EnergyLog.occupancy, EnergyLog.temperature, EnergyLog.total_load,
+                EnergyLog.ac_load, EnergyLog.light_load, EnergyLog.equipment_load, EnergyLog.optimized
+            ).order_by(EnergyLog.timestamp, EnergyLog.id).statement)
+            
+            def newest_first(table):
+                if max_points is None:
+                    indices = range(table.num_rows - 1, -1, -1)
+                else:
+                    indices = lttb_indices(
+                        table['timestamp'].cast('int64').to_numpy(),
+                        table['total_load'].to_numpy(),
+                        max_points
+                    )[::-1]
+                return table.take(list(indices))
+            
+            return arrow_response(names, columns, {
+                'timestamp': 'timestamp', 'occupancy': 'bool', 'optimized': 'bool'
+            }, transform=newest_first)
+        
+        if max_points is not None:
+            logs = query.order_by(EnergyLog.timestamp).all()
+            source_rows = len(logs)
+            indices = lttb_indices([log.timestamp.timestamp() for log in logs], [log.total_load for log in logs], max_points)
+            logs = [logs[i] for i in reversed(indices)]
+            pagination = None
+        else:
+            source_rows = None
+            logs, pagination = keyset_paginate(
+                query, [EnergyLog.timestamp, EnergyLog.id], limit, request.args.get('cursor')
+            )
         
         data = [
             {
@@ -848,62 +1152,199 @@ def get_room_history(room_id):
             for log in logs
         ]
         
-        return jsonify({'status': 'success', 'data': data, 'count': len(data)}), 200
+        if pagination is None:
+            return jsonify({'status': 'success', 'data': data, 'count': len(data), 'source_rows': source_rows}), 200
+        return jsonify({'status': 'success', 'data': data, 'count': len(data), 'pagination': pagination}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
 @api_bp.route('/history/campus', methods=['GET'])
+@conditional_get('tick', cache=True)
+@admission_control('heavy')
 def get_campus_history():
-    """Get aggregated campus-wide historical data"""
+    """Get aggregated campus-wide historical data
+    
+    Query params:
+    - hours: Number of hours to look back (default: 24)
+    - max_points: Point budget, e.g. chart width in pixels (optional, 3-5000).
+      Reads the tick/hour/day campus series that fits the window and
+      downsamples it; without it every tick is returned
+    - method: lttb | minmax (default: lttb, only with max_points)
+    
+    Accept: application/vnd.apache.arrow.stream returns the same columns as
+    an Arrow IPC stream.
+    """
     try:
         hours = request.args.get('hours', default=24, type=int)
+        max_points = request.args.get('max_points', type=int)
+        if max_points is not None:
+            if not 3 <= max_points <= 5000:
+                raise ValueError('max_points must be between 3 and 5000')
+            series = CampusSeriesStore.get_series(
+                hours=hours,
+                max_points=max_points,
+                method=request.args.get('method', default='lttb')
+            )
+            if wants_arrow():
+                names = list(series['data'][0]) if series['data'] else ['timestamp', 'total_load_kw']
+                columns = [[point[name] for point in series['data']] for name in names]
+                return arrow_response(names, columns, {'timestamp': 'timestamp', 'samples': 'int'})
+            return jsonify({'status': 'success', 'count': len(series['data']), **series}), 200
+        
         cutoff_time = datetime.now() - timedelta(hours=hours)
         
         # Aggregate by timestamp
         aggregated = db.session.query(
             EnergyLog.timestamp,
-            db.func.sum(EnergyLog.total_load).label('total_load'),
+            db.func.sum(EnergyLog.total_load).label('total_load_kw'),
             db.func.avg(EnergyLog.temperature).label('avg_temperature'),
             db.func.count(db.case((EnergyLog.occupancy == True, 1))).label('occupied_rooms'),
             db.func.count(db.case((EnergyLog.optimized == True, 1))).label('optimized_rooms')
         ).filter(
             EnergyLog.timestamp >= cutoff_time
-        ).group_by(EnergyLog.timestamp).order_by(EnergyLog.timestamp.desc()).all()
+        ).group_by(EnergyLog.timestamp).order_by(EnergyLog.timestamp.desc())
+        
+        if wants_arrow():
+            names, columns = fetch_columns(aggregated.statement)
+            return arrow_response(names, columns, {
+                'timestamp': 'timestamp', 'occupied_rooms': 'int', 'optimized_rooms': 'int'
+            })
         
         data = [
             {
                 'timestamp': row.timestamp.isoformat(),
-                'total_load_kw': round(row.total_load, 2),
+                'total_load_kw': round(row.total_load_kw, 2),
                 'avg_temperature': round(row.avg_temperature, 2),
                 'occupied_rooms': row.occupied_rooms,
                 'optimized_rooms': row.optimized_rooms
             }
-            for row in aggregated
+            for row in aggregated.all()
         ]
         
         return jsonify({'status': 'success', 'data': data, 'count': len(data)}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+
+@api_bp.route('/export/<dataset>', methods=['GET'])
+@rate_limit(max_requests=10, window_seconds=60)
+def export_history(dataset):
+    """Stream energy history as CSV or NDJSON (optionally gzip) with constant memory
+    
+    Query params:
+    - format: csv | ndjson (default: csv)
+    - gzip: 1 to gzip the stream
+    - start / end: ISO datetimes (optional)
+    - after_id: Resume cursor - last `id` received (optional)
+    - room_id: Filter energy_log by room (optional)
+    - building_id: Filter load_rollup by building (optional)
+    - limit: Max rows (optional)
+    """
+    try:
+        if dataset not in DATASETS:
+            return jsonify({'status': 'error', 'message': f'dataset must be one of: {list(DATASETS)}'}), 404
+        
+        fmt = request.args.get('format', default='csv')
+        if fmt not in FORMATS:
+            return jsonify({'status': 'error', 'message': f'format must be one of: {list(FORMATS)}'}), 400
+        
+        compress = request.args.get('gzip', default=0, type=int) == 1
+        start_str = request.args.get('start')
+        end_str = request.args.get('end')
+        
+        filters = {
+            'start': datetime.fromisoformat(start_str) if start_str else None,
+            'end': datetime.fromisoformat(end_str) if end_str else None,
+            'after_id': request.args.get('after_id', type=int),
+            'room_id': request.args.get('room_id', type=int),
+            'building_id': request.args.get('building_id', type=int),
+            'limit': request.args.get('limit', type=int)
+        }
+        
+        filename = f"{dataset}.{fmt}" + ('.gz' if compress else '')
+        headers = {
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Resume-Param': 'after_id'
+        }
+        
+        # A .gz file download: no Content-Encoding, or clients would decode it
+        # and save plain text under the .gz name
+        return Response(
+            stream_with_context(stream_export(dataset, fmt, compress, **filters)),
+            mimetype=GZIP_MIMETYPE if compress else FORMATS[fmt],
+            headers=headers
+        )
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@api_bp.route('/sync', methods=['GET'])
+def sync_changes():
+    """Get tick aggregates, autonomous actions and config changes after a cursor
+    
+    Query params:
+    - since: cursor from a previous response; omit it to get the current
+      cursor only (load snapshots first, then sync from there)
+    - limit: Max changes (default: 1000, max: 5000)
+    - kinds: Comma-separated subset of tick,action,grid,room,floor,building (optional)
+    
+    Returns 410 when the cursor is older than the retained change log.
+    """
+    try:
+        since_str = request.args.get('since')
+        try:
+            since = int(since_str) if since_str not in (None, '') else None
+        except ValueError:
+            raise ValueError('Invalid cursor')
+        limit = parse_limit(request.args.get('limit', type=int), default=1000, maximum=5000)
+        kinds = [k for k in request.args.get('kinds', '').split(',') if k] or None
+        if kinds:
+            unknown = [k for k in kinds if k not in CHANGE_KINDS]
+            if unknown:
+                raise ValueError(f"Unknown kinds: {unknown}. Available: {list(CHANGE_KINDS)}")
+        
+        result = change_feed.read(since=since, limit=limit, kinds=kinds)
+        return jsonify({'status': 'success', **result}), 200
+    except SyncCursorExpired as e:
+        return jsonify({'status': 'error', 'message': str(e), 'cursor': change_feed.read()['cursor']}), 410
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 # ============================================================================
 # STATISTICS ENDPOINTS
 # ============================================================================
 
 @api_bp.route('/stats/summary', methods=['GET'])
+@conditional_get('tick', 'topology')
 def get_statistics_summary():
-    """Get overall system statistics"""
+    """
+    Get overall system statistics
+    
+    Row counts and the time range come from the maintained counters and the
+    topology snapshot, so the cost doesn't grow with the log table.
+    """
     try:
-        total_logs = EnergyLog.query.count()
-        total_rooms = Room.query.count()
+        counters = system_stats.get_counters()
+        total_logs = system_stats.count(counters, 'energy_log.rows')
+        total_rooms = len(topology.get().rooms)
         
         # Get time range
-        earliest = db.session.query(db.func.min(EnergyLog.timestamp)).scalar()
-        latest = db.session.query(db.func.max(EnergyLog.timestamp)).scalar()
+        log_bounds = counters.get('energy_log.rows')
+        earliest = log_bounds.min_at if log_bounds else None
+        latest = log_bounds.max_at if log_bounds else None
         
         # Get optimization stats
-        optimized_count = EnergyLog.query.filter_by(optimized=True).count()
+        optimized_count = system_stats.count(counters, 'energy_log.optimized')
         
         # Current load
         current_load = db.session.query(db.func.sum(EnergyLog.total_load)).filter(
@@ -935,6 +1376,7 @@ def get_statistics_summary():
 # ============================================================================
 
 @api_bp.route('/energy-sources', methods=['GET'])
+@conditional_get('tick', 'grid')
 def get_energy_sources():
     """Get all energy sources with their costs and availability"""
     try:
@@ -957,6 +1399,7 @@ def get_energy_sources():
 
 
 @api_bp.route('/grid-status', methods=['GET'])
+@conditional_get('tick', 'grid')
 def get_grid_status():
     """Get current grid status"""
     try:
@@ -1011,6 +1454,7 @@ def update_grid_status():
         
         db.session.add(grid_status)
         db.session.commit()
+        data_version.bump('grid')
         
         return jsonify({
             'status': 'success',
@@ -1027,6 +1471,7 @@ def update_grid_status():
 
 
 @api_bp.route('/energy-cost-breakdown', methods=['GET'])
+@conditional_get('tick')
 def get_energy_cost_breakdown():
     """Get energy consumption and cost breakdown by source
     
@@ -1087,6 +1532,7 @@ def get_energy_cost_breakdown():
 
 @api_bp.route('/autonomous/logs', methods=['GET'])
 @rate_limit(max_requests=20, window_seconds=60)
+@conditional_get('tick')
 def get_autonomous_logs():
     """Get autonomous system activity logs
     
@@ -1095,12 +1541,18 @@ def get_autonomous_logs():
     - action_type: Filter by action type (optional)
     - room_id: Filter by room (optional)
     - building_id: Filter by building (optional)
+    - limit: Page size (default: 200, max: 1000)
+    - cursor: next_cursor/prev_cursor from a previous page (optional)
+    
+    The summary covers the whole filtered window and is only computed for the first page.
     """
     try:
         hours = request.args.get('hours', default=24, type=int)
         action_type = request.args.get('action_type')
         room_id = request.args.get('room_id', type=int)
         building_id = request.args.get('building_id', type=int)
+        limit = parse_limit(request.args.get('limit', type=int), default=200, maximum=1000)
+        cursor = request.args.get('cursor')
         
         cutoff = datetime.now() - timedelta(hours=hours)
         
@@ -1113,7 +1565,30 @@ def get_autonomous_logs():
         if building_id:
             query = query.filter(AutonomousLog.building_id == building_id)
         
-        logs = query.order_by(AutonomousLog.timestamp.desc()).limit(200).all()
+        summary = None
+        if not cursor:
+            action_counts = {}
+            total_actions = 0
+            total_energy_saved = 0.0
+            for action, count, saved in query.with_entities(
+                AutonomousLog.action_type,
+                db.func.count(AutonomousLog.id),
+                db.func.sum(AutonomousLog.energy_saved_kwh)
+            ).group_by(AutonomousLog.action_type).all():
+                action_counts[action] = count
+                total_actions += count
+                total_energy_saved += saved or 0
+            summary = {
+                'total_actions': total_actions,
+                'total_energy_saved_kwh': round(total_energy_saved, 3),
+                'action_counts': action_counts,
+                'period_hours': hours
+            }
+        
+        logs, pagination = keyset_paginate(
+            query.options(joinedload(AutonomousLog.room), joinedload(AutonomousLog.building)),
+            [AutonomousLog.timestamp, AutonomousLog.id], limit, cursor
+        )
         
         result = []
         for log in logs:
@@ -1139,30 +1614,23 @@ def get_autonomous_logs():
                 'confidence_score': log.confidence_score
             })
         
-        # Summary stats
-        total_energy_saved = sum(log.energy_saved_kwh or 0 for log in logs)
-        action_counts = {}
-        for log in logs:
-            action_counts[log.action_type] = action_counts.get(log.action_type, 0) + 1
-        
         return jsonify({
             'status': 'success',
             'data': {
                 'logs': result,
-                'summary': {
-                    'total_actions': len(logs),
-                    'total_energy_saved_kwh': round(total_energy_saved, 3),
-                    'action_counts': action_counts,
-                    'period_hours': hours
-                }
+                'summary': summary,
+                'pagination': pagination
             }
         }), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
 @api_bp.route('/autonomous/risky-schedules', methods=['GET'])
 @rate_limit(max_requests=10, window_seconds=60)
+@conditional_get('tick', 'topology')
 def get_risky_schedules():
     """Get schedules with high cancellation rates (>50%)"""
     try:
@@ -1208,6 +1676,8 @@ def get_risky_schedules():
 
 @api_bp.route('/autonomous/prediction-accuracy', methods=['GET'])
 @rate_limit(max_requests=10, window_seconds=60)
+@conditional_get('tick')
+@admission_control('heavy')
 def get_prediction_accuracy():
     """Get historical accuracy of autonomous predictions"""
     try:
@@ -1223,27 +1693,26 @@ def get_prediction_accuracy():
 
 @api_bp.route('/prediction/30-min', methods=['GET'])
 @rate_limit(max_requests=10, window_seconds=60)
+@conditional_get('tick', 'model')
 def predict_30_minutes():
     """Predict campus load 30 minutes ahead for proactive source switching"""
     try:
-        if not predictor.is_trained:
-            predictor.load_model()
-        
-        prediction, error = predictor.predict_30_minutes_ahead()
-        
-        if error:
-            return jsonify({'status': 'error', 'message': error}), 400
+        prediction = cached_30_minute_prediction(predictor)
         
         return jsonify({
             'status': 'success',
             'data': prediction
         }), 200
+    except LookupError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
 @api_bp.route('/prediction/room-occupancy', methods=['GET'])
 @rate_limit(max_requests=20, window_seconds=60)
+@conditional_get('tick', 'model')
+@admission_control('heavy')
 def get_room_occupancy_predictions():
     """Get occupancy predictions for all scheduled rooms"""
     try:
@@ -1257,7 +1726,77 @@ def get_room_occupancy_predictions():
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+@api_bp.route('/anomalies', methods=['GET'])
+@rate_limit(max_requests=30, window_seconds=60)
+@conditional_get('tick')
+def get_anomalies():
+    """Get load anomalies flagged by the streaming EWMA detector
+    
+    Query params:
+    - hours: Number of hours to look back (default: 24)
+    - room_id: Filter by room (optional)
+    - building_id: Filter by building (optional)
+    - limit: Max anomalies returned (default: 100, max: 500)
+    """
+    try:
+        hours = request.args.get('hours', default=24, type=int)
+        room_id = request.args.get('room_id', type=int)
+        building_id = request.args.get('building_id', type=int)
+        limit = parse_limit(request.args.get('limit', type=int), default=100, maximum=500)
+        
+        cutoff = datetime.now() - timedelta(hours=hours)
+        
+        query = db.session.query(AutonomousLog, Room.name, Building.name).outerjoin(
+            Room, Room.id == AutonomousLog.room_id
+        ).outerjoin(
+            Building, Building.id == AutonomousLog.building_id
+        ).filter(
+            AutonomousLog.action_type == 'LOAD_ANOMALY',
+            AutonomousLog.timestamp >= cutoff
+        )
+        
+        if room_id:
+            query = query.filter(AutonomousLog.room_id == room_id)
+        if building_id:
+            query = query.filter(AutonomousLog.building_id == building_id)
+        
+        rows = query.order_by(AutonomousLog.timestamp.desc()).limit(limit).all()
+        
+        anomalies = []
+        for log, room_name, building_name in rows:
+            details = json.loads(log.new_state) if log.new_state else {}
+            baseline = json.loads(log.previous_state) if log.previous_state else {}
+            anomalies.append({
+                'id': log.id,
+                'timestamp': log.timestamp.isoformat(),
+                'room_id': log.room_id,
+                'room_name': room_name,
+                'building_id': log.building_id,
+                'building_name': building_name,
+                'load_kw': details.get('load_kw'),
+                'expected_kw': baseline.get('expected_kw'),
+                'std_kw': baseline.get('std_kw'),
+                'z_score': details.get('z'),
+                'occupied': details.get('occupied'),
+                'confidence_score': log.confidence_score,
+                'message': log.reason
+            })
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'anomalies': anomalies,
+                'count': len(anomalies),
+                'period_hours': hours,
+                'detector': anomaly_detector.get_live_status()
+            }
+        }), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
 @api_bp.route('/power/solar-status', methods=['GET'])
+@conditional_get('tick', 'topology', 'grid')
 def get_solar_status():
     """Get current solar power availability and status"""
     try:
@@ -1266,10 +1805,11 @@ def get_solar_status():
         
         # Get all building configs
         configs = PowerSourceConfig.query.all()
+        buildings = topology.get().buildings
         
         buildings_status = []
         for config in configs:
-            building = Building.query.get(config.building_id)
+            building = buildings.get(config.building_id)
             effective_capacity = config.solar_capacity_kw * solar_availability
             
             buildings_status.append({
@@ -1298,14 +1838,16 @@ def get_solar_status():
 
 
 @api_bp.route('/power/hybrid-status', methods=['GET'])
+@conditional_get('tick', 'topology', 'grid')
 def get_hybrid_status():
     """Get hybrid power mode status for all buildings"""
     try:
         configs = PowerSourceConfig.query.filter_by(hybrid_mode_active=True).all()
+        buildings = topology.get().buildings
         
         hybrid_buildings = []
         for config in configs:
-            building = Building.query.get(config.building_id)
+            building = buildings.get(config.building_id)
             hybrid_buildings.append({
                 'building_id': config.building_id,
                 'building_name': building.name if building else 'Unknown',
@@ -1327,6 +1869,7 @@ def get_hybrid_status():
 
 @api_bp.route('/autonomous/notifications', methods=['GET'])
 @rate_limit(max_requests=30, window_seconds=60)
+@conditional_get('tick')
 def get_autonomous_notifications():
     """Get recent autonomous actions as notifications for dashboard"""
     try:
@@ -1337,39 +1880,14 @@ def get_autonomous_notifications():
             AutonomousLog.timestamp >= cutoff
         ).order_by(AutonomousLog.timestamp.desc()).limit(20).all()
         
-        notifications = []
-        for log in logs:
-            # Determine notification type/severity
-            if log.action_type == 'POWER_CUTOFF':
-                severity = 'warning'
-                icon = '🔌'
-            elif log.action_type == 'HYBRID_MODE':
-                severity = 'info'
-                icon = '⚡'
-            elif log.action_type == 'DEMAND_SPIKE':
-                severity = 'alert'
-                icon = '📈'
-            elif log.action_type == 'PREDICTIVE_SWITCH':
-                severity = 'info'
-                icon = '🔮'
-            else:
-                severity = 'info'
-                icon = 'ℹ️'
-            
-            room_name = log.room.name if log.room else None
-            building_name = log.building.name if log.building else None
-            
-            notifications.append({
-                'id': log.id,
-                'timestamp': log.timestamp.isoformat(),
-                'icon': icon,
-                'severity': severity,
-                'action_type': log.action_type,
-                'message': log.reason,
-                'room_name': room_name,
-                'building_name': building_name,
-                'energy_saved_kwh': log.energy_saved_kwh
-            })
+        notifications = [
+            format_notification(
+                log,
+                log.room.name if log.room else None,
+                log.building.name if log.building else None
+            )
+            for log in logs
+        ]
         
         return jsonify({
             'status': 'success',
@@ -1383,28 +1901,203 @@ def get_autonomous_notifications():
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+@api_bp.route('/stream/live', methods=['GET'])
+def stream_live():
+    """Server-Sent Events stream of per-tick live updates
+    
+    Events:
+    - snapshot: Sent on connect - campus totals and every building load
+    - tick: After each simulation tick - campus totals, buildings whose load
+      changed and new autonomous notifications
+    
+    Event ids are tick ids. Reconnecting clients send Last-Event-ID and
+    receive the ticks they missed, or a snapshot if this worker didn't
+    publish that tick.
+    
+    Each subscriber holds a server thread; past the per-worker cap the
+    stream is refused with 503 and Retry-After, so subscribers can't take
+    the threads that serve the rest of the API.
+    """
+    if not live_broadcaster.subscribe():
+        return jsonify({
+            'status': 'error',
+            'message': 'Too many live stream subscribers on this worker; retry shortly'
+        }), 503, {'Retry-After': str(live_broadcaster.KEEPALIVE_SECONDS)}
+    
+    last_event_id = request.headers.get('Last-Event-ID')
+    response = Response(
+        live_broadcaster.stream(last_event_id),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Disable proxy buffering (nginx)
+        }
+    )
+    # Runs when the server closes the stream, even if it never started
+    response.call_on_close(live_broadcaster.unsubscribe)
+    return response
+
+# ============================================================================
+# BACKGROUND JOBS
+# ============================================================================
+
+def _job_accepted(job, created):
+    """202 response for a submitted (or already pending) job"""
+    response = jsonify({'status': 'success', 'created': created, 'data': serialize_job(job)})
+    response.headers['Location'] = f'{api_bp.url_prefix}/jobs/{job.id}'
+    return response, 202
+
+
+@api_bp.route('/jobs', methods=['POST'])
+@rate_limit(max_requests=10, window_seconds=60)
+def submit_job():
+    """
+    Submit a background job; returns 202 with the job id immediately
+    
+    Body: {"kind": "train" | "generate_history" | "rebuild_rollups" | "export", "params": {...}}
+    """
+    try:
+        body = request.get_json(silent=True) or {}
+        if 'kind' not in body:
+            return jsonify({'status': 'error', 'message': 'kind is required'}), 400
+        
+        job, created = job_queue.submit(body['kind'], body.get('params') or {})
+        return _job_accepted(job, created)
+    except (ValueError, TypeError) as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@api_bp.route('/jobs', methods=['GET'])
+def list_jobs():
+    """
+    List jobs, newest first
+    
+    Query params:
+    - status: queued | running | succeeded | failed | cancelled (optional)
+    - kind: Job kind (optional)
+    - limit: Max jobs (default: 50, max: 200)
+    """
+    try:
+        status = request.args.get('status')
+        if status and status not in JOB_STATUSES:
+            return jsonify({'status': 'error', 'message': f'status must be one of: {list(JOB_STATUSES)}'}), 400
+        limit = parse_limit(request.args.get('limit', type=int), 50, 200)
+        
+        query = Job.query
+        if status:
+            query = query.filter(Job.status == status)
+        if request.args.get('kind'):
+            query = query.filter(Job.kind == request.args.get('kind'))
+        jobs = query.order_by(Job.id.desc()).limit(limit).all()
+        
+        return jsonify({
+            'status': 'success',
+            'count': len(jobs),
+            'data': [serialize_job(job) for job in jobs]
+        }), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@api_bp.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status, progress (percent), current stage and ETA; result once succeeded"""
+    try:
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+        
+        return jsonify({'status': 'success', 'data': serialize_job(job)}), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@api_bp.route('/jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued job, or stop a running one at its next progress report"""
+    try:
+        job = job_queue.cancel(job_id)
+        if job is None:
+            return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+        if job.status not in ('cancelled', 'running'):
+            return jsonify({'status': 'error', 'message': f'Job already {job.status}'}), 409
+        
+        return jsonify({'status': 'success', 'data': serialize_job(job)}), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@api_bp.route('/jobs/<int:job_id>/download', methods=['GET'])
+def download_job_file(job_id):
+    """Download the file written by a succeeded export job"""
+    try:
+        job = db.session.get(Job, job_id)
+        if job is None or job.kind != 'export':
+            return jsonify({'status': 'error', 'message': 'Export job not found'}), 404
+        if job.status != 'succeeded':
+            return jsonify({'status': 'error', 'message': f'Export is {job.status}'}), 409
+        
+        result = json.loads(job.result)
+        path = os.path.join(current_app.config['EXPORT_DIR'], os.path.basename(result['file']))
+        if not os.path.exists(path):
+            return jsonify({'status': 'error', 'message': 'Export file no longer exists'}), 404
+        
+        return send_file(
+            path,
+            mimetype=GZIP_MIMETYPE if result['gzip'] else FORMATS[result['format']],
+            as_attachment=True,
+            download_name=result['file']
+        )
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# ============================================================================
+# CACHE STATS
+# ============================================================================
+
+@api_bp.route('/cache/stats', methods=['GET'])
+@rate_limit(max_requests=30, window_seconds=60)
+def get_cache_stats():
+    """
+    Hit/miss/eviction counters of this process's caches
+    
+    - functions: @cached service functions (predictions, ...)
+    - responses: pre-serialized response bodies (@conditional_get(cache=True))
+    """
+    try:
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'functions': function_caches.get_stats(),
+                'responses': response_cache.get_cache_info()
+            }
+        }), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 # ============================================================================
 # HEALTH CHECK
 # ============================================================================
 
 @api_bp.route('/health', methods=['GET'])
 def health_check():
-    """API health check endpoint"""
+    """API health check endpoint (detailed; see /health/live and /health/ready for probes)"""
     try:
         # Check database connection
         db.session.execute(db.text('SELECT 1'))
         
-        # Check if data exists
-        room_count = Room.query.count()
-        log_count = EnergyLog.query.count()
+        # Row counts from the maintained counters (no table scans)
+        counters = system_stats.get_counters()
+        room_count = len(topology.get().rooms)
+        log_count = system_stats.count(counters, 'energy_log.rows')
         
         ml_status = 'not_initialized' if predictor is None else ('loaded' if predictor.is_trained else 'not_trained')
         
         # Get autonomous system stats
-        auto_log_count = AutonomousLog.query.count()
-        risky_schedules_count = CancellationPattern.query.filter(
-            CancellationPattern.auto_cutoff_enabled == True
-        ).count()
+        auto_log_count = system_stats.count(counters, 'autonomous_log.rows')
+        risky_schedules_count = system_stats.count(counters, 'cancellation_pattern.auto_cutoff')
         
         return jsonify({
             'status': 'healthy',
@@ -1415,10 +2108,64 @@ def health_check():
             'autonomous_actions': auto_log_count,
             'auto_cutoff_schedules': risky_schedules_count,
             'simulation': 'running',
-            'ml_model': ml_status
+            'ml_model': ml_status,
+            'data_version': data_version.get_status(),
+            'scheduler': scheduler_leader.get_status(),
+            'rate_limiter': rate_limiter.get_stats(),
+            'admission': admission.get_stats(),
+            'jobs': job_queue.get_stats(),
+            'topology': topology.get_stats(),
+            'metrics': metrics.get_stats(),
+            'sql_profiler': sql_profiler.get_stats(),
+            'worker_ipc': {
+                'role': current_app.config['PROCESS_ROLE'],
+                'server': worker_channel.get_status(),
+                'client': worker_client.get_status()
+            }
         }), 200
     except Exception as e:
         return jsonify({
             'status': 'unhealthy',
             'error': str(e)
         }), 500
+
+
+@api_bp.route('/health/live', methods=['GET'])
+def liveness_probe():
+    """Liveness probe: the process is up and serving requests (no database access)"""
+    return jsonify({
+        'status': 'alive',
+        'pid': os.getpid(),
+        'uptime_seconds': round(time.time() - system_stats.started_at, 1)
+    }), 200
+
+
+@api_bp.route('/health/ready', methods=['GET'])
+def readiness_probe():
+    """
+    Readiness probe: the database answers and the campus is loaded
+    
+    Returns 200 when ready, 503 otherwise. The age of the latest simulation
+    tick is reported but doesn't affect readiness (the scheduler may run in
+    another process).
+    """
+    checks = {}
+    try:
+        db.session.execute(db.text('SELECT 1'))
+        checks['database'] = 'connected'
+        rooms = len(topology.get().rooms)
+        checks['rooms'] = rooms
+        ready = rooms > 0
+    except Exception as e:
+        checks['database'] = f'error: {e}'
+        ready = False
+    
+    tick_id = data_version.get_tick_id()
+    checks['last_tick_age_seconds'] = round((datetime.now() - tick_id).total_seconds(), 1) if tick_id else None
+    checks['tick_stale'] = tick_id is None or checks['last_tick_age_seconds'] > 2 * TICK_SECONDS
+    
+    return jsonify({
+        'status': 'ready' if ready else 'not_ready',
+        'timestamp': datetime.now().isoformat(),
+        'checks': checks
+    }), 200 if ready else 503
@@ -72,6 +72,11 @@ class EnergyLog(db.Model):
     equipment_load = db.Column(db.Float, nullable=False)
     total_load = db.Column(db.Float, nullable=False)
     optimized = db.Column(db.Boolean, default=False)
+    
+    __table_args__ = (
+        # Keyset pagination of a room's history: (room_id, timestamp, id)
+        db.Index('ix_energy_log_room_timestamp_id', 'room_id', 'timestamp', 'id'),
+    )
 
 
 class AutonomousLog(db.Model):
@@ -97,6 +102,14 @@ class AutonomousLog(db.Model):
     
     room = db.relationship('Room', backref='autonomous_logs')
     building = db.relationship('Building', backref='autonomous_logs')
+    
+    __table_args__ = (
+        # Keyset pagination on (timestamp, id), unfiltered and per filter
+        db.Index('ix_autonomous_log_timestamp_id', 'timestamp', 'id'),
+        db.Index('ix_autonomous_log_action_timestamp_id', 'action_type', 'timestamp', 'id'),
+        db.Index('ix_autonomous_log_room_timestamp_id', 'room_id', 'timestamp', 'id'),
+        db.Index('ix_autonomous_log_building_timestamp_id', 'building_id', 'timestamp', 'id'),
+    )
 
 
 class CancellationPattern(db.Model):
@@ -131,4 +144,142 @@ class PowerSourceConfig(db.Model):
     hybrid_mode_active = db.Column(db.Boolean, default=False)
     last_source_switch = db.Column(db.DateTime)
     
-    building = db.relationship('Building', backref='power_config')
\ No newline at end of file
+    building = db.relationship('Building', backref='power_config')
+
+class OccupancyCubeCell(db.Model):
+    """Hour-of-week aggregates per room/building, maintained incrementally every tick"""
+    __tablename__ = 'occupancy_cube'
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(10), nullable=False)  # room/building
+    scope_id = db.Column(db.Integer, nullable=False)  # room_id or building_id
+    day_of_week = db.Column(db.Integer, nullable=False)  # 0-6 (Monday-Sunday)
+    hour = db.Column(db.Integer, nullable=False)  # 0-23
+    tick_count = db.Column(db.Integer, default=0)  # Simulation ticks observed
+    sample_count = db.Column(db.Integer, default=0)  # Room readings aggregated
+    occupied_count = db.Column(db.Integer, default=0)  # Readings with occupancy
+    optimized_count = db.Column(db.Integer, default=0)  # Readings marked optimized
+    load_sum = db.Column(db.Float, default=0.0)  # Sum of per-tick total load (kW)
+    load_sq_sum = db.Column(db.Float, default=0.0)  # Sum of squared per-tick load (for variance)
+    peak_load = db.Column(db.Float, default=0.0)  # Highest per-tick total load (kW)
+    wasted_load_sum = db.Column(db.Float, default=0.0)  # Load drawn while unoccupied (kW)
+    last_updated = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'scope_id', 'day_of_week', 'hour', name='unique_cube_cell'),
+    )
+
+
+class DemandPeak(db.Model):
+    """Peak/mean/p95 demand per campus or building for a closed day or month window"""
+    __tablename__ = 'demand_peak'
+    id = db.Column(db.Integer, primary_key=True)
+    window = db.Column(db.String(10), nullable=False)  # day/month
+    window_start = db.Column(db.DateTime, nullable=False, index=True)
+    scope = db.Column(db.String(10), nullable=False)  # campus/building
+    scope_id = db.Column(db.Integer, nullable=False, default=0)  # building_id (0 for campus)
+    peak_kw = db.Column(db.Float, nullable=False)
+    peak_at = db.Column(db.DateTime, nullable=False)
+    mean_kw = db.Column(db.Float, nullable=False)
+    p95_kw = db.Column(db.Float)  # Streaming (P²) estimate
+    sample_count = db.Column(db.Integer, nullable=False)  # Ticks observed in window
+    
+    __table_args__ = (
+        db.UniqueConstraint('window', 'window_start', 'scope', 'scope_id', name='unique_demand_window'),
+    )
+
+
+class WasterRanking(db.Model):
+    """Top rooms by energy drawn while unoccupied, persisted when a day closes"""
+    __tablename__ = 'waster_ranking'
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    rank = db.Column(db.Integer, nullable=False)  # 1 = biggest waster
+    room_id = db.Column(db.Integer, db.ForeignKey('room.id'), nullable=False)
+    wasted_kwh = db.Column(db.Float, nullable=False)
+    
+    room = db.relationship('Room')
+    
+    __table_args__ = (
+        db.UniqueConstraint('day', 'rank', name='unique_waster_rank'),
+    )
+
+
+class LoadRollup(db.Model):
+    """Hourly load rollup per campus/building with a mergeable quantile sketch"""
+    __tablename__ = 'load_rollup'
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(10), nullable=False)  # campus/building
+    scope_id = db.Column(db.Integer, nullable=False, default=0)  # building_id (0 for campus)
+    bucket_start = db.Column(db.DateTime, nullable=False, index=True)  # Start of the hour
+    sample_count = db.Column(db.Integer, nullable=False, default=0)  # Ticks in bucket
+    load_sum = db.Column(db.Float, nullable=False, default=0.0)  # Sum of per-tick total load (kW)
+    load_min = db.Column(db.Float)
+    load_max = db.Column(db.Float)
+    sketch = db.Column(db.LargeBinary, nullable=False)  # LoadSketch.to_bytes()
+    
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'scope_id', 'bucket_start', name='unique_load_rollup'),
+    )
+
+
+class CampusSeries(db.Model):
+    """Campus totals per tick/hour/day for downsampled history charts"""
+    __tablename__ = 'campus_series'
+    id = db.Column(db.Integer, primary_key=True)
+    resolution = db.Column(db.String(10), nullable=False)  # tick/hour/day
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    sample_count = db.Column(db.Integer, nullable=False, default=0)  # Ticks in bucket
+    load_sum = db.Column(db.Float, nullable=False, default=0.0)  # Sum of per-tick campus load (kW)
+    load_min = db.Column(db.Float)
+    load_max = db.Column(db.Float)
+    temperature_sum = db.Column(db.Float, nullable=False, default=0.0)  # Sum of per-tick avg temperature
+    occupied_sum = db.Column(db.Integer, nullable=False, default=0)  # Sum of per-tick occupied rooms
+    optimized_sum = db.Column(db.Integer, nullable=False, default=0)  # Sum of per-tick optimized rooms
+    
+    __table_args__ = (
+        db.UniqueConstraint('resolution', 'bucket_start', name='unique_campus_series'),
+    )
+
+
+class ChangeLog(db.Model):
+    """Monotonic change sequence behind /api/sync (seq is never reused)"""
+    __tablename__ = 'change_log'
+    seq = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # tick/action/grid/room/floor/building
+    op = db.Column(db.String(10), nullable=False)  # insert/update/delete
+    entity_id = db.Column(db.Integer)  # Row id of the changed entity (None for ticks)
+    payload = db.Column(db.Text)  # JSON aggregates (ticks only)
+    
+    __table_args__ = {'sqlite_autoincrement': True}
+
+
+class Job(db.Model):
+    """Background job (training, backfill, rollup rebuild, export) run by the job pool"""
+    __tablename__ = 'job'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)  # train/generate_history/rebuild_rollups/export
+    status = db.Column(db.String(10), nullable=False, default='queued')  # queued/running/succeeded/failed/cancelled
+    params = db.Column(db.Text)  # JSON
+    progress = db.Column(db.Float, nullable=False, default=0.0)  # Percent
+    message = db.Column(db.String(200))  # Current stage
+    result = db.Column(db.Text)  # JSON (succeeded jobs)
+    error = db.Column(db.Text)  # Failed jobs
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    started_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)  # Last progress report
+    finished_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('ix_job_status_id', 'status', 'id'),
+    )
+
+
+class SystemStat(db.Model):
+    """Row counters kept current by the writers' flushes (see app.utils.system_stats)"""
+    __tablename__ = 'system_stat'
+    name = db.Column(db.String(40), primary_key=True)  # e.g. energy_log.rows
+    value = db.Column(db.Integer, nullable=False, default=0)
+    min_at = db.Column(db.DateTime)  # Earliest timestamp inserted (energy_log.rows only)
+    max_at = db.Column(db.DateTime)  # Latest timestamp inserted (energy_log.rows only)
@@ -64,22 +64,27 @@ class EnergyOptimizer:
         return 0.0
     
     @staticmethod
-    def get_savings_summary(start_time=None, end_time=None):
-        """Calculate total energy savings and environmental impact"""
-        from sqlalchemy import func
-        
-        # Base query for optimized logs
-        query = db.session.query(func.count(EnergyLog.id)).filter(EnergyLog.optimized == True)
+    def get_savings_summary(start_time=None, end_time=None, total_optimized=None):
+        """Calculate total energy savings and environmental impact
         
-        if start_time:
-            query = query.filter(EnergyLog.timestamp >= start_time)
-        if end_time:
-            query = query.filter(EnergyLog.timestamp <= end_time)
-        
-        # optimized_logs = query.all()  # <--- THIS WAS THE BOTTLENECK
+        total_optimized: an already known all-time count of optimized logs
+        (the maintained energy_log.optimized counter) instead of counting them
+        """
+        from sqlalchemy import func
         
-        # Efficient count query
-        total_optimized = query.scalar() or 0
+        if total_optimized is None:
+            # Base query for optimized logs
+            query = db.session.query(func.count(EnergyLog.id)).filter(EnergyLog.optimized == True)
+            
+            if start_time:
+                query = query.filter(EnergyLog.timestamp >= start_time)
+            if end_time:
+                query = query.filter(EnergyLog.timestamp <= end_time)
+            
+            # optimized_logs = query.all()  # <--- THIS WAS THE BOTTLENECK
+            
+            # Efficient count query
+            total_optimized = query.scalar() or 0
         
         # Note: We need to calculate savings differently
         # For now, estimate avg savings per optimized log
@@ -5,6 +5,9 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, r2_score
 from app.models import db, EnergyLog
+from app.utils.data_version import data_version
+from app.utils.function_cache import cached
+from app.utils.metrics import timed
 import pickle
 import os
 
@@ -14,8 +17,18 @@ class EnergyPredictor:
     def __init__(self):
         self.model = None
         self.model_path = 'app/prediction/energy_model.pkl'
-        self.is_trained = False
-        
+        self._trained = False
+        self.model_version = None  # data_version 'model' counter when loaded/trained
+    
+    @property
+    def is_trained(self):
+        """False once another process retrained the model, so callers reload it"""
+        return self._trained and self.model_version == data_version.get('model')
+    
+    @is_trained.setter
+    def is_trained(self, value):
+        self._trained = value
+    
     def prepare_training_data(self, hours_back=168):
         """
         Prepare training data from historical logs
@@ -74,12 +87,19 @@ class EnergyPredictor:
         
         return campus_df, None
     
-    def train_model(self, hours_back=168):
-        """Train RandomForest model on historical data"""
+    @timed('voltonic_model_train_duration_seconds', outcome=lambda result: 'succeeded' if result[0] else 'failed')
+    def train_model(self, hours_back=168, progress=None):
+        """Train RandomForest model on historical data
+        
+        progress: Optional callable(percent, message), e.g. JobContext.progress;
+        if it raises (job cancelled), the current model is left untouched
+        """
         
         print("Starting ML model training...")
+        report = progress or (lambda percent, message: None)
         
         # Prepare data
+        report(0, 'Preparing training data')
         df, error = self.prepare_training_data(hours_back)
         
         if error:
@@ -101,7 +121,8 @@ class EnergyPredictor:
         )
         
         # Train RandomForest
-        self.model = RandomForestRegressor(
+        report(20, f'Training RandomForest on {len(X_train)} samples')
+        model = RandomForestRegressor(
             n_estimators=100,
             max_depth=15,
             min_samples_split=5,
@@ -110,10 +131,11 @@ class EnergyPredictor:
         )
         
         print("Training RandomForest model...")
-        self.model.fit(X_train, y_train)
+        model.fit(X_train, y_train)
         
         # Evaluate
-        y_pred = self.model.predict(X_test)
+        report(85, 'Evaluating')
+        y_pred = model.predict(X_test)
         mae = mean_absolute_error(y_test, y_pred)
         r2 = r2_score(y_test, y_pred)
         
@@ -121,9 +143,13 @@ class EnergyPredictor:
         print(f" Mean Absolute Error: {mae:.2f} kW")
         print(f" R² Score: {r2:.4f}")
         
-        # Save model
+        # Save model (last point at which the run can be cancelled)
+        report(95, 'Saving model')
+        self.model = model
         self.save_model()
         self.is_trained = True
+        data_version.bump('model')
+        self.model_version = data_version.get('model')
         
         return True, {
             'mae': round(mae, 2),
@@ -135,20 +161,26 @@ class EnergyPredictor:
     def save_model(self):
         """Save trained model to disk"""
         os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-        with open(self.model_path, 'wb') as f:
+        # Write-then-rename so other processes never load a half-written file
+        tmp_path = f"{self.model_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
             pickle.dump(self.model, f)
+        os.replace(tmp_path, self.model_path)
         print(f" Model saved to {self.model_path}")
     
     def load_model(self):
         """Load trained model from disk"""
         if os.path.exists(self.model_path):
+            version = data_version.get('model')  # Before reading: a newer file only looks stale
             with open(self.model_path, 'rb') as f:
                 self.model = pickle.load(f)
             self.is_trained = True
+            self.model_version = version
             print(f" Model loaded from {self.model_path}")
             return True
         return False
     
+    @timed('voltonic_model_predict_duration_seconds', method='next_hour')
     def predict_next_hour(self):
         """Predict campus load for the next hour"""
         
@@ -243,6 +275,7 @@ class EnergyPredictor:
         
         return feature_importance, None
     
+    @timed('voltonic_model_predict_duration_seconds', method='30_minutes_ahead')
     def predict_30_minutes_ahead(self):
         """
         Predict campus load 30 minutes ahead for predictive source switching
@@ -300,6 +333,7 @@ class EnergyPredictor:
             'prediction_window_minutes': 30
         }, None
     
+    @timed('voltonic_model_predict_duration_seconds', method='room_occupancy')
     def predict_room_occupancy(self, room_id, day_of_week=None, hour=None):
         """
         Predict if a specific room will be occupied based on historical patterns
@@ -318,12 +352,21 @@ class EnergyPredictor:
             Timetable.day_of_week == day_of_week
         ).all()
         
-        has_scheduled_class = False
-        for schedule in scheduled:
-            if schedule.start_time.hour <= hour < schedule.end_time.hour:
-                has_scheduled_class = True
-                break
-        
+        has_scheduled_class = any(schedule.start_time.hour <= hour < schedule.end_time.hour for schedule in scheduled)
+        pattern = None
+        if has_scheduled_class:
+            # Check cancellation pattern
+            pattern = CancellationPattern.query.filter_by(
+                room_id=room_id,
+                day_of_week=day_of_week,
+                hour=hour
+            ).first()
+        
+        return self._occupancy_prediction(room_id, has_scheduled_class, pattern)
+    
+    @staticmethod
+    def _occupancy_prediction(room_id, has_scheduled_class, pattern):
+        """Prediction for one room from its schedule and CancellationPattern row (no queries)"""
         if not has_scheduled_class:
             return {
                 'room_id': room_id,
@@ -333,13 +376,6 @@ class EnergyPredictor:
                 'reason': 'No scheduled class'
             }
         
-        # Check cancellation pattern
-        pattern = CancellationPattern.query.filter_by(
-            room_id=room_id,
-            day_of_week=day_of_week,
-            hour=hour
-        ).first()
-        
         if not pattern or pattern.scheduled_count < 5:
             # Not enough data, assume occupied if scheduled
             return {
@@ -370,45 +406,44 @@ class EnergyPredictor:
         Get occupancy predictions for all scheduled rooms
         Returns list of rooms likely to be cancelled
         """
-        from app.models import Room, Timetable
+        from app.models import Room, Timetable, CancellationPattern
         
         current_time = datetime.now()
         day_of_week = current_time.weekday()
         hour = current_time.hour
         
-        # Get all rooms with current schedules
-        scheduled_rooms = db.session.query(Room).join(Timetable).filter(
+        # Today's schedules with their rooms, and this hour's cancellation
+        # patterns: two queries for the whole campus
+        scheduled = db.session.query(Timetable, Room).join(Room, Room.id == Timetable.room_id).filter(
             Timetable.day_of_week == day_of_week
-        ).distinct().all()
+        ).order_by(Room.id, Timetable.id).all()
+        patterns = {
+            pattern.room_id: pattern
+            for pattern in CancellationPattern.query.filter_by(day_of_week=day_of_week, hour=hour)
+        }
         
         predictions = []
         likely_cancelled = []
         
-        for room in scheduled_rooms:
+        for schedule, room in scheduled:
             # Check if current hour is within schedule
-            schedules = Timetable.query.filter_by(
-                room_id=room.id,
-                day_of_week=day_of_week
-            ).all()
-            
-            for schedule in schedules:
-                if schedule.start_time.hour <= hour < schedule.end_time.hour:
-                    prediction = self.predict_room_occupancy(room.id, day_of_week, hour)
-                    predictions.append({
+            if schedule.start_time.hour <= hour < schedule.end_time.hour:
+                prediction = self._occupancy_prediction(room.id, True, patterns.get(room.id))
+                predictions.append({
+                    'room_id': room.id,
+                    'room_name': room.name,
+                    'room_type': room.type,
+                    **prediction
+                })
+                
+                if not prediction.get('predicted_occupied', True):
+                    likely_cancelled.append({
                         'room_id': room.id,
                         'room_name': room.name,
                         'room_type': room.type,
-                        **prediction
+                        'cancellation_probability': round(1 - prediction.get('occupancy_probability', 0.5), 3),
+                        'auto_cutoff_enabled': prediction.get('auto_cutoff_enabled', False)
                     })
-                    
-                    if not prediction.get('predicted_occupied', True):
-                        likely_cancelled.append({
-                            'room_id': room.id,
-                            'room_name': room.name,
-                            'room_type': room.type,
-                            'cancellation_probability': round(1 - prediction.get('occupancy_probability', 0.5), 3),
-                            'auto_cutoff_enabled': prediction.get('auto_cutoff_enabled', False)
-                        })
         
         return {
             'timestamp': current_time.isoformat(),
@@ -416,4 +451,23 @@ class EnergyPredictor:
             'likely_cancelled_count': len(likely_cancelled),
             'predictions': predictions,
             'likely_cancelled': sorted(likely_cancelled, key=lambda x: x['cancellation_probability'], reverse=True)
-        }
\ No newline at end of file
+        }
+
+
+@cached(ttl_seconds=600, depends_on=('tick', 'model'), shared=True, name='prediction.next_hour', key=lambda predictor: 'campus')
+def cached_next_hour_prediction(predictor):
+    """predict_next_hour() shared by every request and worker until the next
+    tick or model change (10 minutes at most); errors raise LookupError"""
+    prediction, error = predictor.predict_next_hour()
+    if error:
+        raise LookupError(error)
+    return prediction
+
+
+@cached(ttl_seconds=600, depends_on=('tick', 'model'), shared=True, name='prediction.30_min', key=lambda predictor: 'campus')
+def cached_30_minute_prediction(predictor):
+    """predict_30_minutes_ahead() cached the same way"""
+    prediction, error = predictor.predict_30_minutes_ahead()
+    if error:
+        raise LookupError(error)
+    return prediction
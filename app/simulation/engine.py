@@ -4,11 +4,22 @@ import json
 from datetime import datetime
 from sqlalchemy.exc import OperationalError
 from app.models import (
-    db, Room, Timetable, EnergyLog, EnergySource, GridStatus, Building,
+    db, Room, Timetable, EnergyLog, EnergySource, GridStatus,
     AutonomousLog, CancellationPattern, PowerSourceConfig
 )
 from app.optimization.optimizer import EnergyOptimizer
 from app.optimization.smart_power_controller import SmartPowerController
+from app.analytics.occupancy_cube import OccupancyCube
+from app.analytics.anomaly_detector import anomaly_detector
+from app.analytics.demand_tracker import demand_tracker
+from app.analytics.load_rollup import load_rollup
+from app.analytics.campus_series import CampusSeriesStore
+from app.analytics.topology import topology
+from app.utils.data_version import data_version
+from app.utils.live_stream import live_broadcaster
+from app.utils.change_feed import change_feed
+from app.utils.worker_ipc import worker_channel
+from app.utils.metrics import metrics, PhaseTimer
 
 
 class IoTSimulator:
@@ -114,13 +125,7 @@ class IoTSimulator:
             return 0.0
         
         # Get rooms in this building
-        building = Building.query.get(building_id)
-        if not building:
-            return 0.0
-        
-        room_ids = []
-        for floor in building.floors:
-            room_ids.extend([room.id for room in floor.rooms])
+        room_ids = topology.get().building_room_ids(building_id)
         
         if not room_ids:
             return 0.0
@@ -248,6 +253,7 @@ class IoTSimulator:
     @staticmethod
     def simulate_all_rooms():
         """Run simulation for all rooms with ML-driven optimization"""
+        phases = PhaseTimer()
         current_time = datetime.now()
         day_of_week = current_time.weekday()
         hour = current_time.hour
@@ -265,9 +271,18 @@ class IoTSimulator:
         # Track building loads for spike detection
         building_loads = {}
         
+        # Per-room readings folded into the hour-of-week cube
+        cube_readings = []
+        temperature_sum = 0.0
+        
+        snapshot = topology.get()
+        
         for idx, room in enumerate(rooms):
-            # Get building ID through floor relationship
-            building_id = room.floor.building_id
+            # Building ID from the topology snapshot (lazy floor load only for
+            # a room committed after the snapshot's version was read)
+            building_id = snapshot.building_of(room.id)
+            if building_id is None:
+                building_id = room.floor.building_id
             
             # Generate random temperature (24-36°C)
             temperature = round(random.uniform(24, 36), 1)
@@ -334,6 +349,12 @@ class IoTSimulator:
                 building_loads[building_id] = 0
             building_loads[building_id] += energy_log.total_load
             
+            cube_readings.append((
+                room.id, building_id, energy_log.total_load,
+                energy_log.occupancy, energy_log.optimized
+            ))
+            temperature_sum += energy_log.temperature
+            
             db.session.add(energy_log)
             logs_created += 1
             
@@ -341,14 +362,58 @@ class IoTSimulator:
             if (idx + 1) % batch_size == 0:
                 IoTSimulator._commit_with_retry()
         
+        phases.mark('rooms')
+        
         # Check for demand spikes per building
         spikes_detected = 0
         for building_id, current_load in building_loads.items():
             if IoTSimulator.check_and_handle_demand_spike(building_id, current_load):
                 spikes_detected += 1
+        phases.mark('demand_spikes')
+        
+        # Score readings against per-room baselines (before the cube absorbs this tick)
+        anomalies_detected = anomaly_detector.process_tick(current_time, cube_readings)
+        phases.mark('anomalies')
+        
+        # Update hour-of-week cube (same transaction as the tick)
+        OccupancyCube.record_tick(current_time, cube_readings)
+        phases.mark('occupancy_cube')
+        
+        # Update top-K wasters and peak demand trackers (closes day/month windows)
+        demand_tracker.process_tick(current_time, cube_readings)
+        phases.mark('demand_tracker')
+        
+        # Add building/campus totals to this hour's quantile sketches
+        load_rollup.process_tick(current_time, cube_readings)
+        phases.mark('load_rollup')
+        
+        # Campus tick/hour/day series for downsampled history charts
+        CampusSeriesStore.process_tick(current_time, cube_readings, temperature_sum)
+        phases.mark('campus_series')
+        
+        # Append the tick's aggregates to the /sync change sequence
+        change_feed.record_tick(current_time, cube_readings, temperature_sum)
+        phases.mark('change_feed')
         
         # Final commit
         IoTSimulator._commit_with_retry()
+        phases.mark('commit')
+        
+        # Invalidate ETags of every tick-derived view
+        data_version.bump('tick', tick_id=current_time)
+        
+        # Push the tick to SSE subscribers (one shared payload)
+        live_broadcaster.publish_tick(current_time, cube_readings)
+        
+        # Notify API processes over the worker socket (no-op unless serving)
+        worker_channel.publish('tick', tick_id=current_time.isoformat())
+        phases.mark('publish')
+        
+        for phase, seconds in phases.phases:
+            metrics.observe('voltonic_tick_phase_duration_seconds', seconds, phase=phase)
+        metrics.observe('voltonic_tick_duration_seconds', phases.total())
+        metrics.inc('voltonic_tick_rows_written_total', logs_created, table='energy_log')
+        metrics.publish(force=True)
         
         # Enhanced logging
         status_parts = [
@@ -359,10 +424,12 @@ class IoTSimulator:
             status_parts.append(f"🔌 Auto-cutoff {auto_cutoffs}")
         if spikes_detected > 0:
             status_parts.append(f"⚡ Spikes {spikes_detected}")
+        if anomalies_detected > 0:
+            status_parts.append(f"🚨 Anomalies {anomalies_detected}")
         if solar_availability < 1.0:
             status_parts.append(f"☀️ Solar {int(solar_availability*100)}%")
         
-        print(f" {' | '.join(status_parts)} at {current_time.strftime('%H:%M:%S')}")
+        print(f" {' | '.join(status_parts)} at {current_time.strftime('%H:%M:%S')} ({phases.total():.2f}s)")
         
         return logs_created, optimizations_applied
     
@@ -375,10 +442,12 @@ class IoTSimulator:
                 return True
             except OperationalError as e:
                 if "database is locked" in str(e) and attempt < max_retries - 1:
+                    metrics.inc('voltonic_db_commit_retries_total')
                     wait_time = initial_wait * (2 ** attempt)  # Exponential backoff
                     time.sleep(wait_time)
                     db.session.rollback()
                 else:
                     db.session.rollback()
+                    metrics.inc('voltonic_db_commit_failures_total')
                     raise
         return False
\ No newline at end of file
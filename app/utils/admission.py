@@ -0,0 +1,186 @@
+"""
+Admission control (load shedding) for expensive endpoints
+- Each @admission_control endpoint has its own gate: a concurrency limit
+  plus a bounded FIFO wait queue; it also passes the gate of its cost
+  class, so all heavy endpoints together never hold more than a share of
+  the worker's threads and database connections
+- A request that finds the queue full, or waits past the class's queue
+  timeout, fails fast with 503 + Retry-After (estimated from recent service
+  times); ungated live endpoints keep their latency during spikes
+- Gates are per process: every worker has its own threads and pool
+"""
+
+import math
+import time
+import threading
+from functools import wraps
+from flask import jsonify
+
+# Cost classes: per-endpoint and class-wide concurrency, waiting requests per gate, max wait (s)
+COST_CLASSES = {
+    'heavy': {'endpoint_concurrency': 2, 'class_concurrency': 4, 'max_queue': 4, 'queue_timeout': 5.0}
+}
+
+
+class AdmissionGate:
+    """Counting semaphore with a bounded FIFO wait queue"""
+    
+    MAX_RETRY_AFTER = 60
+    
+    def __init__(self, name, max_concurrent, max_queue):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._cond = threading.Condition()
+        self._queue = []  # Tickets of waiting requests, oldest first
+        self._next_ticket = 0
+        self.active = 0
+        self.avg_seconds = 1.0  # EWMA of admitted request durations
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.peak_active = 0
+    
+    def retry_after(self):
+        """Seconds until a slot is likely free (caller holds the condition)"""
+        backlog = (self.active + len(self._queue) + 1) / self.max_concurrent
+        return min(self.MAX_RETRY_AFTER, max(1, math.ceil(backlog * self.avg_seconds)))
+    
+    def acquire(self, timeout):
+        """
+        Take a slot, waiting in line for at most timeout seconds
+        
+        Returns:
+            tuple: (admitted: bool, retry_after: int)
+        """
+        with self._cond:
+            if self.active < self.max_concurrent and not self._queue:
+                self._admit()
+                return True, 0
+            if len(self._queue) >= self.max_queue or timeout <= 0:
+                self.rejected += 1
+                return False, self.retry_after()
+            
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._queue.append(ticket)
+            self.queued += 1
+            deadline = time.monotonic() + timeout
+            try:
+                while self._queue[0] != ticket or self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        return False, self.retry_after()
+                    self._cond.wait(remaining)
+                self._admit()
+                return True, 0
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()  # The next ticket may be at the head now
+    
+    def _admit(self):
+        self.active += 1
+        self.admitted += 1
+        self.peak_active = max(self.peak_active, self.active)
+    
+    def release(self, duration):
+        with self._cond:
+            self.active -= 1
+            self.avg_seconds += 0.2 * (duration - self.avg_seconds)
+            self._cond.notify_all()
+    
+    def get_stats(self):
+        with self._cond:
+            return {
+                'active': self.active,
+                'waiting': len(self._queue),
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'avg_seconds': round(self.avg_seconds, 3),
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'peak_active': self.peak_active
+            }
+
+
+class AdmissionController:
+    """Gates of all cost classes and gated endpoints in this process"""
+    
+    def __init__(self, cost_classes):
+        self.cost_classes = cost_classes
+        self.class_gates = {
+            name: AdmissionGate(name, spec['class_concurrency'], spec['max_queue'])
+            for name, spec in cost_classes.items()
+        }
+        self.endpoint_gates = {}
+    
+    def endpoint_gate(self, endpoint, cost_class, max_concurrent=None):
+        spec = self.cost_classes[cost_class]
+        gate = AdmissionGate(endpoint, max_concurrent or spec['endpoint_concurrency'], spec['max_queue'])
+        self.endpoint_gates[endpoint] = gate
+        return gate
+    
+    def get_stats(self):
+        return {
+            'classes': {name: gate.get_stats() for name, gate in self.class_gates.items()},
+            'endpoints': {name: gate.get_stats() for name, gate in self.endpoint_gates.items()}
+        }
+
+
+# Global controller (used by @admission_control, reported by /health)
+admission = AdmissionController(COST_CLASSES)
+
+
+def _shed(gate, retry_after):
+    response = jsonify({
+        'status': 'error',
+        'message': f'Server busy ({gate.name}). Try again in {retry_after} seconds.',
+        'retry_after': retry_after
+    })
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 503
+
+
+def admission_control(cost_class='heavy', max_concurrent=None):
+    """
+    Decorator limiting how many requests of an endpoint run at once
+    
+    Place it below @rate_limit and @conditional_get, so 304s and cached
+    bodies never take a slot. Not for streaming responses: the slot is
+    released when the view returns.
+    
+    Args:
+        cost_class: Key of COST_CLASSES
+        max_concurrent: Per-endpoint limit (default: the class's endpoint_concurrency)
+    """
+    timeout = COST_CLASSES[cost_class]['queue_timeout']
+    
+    def decorator(f):
+        endpoint_gate = admission.endpoint_gate(f.__name__, cost_class, max_concurrent)
+        class_gate = admission.class_gates[cost_class]
+        
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            deadline = time.monotonic() + timeout
+            admitted, retry_after = endpoint_gate.acquire(timeout)
+            if not admitted:
+                return _shed(endpoint_gate, retry_after)
+            
+            started = time.monotonic()
+            try:
+                admitted, retry_after = class_gate.acquire(deadline - started)
+                if not admitted:
+                    return _shed(class_gate, retry_after)
+                running = time.monotonic()
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    class_gate.release(time.monotonic() - running)
+            finally:
+                endpoint_gate.release(time.monotonic() - started)
+        return decorated_function
+    return decorator
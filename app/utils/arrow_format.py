@@ -0,0 +1,104 @@
+"""
+Apache Arrow IPC responses for bulk time-series endpoints
+- Clients opt in with `Accept: application/vnd.apache.arrow.stream`; JSON
+  stays the default for every other Accept header
+- Query results are fetched from the DBAPI cursor as tuples and transposed
+  into columns, so no per-row dicts or Row objects are built
+- pyarrow is optional: without it Arrow requests get 406 Not Acceptable
+"""
+
+from flask import request, jsonify, current_app
+from app.models import db
+
+try:
+    import pyarrow as pa
+except ImportError:  # Optional dependency
+    pa = None
+
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+
+def wants_arrow():
+    """True when the request's Accept header prefers Arrow over JSON"""
+    best = request.accept_mimetypes.best_match(['application/json', ARROW_MIMETYPE])
+    return best == ARROW_MIMETYPE and request.accept_mimetypes[ARROW_MIMETYPE] > 0
+
+
+def _arrow_type(name):
+    return {
+        'timestamp': pa.timestamp('us'),
+        'date': pa.date32(),
+        'float': pa.float64(),
+        'int': pa.int64(),
+        'bool': pa.bool_(),
+        'string': pa.string()
+    }[name]
+
+
+def fetch_columns(stmt):
+    """
+    Execute a select and return its result column-wise
+    
+    Args:
+        stmt: Core select or ORM query statement (query.statement)
+    
+    Returns:
+        tuple: (column names, list of column tuples)
+    """
+    result = db.session.connection().execute(stmt)
+    try:
+        names = list(result.keys())
+        rows = result.cursor.fetchall()
+    finally:
+        result.close()
+    columns = list(zip(*rows)) if rows else [() for _ in names]
+    return names, columns
+
+
+def build_table(names, columns, types):
+    """
+    Arrow table from raw columns
+    
+    SQLite hands back datetimes as ISO text and booleans as 0/1; both are
+    cast to their Arrow types here, in C.
+    
+    Args:
+        names: Column names
+        columns: Column value sequences
+        types: column name -> 'timestamp' | 'date' | 'float' | 'int' | 'bool' | 'string'
+    """
+    arrays = [
+        pa.array(column).cast(_arrow_type(types.get(name, 'float')))
+        for name, column in zip(names, columns)
+    ]
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def table_to_ipc(table):
+    """Serialize a table as an Arrow IPC stream"""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def arrow_response(names, columns, types, transform=None):
+    """
+    Arrow IPC stream response (406 when pyarrow is not installed)
+    
+    Args:
+        names, columns, types: See build_table
+        transform: Optional callable(table) -> table (e.g. downsampling)
+    """
+    if pa is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'{ARROW_MIMETYPE} requires the pyarrow package; use application/json'
+        }), 406
+    
+    table = build_table(names, columns, types)
+    if transform is not None:
+        table = transform(table)
+    response = current_app.response_class(table_to_ipc(table), mimetype=ARROW_MIMETYPE)
+    response.headers['X-Row-Count'] = str(table.num_rows)
+    return response
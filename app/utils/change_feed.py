@@ -0,0 +1,219 @@
+"""
+Change sequence for incremental sync (/api/sync)
+- Every simulator tick appends one row carrying its campus/building aggregates
+- Autonomous actions, grid status rows and room/floor/building edits are
+  captured by an after_flush listener, in the same transaction as the change
+- seq comes from SQLite AUTOINCREMENT, so it only grows; SQLite has a single
+  writer, so a lower seq is never committed after a higher one and a cursor
+  can never skip a change
+- Rows older than RETENTION_HOURS are pruned; cursors behind that are expired
+"""
+
+import json
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from app.models import db, ChangeLog, AutonomousLog, GridStatus, Room, Floor, Building
+
+# Model -> change kind; config kinds also record updates and deletes
+TRACKED = {AutonomousLog: 'action', GridStatus: 'grid', Room: 'room', Floor: 'floor', Building: 'building'}
+CONFIG_KINDS = ('room', 'floor', 'building')
+KINDS = ('tick', 'action', 'grid') + CONFIG_KINDS
+
+
+class SyncCursorExpired(LookupError):
+    """The cursor predates the retained change log (client must resync)"""
+
+
+class ChangeFeed:
+    """Appends to and reads the change log"""
+    
+    RETENTION_HOURS = 48
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_prune = None
+    
+    @staticmethod
+    def changes_in_flush(session):
+        """Change rows for the tracked objects of a flush (ids are assigned by now)"""
+        now = datetime.now()
+        rows = []
+        
+        def add(obj, op):
+            rows.append({'created_at': now, 'kind': TRACKED[type(obj)], 'op': op, 'entity_id': obj.id, 'payload': None})
+        
+        for obj in session.new:
+            if type(obj) in TRACKED:
+                add(obj, 'insert')
+        for obj in session.dirty:
+            if TRACKED.get(type(obj)) in CONFIG_KINDS and session.is_modified(obj, include_collections=False):
+                add(obj, 'update')
+        for obj in session.deleted:
+            if TRACKED.get(type(obj)) in CONFIG_KINDS:
+                add(obj, 'delete')
+        return rows
+    
+    def record_tick(self, timestamp, readings, temperature_sum):
+        """
+        Append a tick's campus and per-building aggregates
+        
+        Args:
+            timestamp: Tick timestamp
+            readings: Sequence of (room_id, building_id, total_load, occupancy, optimized)
+            temperature_sum: Sum of the rooms' temperatures this tick
+        
+        Caller commits
+        """
+        if not readings:
+            return
+        
+        buildings = {}
+        for _, building_id, total_load, _, _ in readings:
+            buildings[building_id] = buildings.get(building_id, 0.0) + total_load
+        
+        payload = {
+            'timestamp': timestamp.isoformat(),
+            'total_load_kw': round(sum(buildings.values()), 2),
+            'avg_temperature': round(temperature_sum / len(readings), 2),
+            'occupied_rooms': sum(1 for r in readings if r[3]),
+            'optimized_rooms': sum(1 for r in readings if r[4]),
+            'buildings': [
+                {'building_id': building_id, 'total_load_kw': round(load, 2)}
+                for building_id, load in sorted(buildings.items())
+            ]
+        }
+        db.session.execute(ChangeLog.__table__.insert(), [{
+            'created_at': timestamp,
+            'kind': 'tick',
+            'op': 'insert',
+            'entity_id': None,
+            'payload': json.dumps(payload, separators=(',', ':'))
+        }])
+        
+        # Prune at most once an hour
+        with self._lock:
+            if self._last_prune and timestamp - self._last_prune < timedelta(hours=1):
+                return
+            self._last_prune = timestamp
+        cutoff = timestamp - timedelta(hours=self.RETENTION_HOURS)
+        ChangeLog.query.filter(ChangeLog.created_at < cutoff).delete(synchronize_session=False)
+    
+    @staticmethod
+    def _entities(changes):
+        """Fetch current state of the referenced entities, one query per kind"""
+        ids = {}
+        for change in changes:
+            if change.entity_id is not None:
+                ids.setdefault(change.kind, set()).add(change.entity_id)
+        
+        entities = {}
+        if 'action' in ids:
+            rows = db.session.query(AutonomousLog, Room.name, Building.name).outerjoin(
+                Room, Room.id == AutonomousLog.room_id
+            ).outerjoin(
+                Building, Building.id == AutonomousLog.building_id
+            ).filter(AutonomousLog.id.in_(ids['action'])).all()
+            for log, room_name, building_name in rows:
+                entities[('action', log.id)] = {
+                    'id': log.id,
+                    'timestamp': log.timestamp.isoformat(),
+                    'action_type': log.action_type,
+                    'room_id': log.room_id,
+                    'room_name': room_name,
+                    'building_id': log.building_id,
+                    'building_name': building_name,
+                    'reason': log.reason,
+                    'energy_saved_kwh': log.energy_saved_kwh,
+                    'is_optimization': log.is_optimization,
+                    'confidence_score': log.confidence_score
+                }
+        if 'grid' in ids:
+            for status in GridStatus.query.filter(GridStatus.id.in_(ids['grid'])).all():
+                entities[('grid', status.id)] = {
+                    'grid_available': status.grid_available,
+                    'timestamp': status.timestamp.isoformat(),
+                    'reason': status.reason
+                }
+        if 'room' in ids:
+            for room in Room.query.filter(Room.id.in_(ids['room'])).all():
+                entities[('room', room.id)] = {
+                    'id': room.id,
+                    'name': room.name,
+                    'type': room.type,
+                    'capacity': room.capacity,
+                    'base_load_kw': room.base_load_kw,
+                    'floor_id': room.floor_id
+                }
+        if 'floor' in ids:
+            for floor in Floor.query.filter(Floor.id.in_(ids['floor'])).all():
+                entities[('floor', floor.id)] = {'id': floor.id, 'number': floor.number, 'building_id': floor.building_id}
+        if 'building' in ids:
+            for building in Building.query.filter(Building.id.in_(ids['building'])).all():
+                entities[('building', building.id)] = {'id': building.id, 'name': building.name, 'faculty_id': building.faculty_id}
+        return entities
+    
+    @staticmethod
+    def read(since=None, limit=1000, kinds=None):
+        """
+        Changes after a cursor, oldest first
+        
+        Args:
+            since: Cursor (seq) from a previous read; None returns just the
+                current cursor, to start syncing after loading a snapshot
+            limit: Max changes
+            kinds: Optional subset of KINDS
+        
+        Returns:
+            dict: changes, count, cursor, has_more
+        
+        Raises:
+            SyncCursorExpired: Changes after `since` were already pruned
+        """
+        oldest, latest = db.session.query(func.min(ChangeLog.seq), func.max(ChangeLog.seq)).one()
+        latest = latest or 0
+        if since is None:
+            return {'changes': [], 'count': 0, 'cursor': str(latest), 'has_more': False}
+        if since > latest or (oldest is not None and since < oldest - 1):
+            raise SyncCursorExpired(f'Cursor {since} is outside the retained change log; reload and sync from the returned cursor')
+        
+        query = ChangeLog.query.filter(ChangeLog.seq > since)
+        if kinds:
+            query = query.filter(ChangeLog.kind.in_(kinds))
+        changes = query.order_by(ChangeLog.seq).limit(limit + 1).all()
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        
+        entities = ChangeFeed._entities(changes)
+        data = []
+        for change in changes:
+            if change.kind == 'tick':
+                payload = json.loads(change.payload)
+            else:
+                payload = entities.get((change.kind, change.entity_id))
+            data.append({
+                'seq': change.seq,
+                'kind': change.kind,
+                'op': change.op if payload is not None or change.op == 'delete' else 'delete',
+                'id': change.entity_id,
+                'at': change.created_at.isoformat(),
+                'data': payload
+            })
+        
+        # Without more pages, skip past filtered-out kinds up to the snapshot
+        last_seq = changes[-1].seq if changes else since
+        cursor = last_seq if has_more else max(last_seq, latest)
+        return {'changes': data, 'count': len(data), 'cursor': str(cursor), 'has_more': has_more}
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_flushed_changes(session, flush_context):
+    """Append change rows in the flushing transaction"""
+    rows = ChangeFeed.changes_in_flush(session)
+    if rows:
+        session.connection().execute(ChangeLog.__table__.insert(), rows)
+
+
+# Global change feed (fed by the simulator tick and the flush listener)
+change_feed = ChangeFeed()
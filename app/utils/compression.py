@@ -0,0 +1,88 @@
+"""
+Response compression for the API blueprint
+- Negotiates br (if the brotli package is installed) or gzip from Accept-Encoding
+- Only bodies above MIN_SIZE bytes are compressed; small payloads are not worth the CPU
+- Responses carrying an ETag are compressed once per (ETag, encoding) and the
+  bytes reused until the data version changes
+"""
+
+import gzip
+from app.utils.response_cache import response_cache
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+MIN_SIZE = 1024  # bytes
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_MIMETYPES = (
+    'application/json', 'text/plain', 'text/csv', 'text/html',
+    'application/vnd.apache.arrow.stream'
+)
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick the best supported encoding from an Accept-Encoding header"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        token, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            accepted[token.lower()] = q
+    
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+def compress_bytes(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(response, accept_encoding):
+    """
+    after_request hook body: compress the response in place when worthwhile
+    
+    Args:
+        response: Flask response
+        accept_encoding: Request Accept-Encoding header
+    
+    Returns:
+        The (possibly compressed) response
+    """
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding is None or (response.content_length or 0) < MIN_SIZE:
+        return response
+    
+    etag = response.headers.get('ETag')
+    key = ('compressed', etag, encoding)
+    body = response_cache.get(key) if etag else None
+    if body is None:
+        body = compress_bytes(response.get_data(), encoding)
+        if etag:
+            response_cache.set(key, body)
+    
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
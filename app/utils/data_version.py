@@ -0,0 +1,240 @@
+"""
+Data versions and conditional GET
+- Every data domain has a counter that writers bump after committing
+  (the simulator tick, topology edits, grid switches, model training)
+- GET endpoints tagged with @conditional_get derive a weak ETag from the
+  request URL and the versions they depend on; a matching If-None-Match
+  is answered with 304 before the view (and the database) is touched
+- With cache=True the serialized body is kept per ETag, so other clients
+  get the same bytes without re-running the view until the data changes
+- Multi-worker deployments keep the counters in shared memory
+  (attach_shared), so a bump in one process invalidates ETags in all
+"""
+
+import time
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from functools import wraps
+from email.utils import formatdate, parsedate_to_datetime
+from flask import request, make_response, current_app
+from app.utils.response_cache import response_cache
+from app.utils.arrow_format import wants_arrow, ARROW_MIMETYPE
+from app.utils import shared_state
+
+
+# Tick ids are naive local datetimes; stored as exact microsecond offsets
+_EPOCH = datetime(1970, 1, 1)
+
+
+class DataVersion:
+    """Per-domain mutation counters plus the latest tick id"""
+    
+    DOMAINS = ('tick', 'topology', 'grid', 'model')
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Process epoch keeps ETags from a previous run from matching after a restart
+        self.epoch = format(int(time.time()), 'x')
+        self.versions = {domain: 0 for domain in self.DOMAINS}
+        self.modified_at = {domain: time.time() for domain in self.DOMAINS}
+        self.tick_id = None
+        self._shared = None
+    
+    @staticmethod
+    def _slot_names():
+        return (
+            ['epoch', 'tick_id_us']
+            + [f'version:{domain}' for domain in DataVersion.DOMAINS]
+            + [f'modified_us:{domain}' for domain in DataVersion.DOMAINS]
+        )
+    
+    def attach_shared(self, path):
+        """
+        Keep the counters in a shared memory-mapped file so every worker of a
+        multi-process deployment sees every bump (see shared_state)
+        
+        Args:
+            path: Shared state file (created if missing)
+        
+        Returns:
+            bool: False when shared memory is unavailable (counters stay per process)
+        """
+        if shared_state.fcntl is None:
+            return False
+        
+        self._shared = shared_state.SharedCounters(path, self._slot_names())
+        if self._shared.get('epoch') == 0:
+            self.start_epoch()
+        return True
+    
+    def start_epoch(self):
+        """New epoch: ETags issued before (e.g. by a previous deployment) stop matching"""
+        now = time.time()
+        if self._shared is not None:
+            self._shared.update(values=dict(
+                {'epoch': int(now)},
+                **{f'modified_us:{domain}': int(now * 1_000_000) for domain in self.DOMAINS}
+            ))
+            return
+        with self._lock:
+            self.epoch = format(int(now), 'x')
+    
+    def bump(self, *domains, tick_id=None):
+        """
+        Mark domains as changed (call after the write is committed)
+        
+        Args:
+            *domains: Names from DOMAINS
+            tick_id: Timestamp of the tick that produced the change (optional)
+        """
+        for domain in domains:
+            if domain not in self.versions:
+                raise ValueError(f"Unknown data domain: {domain}")
+        
+        now = time.time()
+        if self._shared is not None:
+            values = {f'modified_us:{domain}': int(now * 1_000_000) for domain in domains}
+            if tick_id is not None:
+                values['tick_id_us'] = (tick_id - _EPOCH) // timedelta(microseconds=1)
+            self._shared.update(
+                increments={f'version:{domain}': 1 for domain in domains},
+                values=values
+            )
+            return
+        
+        with self._lock:
+            for domain in domains:
+                self.versions[domain] += 1
+                self.modified_at[domain] = now
+            if tick_id is not None:
+                self.tick_id = tick_id
+    
+    def get(self, domain):
+        if self._shared is not None:
+            return self._shared.get(f'version:{domain}')
+        return self.versions[domain]
+    
+    def get_epoch(self):
+        if self._shared is not None:
+            return format(self._shared.get('epoch'), 'x')
+        return self.epoch
+    
+    def get_tick_id(self):
+        """Timestamp of the latest tick (as written by whichever process ran it)"""
+        if self._shared is not None:
+            tick_us = self._shared.get('tick_id_us')
+            return _EPOCH + timedelta(microseconds=tick_us) if tick_us else None
+        return self.tick_id
+    
+    def snapshot(self, domains):
+        """Versions and newest modification time of the given domains"""
+        if self._shared is not None:
+            values = self._shared.get_many(
+                [f'version:{domain}' for domain in domains]
+                + [f'modified_us:{domain}' for domain in domains]
+            )
+            return values[:len(domains)], max(values[len(domains):]) / 1_000_000
+        
+        with self._lock:
+            versions = [self.versions[domain] for domain in domains]
+            modified = max(self.modified_at[domain] for domain in domains)
+        return versions, modified
+    
+    def get_status(self):
+        versions, _ = self.snapshot(self.DOMAINS)
+        tick_id = self.get_tick_id()
+        return {
+            'epoch': self.get_epoch(),
+            'tick_id': tick_id.isoformat() if tick_id else None,
+            'versions': dict(zip(self.DOMAINS, versions)),
+            'shared': self._shared.path if self._shared is not None else None
+        }
+
+
+# Global version registry (bumped by writers, read by conditional_get)
+data_version = DataVersion()
+
+# Time-relative views ("last 10 minutes") also expire on this clock even when no tick runs
+TICK_SECONDS = 60
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    # Weak comparison: W/ prefixes are ignored on both sides
+    bare = etag[2:] if etag.startswith('W/') else etag
+    for tag in header.split(','):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith('W/') else tag) == bare:
+            return True
+    return False
+
+
+def conditional_get(*domains, cache=False):
+    """
+    Decorator adding ETag/Last-Modified validation to a GET endpoint
+    
+    Usage:
+        @conditional_get('tick', 'topology')
+        def my_endpoint():
+            return jsonify({'data': 'something'})
+    
+    The ETag covers the full URL (path + query string) and the negotiated
+    representation (JSON or Arrow), so each is validated separately.
+    
+    Args:
+        *domains: Data domains the response depends on
+        cache: Keep the serialized JSON body per ETag (large, tick-invariant responses)
+    """
+    domains = domains or DataVersion.DOMAINS
+    for domain in domains:
+        if domain not in DataVersion.DOMAINS:
+            raise ValueError(f"Unknown data domain: {domain}")
+    
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Snapshot versions before the view runs: a write landing mid-request
+            # leaves the response with an older tag, which only costs a refetch
+            versions, modified = data_version.snapshot(domains)
+            parts = [data_version.get_epoch()] + [str(v) for v in versions]
+            if 'tick' in domains:
+                parts.append(str(int(time.time() // TICK_SECONDS)))
+            mimetype = ARROW_MIMETYPE if wants_arrow() else 'application/json'
+            url_hash = hashlib.blake2b(f'{request.full_path}|{mimetype}'.encode('utf-8'), digest_size=6).hexdigest()
+            etag = f'W/"{url_hash}-{"-".join(parts)}"'
+            last_modified = int(modified)
+            
+            not_modified = False
+            if_none_match = request.headers.get('If-None-Match')
+            if if_none_match:
+                not_modified = _etag_matches(if_none_match, etag)
+            elif 'If-Modified-Since' in request.headers and 'tick' not in domains:
+                try:
+                    since = parsedate_to_datetime(request.headers['If-Modified-Since']).timestamp()
+                    not_modified = last_modified <= since
+                except (TypeError, ValueError):
+                    not_modified = False
+            
+            cached_body = response_cache.get(('body', etag)) if cache and not not_modified else None
+            if not_modified:
+                response = make_response('', 304)
+            elif cached_body is not None:
+                response = current_app.response_class(cached_body, mimetype=mimetype)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if cache:
+                    response_cache.set(('body', etag), response.get_data())
+            
+            response.headers['ETag'] = etag
+            response.headers['Last-Modified'] = formatdate(last_modified, usegmt=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            response.vary.add('Accept')
+            return response
+        return decorated_function
+    return decorator
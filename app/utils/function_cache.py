@@ -0,0 +1,246 @@
+"""
+Function result cache (TTL + LRU + data-version invalidation + single-flight)
+- @cached memoizes a service function (or the payload builder behind an
+  endpoint) per argument key; whole response bodies are already cached per
+  ETag by @conditional_get(cache=True)
+- Entries record the data_version epoch and the counters of the domains
+  they depend on ('tick', 'model', ...): a bump invalidates them
+  immediately, the TTL is only a ceiling; the counters persist in the state
+  file across restarts, the epoch (new per deployment) does not match then
+- Concurrent misses for one key are coalesced: one caller computes, the
+  others wait for its result (or its exception, which is never cached)
+- shared=True adds a tier in shared memory (see shared_state.SharedBlobs),
+  so one worker's result serves every worker; values must be JSON-serializable
+"""
+
+import time
+import threading
+from functools import wraps
+from collections import OrderedDict
+from flask import current_app
+from app.utils import shared_state
+from app.utils.data_version import data_version
+
+
+class _Flight:
+    """A computation in progress that other callers can wait on"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class FunctionCache:
+    """Thread-safe TTL/LRU cache for one function"""
+    
+    def __init__(self, name, ttl_seconds=600, max_entries=128, depends_on=('tick',), shared=False):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.depends_on = tuple(depends_on)
+        self.shared = shared
+        self._blobs = None  # Set by FunctionCacheRegistry.attach_shared
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at monotonic, versions, value)
+        self._inflight = {}
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def _versions(self):
+        return (data_version.get_epoch(),) + tuple(data_version.get(domain) for domain in self.depends_on)
+    
+    def _shared_get(self, key, versions):
+        entry = self._blobs.get(f'{self.name}:{key}')
+        if entry is None:
+            return None
+        body, stored_at_us = entry
+        if time.time() - stored_at_us / 1_000_000 >= self.ttl_seconds:
+            return None
+        stored = current_app.json.loads(body)
+        if tuple(stored['versions']) != versions:
+            return None
+        return stored
+    
+    def _shared_set(self, key, versions, value):
+        body = current_app.json.dumps({'versions': versions, 'value': value}).encode('utf-8')
+        self._blobs.set(f'{self.name}:{key}', body, time.time() * 1_000_000)
+    
+    def lookup(self, key, compute):
+        """
+        Cached value for key, computing it at most once across concurrent callers
+        
+        Args:
+            key: Hashable key (str for shared caches)
+            compute: Zero-argument callable producing the value
+        
+        Returns:
+            tuple: (value, cached: bool)
+        """
+        versions = self._versions()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, entry_versions, value = entry
+                if expires_at > now and entry_versions == versions:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value, True
+                del self._entries[key]
+                if entry_versions != versions:
+                    self.invalidations += 1
+            
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, True
+        
+        cached = False
+        try:
+            stored = self._shared_get(key, versions) if self._blobs is not None else None
+            if stored is not None:
+                value, cached = stored['value'], True
+            else:
+                value = compute()
+                if self._blobs is not None:
+                    self._shared_set(key, versions, value)
+            flight.value = value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if flight.error is None:
+                    if cached:
+                        self.shared_hits += 1
+                    self._entries[key] = (time.monotonic() + self.ttl_seconds, versions, flight.value)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+                del self._inflight[key]
+            flight.done.set()
+        return value, cached
+    
+    def clear(self):
+        """Drop local entries and their shared copies"""
+        with self._lock:
+            keys = list(self._entries)
+            self._entries.clear()
+        if self._blobs is not None:
+            for key in keys:
+                self._blobs.delete(f'{self.name}:{key}')
+    
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'depends_on': list(self.depends_on),
+                'shared': self._blobs is not None,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round((self.hits + self.coalesced + self.shared_hits) / lookups, 3) if lookups else None
+            }
+
+
+class FunctionCacheRegistry:
+    """All @cached functions, for stats and the shared-memory tier"""
+    
+    def __init__(self):
+        self.caches = {}
+        self._blobs = None
+    
+    def register(self, cache):
+        self.caches[cache.name] = cache
+        if cache.shared:
+            cache._blobs = self._blobs
+        return cache
+    
+    def attach_shared(self, path):
+        """
+        Back shared=True caches with a shared blob file for all workers
+        
+        Args:
+            path: Shared blob file (created if missing)
+        
+        Returns:
+            bool: False when shared memory is unavailable (caches stay per process)
+        """
+        if shared_state.fcntl is None:
+            return False
+        self._blobs = shared_state.SharedBlobs(path)
+        for cache in self.caches.values():
+            if cache.shared:
+                cache._blobs = self._blobs
+        return True
+    
+    def get_stats(self):
+        return {name: cache.get_stats() for name, cache in self.caches.items()}
+
+
+# Global registry (attached in create_app, reported by /cache/stats)
+function_caches = FunctionCacheRegistry()
+
+
+def cached(ttl_seconds=600, max_entries=128, depends_on=('tick',), shared=False, name=None, key=None):
+    """
+    Decorator caching a function's result per arguments
+    
+    Args:
+        ttl_seconds: Maximum entry age
+        max_entries: LRU bound per process
+        depends_on: data_version domains whose bump invalidates entries
+        shared: Also keep entries in shared memory for all workers
+        name: Cache name in stats (default: module.function)
+        key: Callable(*args, **kwargs) -> key (default: the arguments;
+            shared caches need a key that is stable across processes)
+    
+    The wrapper gains .lookup(*args, **kwargs) -> (value, cached) and .cache.
+    
+    Usage:
+        @cached(ttl_seconds=300, depends_on=('tick',))
+        def building_summary(building_id):
+            ...
+    """
+    def decorator(f):
+        cache = function_caches.register(FunctionCache(
+            name or f'{f.__module__}.{f.__qualname__}', ttl_seconds, max_entries, depends_on, shared
+        ))
+        
+        def make_key(args, kwargs):
+            if key is not None:
+                return key(*args, **kwargs)
+            return (args, tuple(sorted(kwargs.items()))) if kwargs else args
+        
+        def lookup(*args, **kwargs):
+            return cache.lookup(make_key(args, kwargs), lambda: f(*args, **kwargs))
+        
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            return lookup(*args, **kwargs)[0]
+        
+        wrapper.lookup = lookup
+        wrapper.cache = cache
+        return wrapper
+    return decorator
@@ -1,31 +1,42 @@
 import random
 from datetime import datetime, timedelta
-from app.models import db, Room, Timetable, EnergyLog
+from app.models import db, Room, Timetable, EnergyLog, EnergySource
 from app.simulation.engine import IoTSimulator
 from app.optimization.optimizer import EnergyOptimizer
+from app.analytics.occupancy_cube import OccupancyCube
+from app.analytics.load_rollup import load_rollup
+from app.analytics.campus_series import CampusSeriesStore
 
 class HistoricalDataGenerator:
     """Generate realistic historical data for testing ML model"""
     
     @staticmethod
-    def generate_historical_logs(days_back=7, interval_minutes=60):
+    def generate_historical_logs(days_back=7, interval_minutes=60, progress=None):
         """
         Generate historical energy logs for past N days
         
         Args:
             days_back: Number of days to generate data for
             interval_minutes: Time interval between logs (default 60 min)
+            progress: Optional callable(percent, message), called after each
+                committed interval (e.g. JobContext.progress)
         """
         print(f"\n Generating {days_back} days of historical data...\n")
         
         rooms = Room.query.all()
         total_rooms = len(rooms)
         
+        # Logs start on the grid; the optimizer moves eligible ones to solar
+        grid_source = EnergySource.query.filter_by(name='grid').first()
+        if grid_source is None:
+            raise ValueError("No 'grid' energy source. Seed the database first.")
+        
         # Calculate time range
         end_time = datetime.now()
         start_time = end_time - timedelta(days=days_back)
         
         current_time = start_time
+        expected_iterations = int((end_time - start_time) / timedelta(minutes=interval_minutes)) + 1
         total_iterations = 0
         total_logs = 0
         
@@ -55,6 +66,7 @@ class HistoricalDataGenerator:
                 # Create energy log
                 energy_log = EnergyLog(
                     room_id=room.id,
+                    energy_source_id=grid_source.id,
                     timestamp=current_time,
                     **load_data
                 )
@@ -76,6 +88,8 @@ class HistoricalDataGenerator:
             if total_iterations % 24 == 0:
                 days_completed = total_iterations / 24
                 print(f" Generated {days_completed:.1f} days | {total_logs:,} logs | Latest: {current_time.strftime('%Y-%m-%d %H:%M')}")
+            if progress:
+                progress(100 * total_iterations / expected_iterations, f"Generating {current_time.strftime('%Y-%m-%d')}")
             
             # Move to next interval
             current_time += timedelta(minutes=interval_minutes)
@@ -111,6 +125,15 @@ def generate_historical_data_command(days=7):
         generator = HistoricalDataGenerator()
         total_logs = generator.generate_historical_logs(days_back=days)
         
+        # Bulk inserts bypass the per-tick cube update
+        print(" Rebuilding hour-of-week cube...")
+        cells = OccupancyCube.rebuild()
+        print(f" Cube rebuilt: {cells:,} cells")
+        rows = load_rollup.rebuild()
+        print(f" Load rollups rebuilt: {rows:,} hourly rows")
+        rows = CampusSeriesStore.rebuild()
+        print(f" Campus series rebuilt: {rows:,} rows")
+        
         print("\n" + "="*60 + "\n")
 
 if __name__ == "__main__":
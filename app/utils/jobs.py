@@ -0,0 +1,294 @@
+"""
+Background jobs (model training, historical backfills, rollup rebuilds, exports)
+- Submitting a job stores a queued row in the job table and returns its id
+  at once; the job pool of the scheduler leader (run.py / worker.py) claims
+  queued rows and runs their handlers on a few worker threads
+- The table is the queue: any process can submit, poll or cancel, queued
+  jobs survive restarts, and jobs that were running when the leader died
+  are marked failed by the next leader
+- Handlers report progress through JobContext.progress(), which also makes
+  cancellation take effect (cooperatively, at the next report)
+"""
+
+import time
+import threading
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import update, select, func
+from sqlalchemy.exc import OperationalError
+from app.models import db, Job
+
+STATUSES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class JobCancelled(Exception):
+    """Raised by JobContext.progress() once the job has been cancelled"""
+
+
+class JobContext:
+    """What a handler gets: the job id, its parameters and a progress reporter"""
+    
+    REPORT_SECONDS = 1.0  # Min interval between progress writes with an unchanged message
+    
+    def __init__(self, job_id, params):
+        self.job_id = job_id
+        self.params = params
+        self._reported_at = 0.0
+        self._message = None
+    
+    def progress(self, percent, message=None):
+        """
+        Record progress and check for cancellation
+        
+        Writes through its own connection, so call it between the handler's
+        commits (an open write transaction would block the update).
+        
+        Args:
+            percent: 0-100
+            message: Current stage (a new message is always written)
+        
+        Raises:
+            JobCancelled: The job was cancelled; the handler should stop
+        """
+        now = time.monotonic()
+        if message == self._message and now - self._reported_at < self.REPORT_SECONDS:
+            return
+        self._reported_at = now
+        
+        values = {'progress': round(min(max(percent, 0.0), 100.0), 1), 'updated_at': datetime.now()}
+        if message is not None:
+            self._message = message
+            values['message'] = message[:200]
+        
+        with db.engine.begin() as conn:
+            conn.execute(update(Job).where(Job.id == self.job_id).values(**values))
+            cancelled = conn.execute(select(Job.cancel_requested).where(Job.id == self.job_id)).scalar()
+        if cancelled:
+            raise JobCancelled()
+
+
+def serialize_job(job):
+    """Job row -> API dict, with an ETA extrapolated from the progress rate"""
+    eta_seconds = None
+    if job.status == 'running' and job.started_at and job.updated_at and 0 < job.progress < 100:
+        elapsed = (job.updated_at - job.started_at).total_seconds()
+        since_report = (datetime.now() - job.updated_at).total_seconds()
+        eta_seconds = max(0, round(elapsed * (100 - job.progress) / job.progress - since_report))
+    
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'params': current_app.json.loads(job.params) if job.params else {},
+        'progress': job.progress,
+        'message': job.message,
+        'eta_seconds': eta_seconds,
+        'result': current_app.json.loads(job.result) if job.result else None,
+        'error': job.error,
+        'cancel_requested': job.cancel_requested,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+class JobQueue:
+    """Handler registry, submission/cancellation, and the worker pool"""
+    
+    WORKERS = 2
+    POLL_SECONDS = 1.0  # Jobs submitted by other processes are picked up within this
+    FINISH_RETRIES = 8  # Final status write vs "database is locked" (~13 s with backoff)
+    
+    def __init__(self):
+        self.handlers = {}  # kind -> (handler, validate, unique)
+        self._app = None
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self.running = {}  # job_id -> kind, in this process
+        self.finished = {'succeeded': 0, 'failed': 0, 'cancelled': 0}
+    
+    def register(self, kind, handler, validate=None, unique=False):
+        """
+        Register a job kind
+        
+        Args:
+            kind: Job kind name
+            handler: Callable(JobContext) -> JSON-serializable result; raise to fail
+            validate: Callable(params dict) -> normalized params; raise ValueError
+                to reject a submission
+            unique: Submitting while a job of this kind is queued or running
+                returns that job instead of queueing another
+        """
+        self.handlers[kind] = (handler, validate, unique)
+    
+    def submit(self, kind, params=None):
+        """
+        Queue a job
+        
+        Returns:
+            tuple: (Job, created: bool)
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"kind must be one of: {sorted(self.handlers)}")
+        _, validate, unique = self.handlers[kind]
+        params = validate(params or {}) if validate else (params or {})
+        
+        if unique:
+            existing = Job.query.filter(
+                Job.kind == kind, Job.status.in_(ACTIVE_STATUSES)
+            ).order_by(Job.id).first()
+            if existing is not None:
+                return existing, False
+        
+        job = Job(kind=kind, status='queued', params=current_app.json.dumps(params), created_at=datetime.now())
+        db.session.add(job)
+        db.session.commit()
+        self._wakeup.set()
+        return job, True
+    
+    def cancel(self, job_id):
+        """
+        Cancel a queued job, or ask a running one to stop
+        
+        Returns:
+            Job or None: The job after the request (None if it doesn't exist)
+        """
+        now = datetime.now()
+        db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status == 'queued')
+            .values(status='cancelled', message='Cancelled before start', updated_at=now, finished_at=now)
+        )
+        db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status == 'running').values(cancel_requested=True)
+        )
+        db.session.commit()
+        return db.session.get(Job, job_id, populate_existing=True)
+    
+    def start(self, app, workers=WORKERS):
+        """Start the worker pool (scheduler leader only: one pool per deployment)"""
+        if self._threads:
+            return
+        self._app = app
+        
+        with app.app_context():
+            now = datetime.now()
+            orphaned = db.session.execute(
+                update(Job).where(Job.status == 'running').values(
+                    status='failed', error='Interrupted: the process running it exited',
+                    updated_at=now, finished_at=now
+                )
+            ).rowcount
+            db.session.commit()
+        if orphaned:
+            print(f"⚠️  Marked {orphaned} interrupted job(s) as failed")
+        
+        for i in range(workers):
+            thread = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"🧵 Job pool started ({workers} workers)")
+    
+    def _claim(self):
+        """Atomically move the oldest queued job to running; returns its id or None"""
+        with self._app.app_context():
+            candidates = db.session.execute(
+                select(Job.id).where(Job.status == 'queued').order_by(Job.id).limit(self.WORKERS + 1)
+            ).scalars().all()
+            for job_id in candidates:
+                now = datetime.now()
+                claimed = db.session.execute(
+                    update(Job).where(Job.id == job_id, Job.status == 'queued')
+                    .values(status='running', started_at=now, updated_at=now)
+                ).rowcount
+                db.session.commit()
+                if claimed:
+                    return job_id
+        return None
+    
+    def _work(self):
+        while True:
+            try:
+                job_id = self._claim()
+            except Exception as e:
+                print(f"❌ Job pool error: {e}")
+                job_id = None
+            if job_id is None:
+                self._wakeup.wait(self.POLL_SECONDS)
+                self._wakeup.clear()
+                continue
+            try:
+                self._execute(job_id)
+            except Exception as e:
+                # Never let one job take the worker thread down with it
+                print(f"❌ Job pool error (job {job_id}): {e}")
+    
+    def _execute(self, job_id):
+        with self._app.app_context():
+            job = db.session.get(Job, job_id)
+            if job is None:
+                print(f"⚠️  Job {job_id} vanished after it was claimed")
+                return
+            kind = job.kind
+            context = JobContext(job_id, current_app.json.loads(job.params) if job.params else {})
+            with self._lock:
+                self.running[job_id] = kind
+            
+            values = {}
+            try:
+                handler = self.handlers[kind][0]
+                result = handler(context)
+                status = 'succeeded'
+                values = {'progress': 100.0, 'message': 'Completed', 'result': current_app.json.dumps(result)}
+            except JobCancelled:
+                db.session.rollback()
+                status = 'cancelled'
+                values = {'message': 'Cancelled'}
+            except Exception as e:
+                db.session.rollback()
+                status = 'failed'
+                values = {'error': str(e) if str(e) else type(e).__name__}
+                print(f"❌ Job {job_id} ({kind}) failed: {e}")
+            finally:
+                with self._lock:
+                    del self.running[job_id]
+            
+            self._finish(job_id, status, values)
+            with self._lock:
+                self.finished[status] += 1
+    
+    def _finish(self, job_id, status, values, initial_wait=0.1):
+        """Write a job's final status, retrying while a tick holds the write lock"""
+        for attempt in range(self.FINISH_RETRIES):
+            now = datetime.now()
+            try:
+                db.session.execute(
+                    update(Job).where(Job.id == job_id).values(status=status, updated_at=now, finished_at=now, **values)
+                )
+                db.session.commit()
+                return
+            except OperationalError as e:
+                db.session.rollback()
+                if "database is locked" not in str(e) or attempt == self.FINISH_RETRIES - 1:
+                    raise
+                time.sleep(initial_wait * (2 ** attempt))
+    
+    def get_stats(self):
+        counts = dict(
+            db.session.query(Job.status, func.count(Job.id))
+            .filter(Job.status.in_(ACTIVE_STATUSES)).group_by(Job.status).all()
+        )
+        with self._lock:
+            return {
+                'workers': len(self._threads),  # 0 outside the scheduler leader
+                'queued': counts.get('queued', 0),
+                'running': counts.get('running', 0),
+                'running_here': [{'id': job_id, 'kind': kind} for job_id, kind in self.running.items()],
+                'finished_here': dict(self.finished),
+                'kinds': sorted(self.handlers)
+            }
+
+
+# Global queue (handlers registered and pool started by run.py, used by /api/jobs)
+job_queue = JobQueue()
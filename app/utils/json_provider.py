@@ -0,0 +1,53 @@
+"""
+Fast JSON provider for Flask (orjson when installed)
+- Output matches Flask's DefaultJSONProvider: sorted keys, compact unless
+  debug, datetimes/dates as HTTP dates, Decimal/UUID/dataclasses as before
+- Falls back to the default provider transparently when orjson is missing
+"""
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional dependency
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with orjson doing the encoding"""
+    
+    OPTIONS = 0
+    if orjson is not None:
+        OPTIONS = (
+            orjson.OPT_SORT_KEYS
+            | orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_SERIALIZE_NUMPY
+            | orjson.OPT_PASSTHROUGH_DATETIME  # Keep Flask's HTTP-date format
+            | orjson.OPT_PASSTHROUGH_DATACLASS
+        )
+    
+    def dumps_bytes(self, obj, indent=False):
+        """Serialize straight to UTF-8 bytes (no str round trip)"""
+        if orjson is None:
+            kwargs = {'indent': 2} if indent else {'separators': (',', ':')}
+            return super().dumps(obj, **kwargs).encode('utf-8')
+        option = self.OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=self.default, option=option)
+    
+    def dumps(self, obj, **kwargs):
+        # Custom encoder arguments (cls, ensure_ascii, ...) keep the stdlib path
+        if orjson is None or set(kwargs) - {'indent', 'separators', 'sort_keys'}:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj, indent=bool(kwargs.get('indent'))).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self.dumps_bytes(obj, indent=indent) + b'\n', mimetype=self.mimetype
+        )
@@ -0,0 +1,99 @@
+"""
+Scheduler leader election with an OS file lock
+- Every process of a deployment runs an elector; the one holding an
+  exclusive flock on the lock file is the leader and runs the scheduler
+- The kernel drops the lock when the leader exits or crashes, so a
+  follower polling the lock takes over within POLL_SECONDS
+- Without fcntl (Windows dev setups) the single process is always the leader
+"""
+
+import os
+import time
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class LeaderElection:
+    """Non-blocking flock election, retried in a background thread"""
+    
+    POLL_SECONDS = 5
+    
+    def __init__(self):
+        self.lock_path = None
+        self.is_leader = False
+        self.elected_at = None
+        self._fd = None
+        self._thread = None
+    
+    def _try_acquire(self):
+        if fcntl is None:
+            return True
+        
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        
+        # Record the leader pid for operators (the lock itself is what counts)
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, f"{os.getpid()}\n".encode('ascii'), 0)
+        self._fd = fd
+        return True
+    
+    def start(self, lock_path, on_elected, poll_seconds=None):
+        """
+        Join the election; on_elected() runs once, in this process, if and
+        when it becomes the leader
+        
+        Args:
+            lock_path: Lock file shared by all processes of the deployment
+            on_elected: Callback starting the leader-only work
+            poll_seconds: Retry interval for followers (default: POLL_SECONDS)
+        """
+        if self._thread is not None:
+            return
+        self.lock_path = lock_path
+        poll_seconds = poll_seconds or self.POLL_SECONDS
+        
+        def run():
+            while not self._try_acquire():
+                time.sleep(poll_seconds)
+            self.is_leader = True
+            self.elected_at = datetime.now()
+            print(f"👑 Scheduler leader elected (pid {os.getpid()})")
+            try:
+                on_elected()
+            except Exception as e:
+                print(f"❌ Leader startup error: {e}")
+        
+        self._thread = threading.Thread(target=run, name='leader-election', daemon=True)
+        self._thread.start()
+    
+    def leader_pid(self):
+        """Pid written by the current leader (None if unknown)"""
+        if self.is_leader:
+            return os.getpid()
+        try:
+            with open(self.lock_path) as f:
+                return int(f.read().strip() or 0) or None
+        except (TypeError, OSError, ValueError):
+            return None
+    
+    def get_status(self):
+        return {
+            'pid': os.getpid(),
+            'role': 'leader' if self.is_leader else ('follower' if self._thread else 'standalone'),
+            'leader_pid': self.leader_pid() if self._thread else None,
+            'elected_at': self.elected_at.isoformat() if self.elected_at else None
+        }
+
+
+# Global elector (started by run.py / wsgi.py, reported by /health)
+scheduler_leader = LeaderElection()
@@ -0,0 +1,272 @@
+"""
+Server-Sent Events broadcaster for live dashboard updates
+- The simulator publishes once per tick; the update is serialized to a
+  single SSE frame that every subscriber shares (no per-client queries)
+- Tick frames carry campus totals, buildings whose load changed and new
+  AutonomousLog notifications; a full snapshot frame is kept for clients
+  that connect or fall too far behind
+- In multi-worker deployments only the leader runs the simulator; the other
+  workers follow the shared tick id (or the worker's IPC push, see
+  worker_ipc.py) and publish the tick from the database, once per tick id
+- The SSE event id is the tick id (ISO timestamp), the same in every
+  process; a Last-Event-ID this process hasn't published (another worker's
+  history, a restart) gets a snapshot instead of a replay
+- Each subscriber holds a server thread for as long as it is connected, so
+  a process accepts at most max_subscribers of them (its SSE thread budget,
+  see gunicorn.conf.py); /api/stream/live answers 503 beyond that
+"""
+
+import json
+import time
+import threading
+from collections import deque
+from app.models import db, AutonomousLog, Room, Floor, Building, EnergyLog
+from app.utils.data_version import data_version
+
+# action_type -> (severity, icon) shown by the dashboard notification feed
+NOTIFICATION_STYLES = {
+    'POWER_CUTOFF': ('warning', '🔌'),
+    'HYBRID_MODE': ('info', '⚡'),
+    'DEMAND_SPIKE': ('alert', '📈'),
+    'PREDICTIVE_SWITCH': ('info', '🔮'),
+    'LOAD_ANOMALY': ('alert', '🚨')
+}
+
+
+def format_notification(log, room_name=None, building_name=None):
+    """Render an AutonomousLog row as a dashboard notification"""
+    severity, icon = NOTIFICATION_STYLES.get(log.action_type, ('info', 'ℹ️'))
+    return {
+        'id': log.id,
+        'timestamp': log.timestamp.isoformat(),
+        'icon': icon,
+        'severity': severity,
+        'action_type': log.action_type,
+        'message': log.reason,
+        'room_name': room_name,
+        'building_name': building_name,
+        'energy_saved_kwh': log.energy_saved_kwh
+    }
+
+
+class LiveBroadcaster:
+    """Fan-out of per-tick updates to any number of SSE subscribers"""
+    
+    HISTORY = 16  # Frames kept for Last-Event-ID replay
+    KEEPALIVE_SECONDS = 15
+    CHANGE_THRESHOLD_KW = 0.01  # Building loads that moved less are not resent
+    MAX_NOTIFICATIONS = 50
+    MAX_SUBSCRIBERS = 16
+    
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frames = deque(maxlen=self.HISTORY)  # (seq, event id, frame bytes)
+        self._snapshot = None  # Full-state frame for new subscribers
+        self._building_loads = {}
+        self._last_log_id = None
+        self._remote_lock = threading.Lock()
+        self.last_tick = None  # Timestamp of the last tick published here
+        self.seq = 0  # Frames published by this process (local ordering only)
+        self.event_id = None  # Tick id of the latest frame
+        self.subscribers = 0
+        self.max_subscribers = self.MAX_SUBSCRIBERS
+        self.rejected = 0  # Subscribers turned away at the cap
+    
+    def configure(self, max_subscribers):
+        self.max_subscribers = max(1, int(max_subscribers))
+    
+    def subscribe(self):
+        """Take a subscriber slot; False when max_subscribers are already connected"""
+        with self._cond:
+            if self.subscribers >= self.max_subscribers:
+                self.rejected += 1
+                return False
+            self.subscribers += 1
+            return True
+    
+    def unsubscribe(self):
+        """Release a slot taken by subscribe() (when the response is closed)"""
+        with self._cond:
+            self.subscribers -= 1
+    
+    @staticmethod
+    def _frame(event, event_id, payload):
+        data = json.dumps(payload, separators=(',', ':'))
+        return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n".encode('utf-8')
+    
+    def _new_notifications(self, timestamp):
+        """AutonomousLog rows written since the previous tick (one query)"""
+        query = db.session.query(AutonomousLog, Room.name, Building.name).outerjoin(
+            Room, Room.id == AutonomousLog.room_id
+        ).outerjoin(
+            Building, Building.id == AutonomousLog.building_id
+        )
+        if self._last_log_id is None:
+            query = query.filter(AutonomousLog.timestamp >= timestamp)
+        else:
+            query = query.filter(AutonomousLog.id > self._last_log_id)
+        rows = query.order_by(AutonomousLog.id.desc()).limit(self.MAX_NOTIFICATIONS).all()
+        
+        if rows:
+            self._last_log_id = rows[0][0].id
+        elif self._last_log_id is None:
+            self._last_log_id = db.session.query(db.func.max(AutonomousLog.id)).scalar() or 0
+        
+        return [format_notification(log, room_name, building_name) for log, room_name, building_name in rows]
+    
+    def publish_tick(self, timestamp, readings):
+        """
+        Build and broadcast the update for one simulation tick
+        
+        Args:
+            timestamp: Tick timestamp
+            readings: Sequence of (room_id, building_id, total_load, occupancy, optimized)
+        """
+        self.last_tick = timestamp
+        buildings = {}
+        occupied = optimized = 0
+        for _, building_id, total_load, occupancy, is_optimized in readings:
+            load, rooms_occupied = buildings.get(building_id, (0.0, 0))
+            buildings[building_id] = (load + total_load, rooms_occupied + (1 if occupancy else 0))
+            occupied += 1 if occupancy else 0
+            optimized += 1 if is_optimized else 0
+        
+        building_loads = {
+            str(building_id): {'load_kw': round(load, 2), 'occupied_rooms': rooms_occupied}
+            for building_id, (load, rooms_occupied) in buildings.items()
+        }
+        changed = {
+            building_id: values for building_id, values in building_loads.items()
+            if building_id not in self._building_loads
+            or abs(self._building_loads[building_id]['load_kw'] - values['load_kw']) >= self.CHANGE_THRESHOLD_KW
+            or self._building_loads[building_id]['occupied_rooms'] != values['occupied_rooms']
+        }
+        
+        campus = {
+            'total_load_kw': round(sum(load for load, _ in buildings.values()), 2),
+            'rooms': len(readings),
+            'occupied_rooms': occupied,
+            'optimized_rooms': optimized,
+            'buildings': len(buildings)
+        }
+        notifications = self._new_notifications(timestamp)
+        
+        # Deltas are relative to the previous tick published here; a client
+        # resuming from another id than that one needs the snapshot instead
+        event_id = timestamp.isoformat()
+        with self._cond:
+            self.seq += 1
+            self.event_id = event_id
+            base = {'id': event_id, 'timestamp': event_id, 'campus': campus}
+            self._frames.append((self.seq, event_id, self._frame('tick', event_id, dict(
+                base, buildings=changed, notifications=notifications
+            ))))
+            self._snapshot = self._frame('snapshot', event_id, dict(
+                base, buildings=building_loads, notifications=notifications
+            ))
+            self._building_loads = building_loads
+            self._cond.notify_all()
+    
+    def stream(self, last_event_id=None):
+        """
+        Generator of SSE frames for one subscriber (holding a subscribe() slot)
+        
+        Args:
+            last_event_id: Tick id the client received last (from Last-Event-ID);
+                replayed from only if this process published it
+        """
+        with self._cond:
+            seen = self.seq
+            initial = self._snapshot
+            if last_event_id is not None and last_event_id == self.event_id:
+                initial = None  # Up to date
+            elif last_event_id is not None:
+                for seq, event_id, _ in self._frames:
+                    if event_id == last_event_id:
+                        seen, initial = seq, None
+                        break
+        
+        yield "retry: 5000\n\n".encode('utf-8')
+        if initial:
+            yield initial
+        
+        while True:
+            with self._cond:
+                if self.seq == seen:
+                    self._cond.wait(self.KEEPALIVE_SECONDS)
+                pending = [frame for seq, _, frame in self._frames if seq > seen]
+                # Fell behind the replay buffer: resync with the full snapshot
+                if self.seq - seen > len(pending):
+                    pending = [self._snapshot]
+                seen = self.seq
+            
+            if pending:
+                yield b''.join(pending)
+            else:
+                yield b': keepalive\n\n'
+    
+    @staticmethod
+    def _tick_readings(timestamp):
+        """A tick's (room_id, building_id, total_load, occupancy, optimized) rows, in one query"""
+        return db.session.query(
+            EnergyLog.room_id, Floor.building_id, EnergyLog.total_load, EnergyLog.occupancy, EnergyLog.optimized
+        ).join(Room, Room.id == EnergyLog.room_id).join(
+            Floor, Floor.id == Room.floor_id
+        ).filter(EnergyLog.timestamp == timestamp).all()
+    
+    def publish_remote_tick(self, app, tick_id):
+        """
+        Publish a tick simulated by another process, reading it from the
+        database; duplicates (IPC push and shared-tick poll) are skipped
+        
+        Args:
+            app: Flask app (callers run in background threads)
+            tick_id: Tick timestamp
+        """
+        with self._remote_lock:
+            if tick_id is None or tick_id == self.last_tick:
+                return
+            with app.app_context():
+                try:
+                    self.publish_tick(tick_id, self._tick_readings(tick_id))
+                except Exception as e:
+                    print(f"❌ Live stream follower error: {e}")
+                finally:
+                    db.session.remove()
+    
+    def follow_ticks(self, app, is_leader, poll_seconds=1.0):
+        """
+        Publish ticks simulated by another process (multi-worker followers)
+        
+        Args:
+            app: Flask app (for the app context of the follower thread)
+            is_leader: Callable; while it returns True the local simulator publishes
+            poll_seconds: How often the shared tick id is checked
+        """
+        def run():
+            last = data_version.get_tick_id()
+            while True:
+                time.sleep(poll_seconds)
+                tick_id = data_version.get_tick_id()
+                if tick_id is None or tick_id == last:
+                    continue
+                last = tick_id
+                if not is_leader():
+                    self.publish_remote_tick(app, tick_id)
+        
+        threading.Thread(target=run, name='live-follower', daemon=True).start()
+    
+    def get_status(self):
+        return {
+            'seq': self.seq,
+            'event_id': self.event_id,
+            'last_tick': self.last_tick.isoformat() if self.last_tick else None,
+            'subscribers': self.subscribers,
+            'max_subscribers': self.max_subscribers,
+            'rejected_subscribers': self.rejected,
+            'buffered_frames': len(self._frames)
+        }
+
+
+# Global broadcaster (fed by the simulator tick, read by /api/stream/live)
+live_broadcaster = LiveBroadcaster()
@@ -0,0 +1,266 @@
+"""
+Prometheus-style metrics (text exposition format, no client library)
+- Counters and histograms live in process memory; recording one is a dict
+  update under a thread lock, so the request middleware adds microseconds
+- Each process also writes its series to instance/metrics/<pid>.json, at
+  most every PUBLISH_SECONDS (after requests, ticks and training runs);
+  /metrics adds up its own live values and the files of the other live
+  processes, so API workers and the simulator process (worker.py) are
+  scraped through any one of them
+- Series of exited processes are dropped (their counters restart from zero
+  for Prometheus, which rate() handles as a counter reset)
+- DB queries are counted per thread by a before_cursor_execute listener
+"""
+
+import os
+import json
+import time
+import bisect
+import threading
+from functools import wraps
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Upper bounds (seconds) of the histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TICK_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TRAINING_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'voltonic_http_requests_total': ('counter', 'API requests by route, method and status', None),
+    'voltonic_http_request_duration_seconds': ('histogram', 'API request latency (until the response is built)', LATENCY_BUCKETS),
+    'voltonic_http_response_bytes_total': ('counter', 'API response body bytes sent (as encoded; streamed bodies of unknown length excluded)', None),
+    'voltonic_http_db_queries_total': ('counter', 'SQL statements executed while serving API requests', None),
+    'voltonic_tick_duration_seconds': ('histogram', 'Simulator tick duration', TICK_BUCKETS),
+    'voltonic_tick_phase_duration_seconds': ('histogram', 'Simulator tick duration by phase', TICK_BUCKETS),
+    'voltonic_tick_rows_written_total': ('counter', 'Rows written by simulator ticks', None),
+    'voltonic_db_commit_retries_total': ('counter', 'Commits retried after "database is locked"', None),
+    'voltonic_db_commit_failures_total': ('counter', 'Commits that failed after all retries', None),
+    'voltonic_model_predict_duration_seconds': ('histogram', 'Model prediction latency by method', LATENCY_BUCKETS),
+    'voltonic_model_train_duration_seconds': ('histogram', 'Model training duration by outcome', TRAINING_BUCKETS)
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_queries = threading.local()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    _queries.count = getattr(_queries, 'count', 0) + 1
+
+
+def query_count():
+    """SQL statements executed by the current thread so far"""
+    return getattr(_queries, 'count', 0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """This process's series, its snapshot file, and the merged exposition"""
+    
+    PUBLISH_SECONDS = 5.0
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}  # (name, labels) -> float, or [bucket counts..., sum, count] for histograms
+        self._dir = None
+        self._published_at = 0.0
+        self._pid = os.getpid()
+        if hasattr(os, 'register_at_fork'):
+            # Pre-forked workers start from zero instead of repeating the master's series
+            os.register_at_fork(after_in_child=self._reset)
+    
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._published_at = 0.0
+        self._pid = os.getpid()
+    
+    def attach_dir(self, path):
+        """Publish this process's series under `path` and merge other processes' files at scrape time"""
+        os.makedirs(path, exist_ok=True)
+        self._dir = path
+    
+    @staticmethod
+    def _key(name, labels):
+        if name not in METRICS:
+            raise KeyError(f'Unknown metric: {name}')
+        return name, tuple(sorted(labels.items()))
+    
+    def inc(self, name, value=1, **labels):
+        """Add to a counter"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + value
+    
+    def observe(self, name, value, **labels):
+        """Record one histogram observation"""
+        key = self._key(name, labels)
+        buckets = METRICS[name][2]
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(buckets) + 2)
+            series[bisect.bisect_left(buckets, value)] += 1  # Index len(buckets): only +Inf
+            series[-2] += value
+            series[-1] += 1
+    
+    def _snapshot(self):
+        with self._lock:
+            return [
+                [name, labels, list(value) if isinstance(value, list) else value]
+                for (name, labels), value in self._series.items()
+            ]
+    
+    def publish(self, force=False):
+        """Write this process's snapshot file (throttled to PUBLISH_SECONDS unless forced)"""
+        now = time.monotonic()
+        if self._dir is None or (not force and now - self._published_at < self.PUBLISH_SECONDS):
+            return
+        self._published_at = now
+        path = os.path.join(self._dir, f'{self._pid}.json')
+        try:
+            with open(path + '.tmp', 'w') as f:
+                json.dump({'pid': self._pid, 'series': self._snapshot()}, f)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            print(f"⚠️  Metrics publish failed: {e}")
+    
+    def _other_snapshots(self):
+        """Series of the other live processes (files of exited ones are removed)"""
+        if self._dir is None:
+            return []
+        snapshots = []
+        for filename in os.listdir(self._dir):
+            pid_text, ext = os.path.splitext(filename)
+            if ext != '.json' or not pid_text.isdigit() or int(pid_text) == self._pid:
+                continue
+            path = os.path.join(self._dir, filename)
+            try:
+                os.kill(int(pid_text), 0)
+            except ProcessLookupError:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            except PermissionError:
+                pass  # Alive, owned by another user
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f)['series'])
+            except (OSError, ValueError, KeyError):
+                continue  # Being replaced or unreadable; skip this scrape
+        return snapshots
+    
+    def merged(self):
+        """(name, labels) -> value summed over every live process"""
+        self.publish()
+        merged = {}
+        for snapshot in [self._snapshot()] + self._other_snapshots():
+            for name, labels, value in snapshot:
+                if name not in METRICS:
+                    continue  # Written by a process running other code
+                key = (name, tuple(tuple(pair) for pair in labels))
+                if isinstance(value, list):
+                    current = merged.get(key)
+                    if current is None or len(current) != len(value):
+                        merged[key] = list(value)
+                    else:
+                        merged[key] = [a + b for a, b in zip(current, value)]
+                else:
+                    merged[key] = merged.get(key, 0) + value
+        return merged
+    
+    def render(self):
+        """Prometheus text exposition of the merged series"""
+        by_name = {}
+        for (name, labels), value in self.merged().items():
+            by_name.setdefault(name, []).append((labels, value))
+        
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in sorted(by_name.get(name, ())):
+                if kind == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(buckets, value):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {_format_value(cumulative)}')
+                    lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {_format_value(value[-1])}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value[-2])}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {_format_value(value[-1])}')
+                else:
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+    
+    def get_stats(self):
+        with self._lock:
+            series = len(self._series)
+        return {'series_here': series, 'dir': self._dir}
+
+
+class PhaseTimer:
+    """Splits a run into consecutive phases: mark(phase) ends the current one"""
+    
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.phases = []  # (phase, seconds)
+    
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+    
+    def total(self):
+        return self._last - self.started
+
+
+def timed(name, outcome=None, **labels):
+    """
+    Decorator: observe each call's duration in histogram `name`
+    
+    Args:
+        outcome: Optional callable(result) -> value of an 'outcome' label
+            ('error' when the call raises)
+        labels: Fixed labels
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            started = time.perf_counter()
+            result_outcome = 'error'
+            try:
+                result = f(*args, **kwargs)
+                if outcome is not None:
+                    result_outcome = outcome(result)
+                return result
+            finally:
+                extra = {'outcome': result_outcome} if outcome is not None else {}
+                metrics.observe(name, time.perf_counter() - started, **labels, **extra)
+                metrics.publish()
+        return decorated_function
+    return decorator
+
+
+# Global registry (directory attached in create_app, scraped at /metrics)
+metrics = MetricsRegistry()
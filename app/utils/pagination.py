@@ -0,0 +1,97 @@
+"""
+Keyset (cursor) pagination
+- Pages are selected with a row-value comparison on a unique sort key such
+  as (timestamp, id), so page N costs the same index seek as page 1
+- Cursors are opaque url-safe tokens carrying the direction and the key of
+  the boundary row; clients pass them back unchanged with the same filters
+"""
+
+import json
+import base64
+import binascii
+from datetime import datetime
+from sqlalchemy import tuple_, DateTime
+
+
+def encode_cursor(direction, values):
+    """Opaque cursor for a boundary row"""
+    payload = [direction, [v.isoformat() if isinstance(v, datetime) else v for v in values]]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """
+    Decode a cursor back to (direction, key values)
+    
+    Raises:
+        ValueError: Malformed cursor or key not matching the columns
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, values = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    
+    if direction not in ('next', 'prev') or not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('Invalid cursor')
+    
+    decoded = []
+    for column, value in zip(columns, values):
+        if isinstance(column.type, DateTime):
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise ValueError('Invalid cursor')
+        decoded.append(value)
+    return direction, decoded
+
+
+def parse_limit(value, default, maximum):
+    """Clamp a ?limit= argument into [1, maximum]"""
+    if value is None:
+        return default
+    return max(1, min(value, maximum))
+
+
+def keyset_paginate(query, columns, limit, cursor=None, descending=True):
+    """
+    Fetch one page of a query ordered by a unique key
+    
+    Args:
+        query: SQLAlchemy ORM query (filters applied, no order_by/limit)
+        columns: Sort key columns, the last one unique (e.g. [Model.timestamp, Model.id])
+        limit: Page size
+        cursor: Cursor from a previous page (optional)
+        descending: Sort order of the pages (newest first by default)
+    
+    Returns:
+        tuple: (rows, pagination dict with limit, has_more, next_cursor, prev_cursor)
+    """
+    direction, values = decode_cursor(cursor, columns) if cursor else ('next', None)
+    forward = direction == 'next'
+    scan_descending = descending == forward
+    
+    if values is not None:
+        key = tuple_(*columns)
+        query = query.filter(key < tuple(values) if scan_descending else key > tuple(values))
+    
+    query = query.order_by(*[c.desc() if scan_descending else c.asc() for c in columns])
+    rows = query.limit(limit + 1).all()
+    more_in_direction = len(rows) > limit
+    rows = rows[:limit]
+    if not forward:
+        rows.reverse()
+    
+    def boundary(row, page_direction):
+        return encode_cursor(page_direction, [getattr(row, column.key) for column in columns])
+    
+    has_next = more_in_direction if forward else True
+    has_prev = (values is not None) if forward else more_in_direction
+    
+    return rows, {
+        'limit': limit,
+        'has_more': has_next,
+        'next_cursor': boundary(rows[-1], 'next') if rows and has_next else None,
+        'prev_cursor': boundary(rows[0], 'prev') if rows and has_prev else None
+    }
@@ -1,95 +1,206 @@
+"""
+Rate limiting for API endpoints (GCRA token bucket)
+- One number per client key: the bucket's theoretical arrival time (TAT) on
+  the monotonic clock, instead of a history of request timestamps
+- Keys hash onto SHARDS independent locks, so concurrent request threads
+  rarely wait on each other
+- Each shard is an LRU bounded at max_keys / SHARDS; a missing key is a
+  full bucket, so evicting a key whose TAT has passed loses nothing. Evicting
+  one still ahead of now restarts that client with a full burst: the LRU key
+  was used within one burst period, so that takes more active clients than
+  a shard holds (counted under 'evictions' in get_stats()). The shared table
+  evicts the smallest TAT of a set, with the same caveat when every way of
+  the set is still ahead
+- Multi-worker deployments keep the buckets in a shared memory-mapped table
+  (attach_shared), so a limit holds across all workers instead of N times
+  over; CLOCK_MONOTONIC is system-wide, so every process agrees on TATs
+- The table file outlives the boot while CLOCK_MONOTONIC restarts at zero:
+  it is stamped with the boot id (reset after a reboot), and a TAT further
+  ahead than any bucket can be (another clock's reading) is capped, so a
+  stale bucket costs at most one interval instead of a lockout
+"""
+
+import math
+import time
+import threading
 from functools import wraps
+from collections import OrderedDict
 from flask import request, jsonify
-from datetime import datetime, timedelta
-from collections import defaultdict, deque
+from app.utils import shared_state
+
 
 class RateLimiter:
-    """Simple in-memory rate limiter"""
+    """Thread-safe GCRA limiter with bounded memory"""
+    
+    SHARDS = 16
+    MAX_KEYS = 50000
     
-    def __init__(self):
-        # Store request timestamps per IP: {ip: deque([timestamp1, timestamp2, ...])}
-        self.requests = defaultdict(deque)
+    def __init__(self, max_keys=MAX_KEYS, shards=SHARDS):
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._buckets = [OrderedDict() for _ in range(shards)]  # key -> TAT
+        self._evictions = [0] * shards
+        self._limited = [0] * shards
+        self.shard_capacity = max(1, max_keys // shards)
+        self._shared = None
     
-    def is_rate_limited(self, ip, max_requests=10, window_seconds=60):
+    def attach_shared(self, path):
         """
-        Check if IP has exceeded rate limit
+        Keep buckets in a shared table so every worker enforces one budget
         
         Args:
-            ip: Client IP address
-            max_requests: Maximum requests allowed in window
+            path: Shared table file (created if missing)
+        
+        Returns:
+            bool: False when shared memory is unavailable (buckets stay per process)
+        """
+        if shared_state.fcntl is None:
+            return False
+        self._shared = shared_state.SharedTable(path, clock_id=shared_state.boot_id())
+        return True
+    
+    def is_rate_limited(self, key, max_requests=10, window_seconds=60, burst=None):
+        """
+        Check and count one request for key
+        
+        Args:
+            key: Bucket key (scope + client)
+            max_requests: Sustained rate, requests per window
             window_seconds: Time window in seconds
+            burst: Requests allowed back to back (default: max_requests)
         
         Returns:
             tuple: (is_limited: bool, retry_after: int)
         """
-        now = datetime.now()
-        cutoff_time = now - timedelta(seconds=window_seconds)
+        interval = window_seconds / max_requests
+        tolerance = interval * ((burst or max_requests) - 1)
+        now = time.monotonic()
         
-        # Get request history for this IP
-        request_times = self.requests[ip]
+        if self._shared is not None:
+            return self._is_rate_limited_shared(key, now, interval, tolerance)
         
-        # Remove old requests outside the time window
-        while request_times and request_times[0] < cutoff_time:
-            request_times.popleft()
+        shard = hash(key) % len(self._locks)
+        buckets = self._buckets[shard]
+        with self._locks[shard]:
+            tat = max(buckets.get(key, now), now)
+            allow_at = tat - tolerance
+            if now < allow_at:
+                self._limited[shard] += 1
+                return True, max(1, math.ceil(allow_at - now))
+            
+            buckets[key] = tat + interval
+            buckets.move_to_end(key)
+            if len(buckets) > self.shard_capacity:
+                buckets.popitem(last=False)
+                self._evictions[shard] += 1
         
-        # Check if limit exceeded
-        if len(request_times) >= max_requests:
-            # Calculate retry_after (seconds until oldest request expires)
-            oldest_request = request_times[0]
-            retry_after = int((oldest_request + timedelta(seconds=window_seconds) - now).total_seconds()) + 1
-            return True, retry_after
+        return False, 0
+    
+    def _is_rate_limited_shared(self, key, now, interval, tolerance):
+        """Same GCRA step on the shared table (TATs in integer microseconds)"""
+        now_us = int(now * 1_000_000)
+        interval_us = int(interval * 1_000_000)
+        tolerance_us = int(tolerance * 1_000_000)
         
-        # Add current request
-        request_times.append(now)
+        def step(tat_us):
+            # A TAT can't be further ahead than one full burst; more is a
+            # reading from before a reboot, capped rather than waited out
+            tat_us = min(max(tat_us or now_us, now_us), now_us + tolerance_us + interval_us)
+            allow_at_us = tat_us - tolerance_us
+            if now_us < allow_at_us:
+                return None, allow_at_us - now_us
+            return tat_us + interval_us, 0
         
+        wait_us = self._shared.apply(key, step)
+        if wait_us:
+            self._limited[0] += 1
+            return True, max(1, math.ceil(wait_us / 1_000_000))
         return False, 0
     
-    def cleanup_old_entries(self, max_age_seconds=3600):
+    def cleanup_old_entries(self, max_age_seconds=0):
         """
-        Clean up old IP entries to prevent memory bloat
-        Should be called periodically (e.g., every hour)
+        Drop buckets that have been full for at least max_age_seconds
+        (optional: the LRU bound already caps memory; shared tables replace
+        refilled buckets on their own)
         """
-        now = datetime.now()
-        cutoff_time = now - timedelta(seconds=max_age_seconds)
-        
-        # Remove IPs with no recent requests
-        ips_to_remove = []
-        for ip, request_times in self.requests.items():
-            if not request_times or request_times[-1] < cutoff_time:
-                ips_to_remove.append(ip)
-        
-        for ip in ips_to_remove:
-            del self.requests[ip]
+        cutoff = time.monotonic() - max_age_seconds
+        for lock, buckets in zip(self._locks, self._buckets):
+            with lock:
+                for key in [key for key, tat in buckets.items() if tat <= cutoff]:
+                    del buckets[key]
+    
+    def get_stats(self):
+        if self._shared is not None:
+            return {
+                'backend': 'shared',
+                'keys': self._shared.count(),
+                'max_keys': self._shared.capacity,
+                'limited': sum(self._limited),  # By this process
+                'evictions': self._shared.evictions
+            }
+        return {
+            'backend': 'local',
+            'keys': sum(len(buckets) for buckets in self._buckets),
+            'max_keys': self.shard_capacity * len(self._locks),
+            'shards': len(self._locks),
+            'limited': sum(self._limited),
+            'evictions': sum(self._evictions)
+        }
 
 # Global rate limiter instance
 rate_limiter = RateLimiter()
 
-def rate_limit(max_requests=10, window_seconds=60):
+def client_ip():
+    """Default rate limit key: the client IP (X-Real-IP behind a proxy)"""
+    return request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
+
+def rate_limit(max_requests=10, window_seconds=60, burst=None, key_func=None, scope=None, per_key=None):
     """
     Decorator to rate limit endpoints
     
+    Args:
+        max_requests: Requests per window (sustained rate)
+        window_seconds: Time window in seconds
+        burst: Requests allowed back to back (default: max_requests)
+        key_func: Callable returning the client key (default: client_ip)
+        scope: Bucket namespace (default: the view function, so every route
+            has its own budget; routes with the same scope share one)
+        per_key: {client key: (max_requests, window_seconds[, burst]) or None}
+            overrides for this route; None exempts the key
+    
     Usage:
         @rate_limit(max_requests=10, window_seconds=60)
         def my_endpoint():
             return jsonify({'data': 'something'})
     """
+    default_policy = (max_requests, window_seconds, burst)
+    get_key = key_func or client_ip
+    
     def decorator(f):
+        bucket_scope = scope or f'{f.__module__}.{f.__name__}'
+        
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # Get client IP
-            client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
+            client_key = get_key()
+            
+            policy = default_policy
+            if per_key and client_key in per_key:
+                policy = per_key[client_key]
+                if policy is None:
+                    return f(*args, **kwargs)
             
             # Check rate limit
             is_limited, retry_after = rate_limiter.is_rate_limited(
-                client_ip, max_requests, window_seconds
+                f'{bucket_scope}:{client_key}', *policy
             )
             
             if is_limited:
-                return jsonify({
+                response = jsonify({
                     'status': 'error',
                     'message': f'Rate limit exceeded. Try again in {retry_after} seconds.',
                     'retry_after': retry_after
-                }), 429
+                })
+                response.headers['Retry-After'] = str(retry_after)
+                return response, 429
             
             return f(*args, **kwargs)
         return decorated_function
@@ -0,0 +1,63 @@
+"""
+Pre-serialized response cache
+Holds response bodies (JSON and their compressed variants) keyed by ETag.
+ETags embed the data versions, so an entry can never be served after its
+data changed; stale entries simply age out of the LRU.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Thread-safe LRU of byte strings bounded by total size"""
+    
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key, value):
+        if len(value) > self.max_bytes // 4:
+            return  # Never let one body evict most of the cache
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+    
+    def get_cache_info(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Global response cache (filled by conditional_get(cache=True) and compression)
+response_cache = ResponseCache()
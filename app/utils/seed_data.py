@@ -1,6 +1,7 @@
 import random
 from datetime import time, datetime
 from app.models import db, Faculty, Building, Floor, Room, Timetable, EnergySource, GridStatus
+from app.utils.data_version import data_version
 
 def seed_energy_sources():
     """Initialize energy sources with pricing"""
@@ -134,6 +135,7 @@ def seed_campus():
                 create_timetable(room.id, "Smart_Class")
     
     db.session.commit()
+    data_version.bump('topology')  # API processes may already hold an empty snapshot
     
     # Count verification
     total_rooms = Room.query.count()
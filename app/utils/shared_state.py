@@ -0,0 +1,316 @@
+"""
+Cross-process shared state (memory-mapped files)
+- Small files in the instance folder are mapped MAP_SHARED by every process
+  of a deployment: pre-forked workers inherit the mapping and other
+  processes map the same file, so writes are visible to all immediately
+- SharedCounters: named int64 slots; writes hold a thread lock plus an
+  fcntl lock on the file, reads are single aligned 8-byte loads
+- SharedTable: bounded string -> int64 map (rate limit buckets); a table
+  holding clock readings is stamped with the boot id and starts empty after
+  a reboot, when CLOCK_MONOTONIC restarts from zero
+- SharedBlobs: bounded string -> bytes slots (cached predictions)
+- Table and blob entries are locked by byte range, so processes only
+  contend on the same entry
+- POSIX only: without fcntl (Windows dev setups) callers keep their
+  in-process state
+"""
+
+import os
+import mmap
+import zlib
+import struct
+import hashlib
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+def _map_file(path, size, header):
+    """Open and map a shared file, resetting it when its layout differs"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.lockf(fd, fcntl.LOCK_EX)
+        try:
+            # New file or a different layout: start from zeros
+            if os.fstat(fd).st_size != size or os.pread(fd, len(header), 0) != header:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+                os.pwrite(fd, header, 0)
+        finally:
+            fcntl.lockf(fd, fcntl.LOCK_UN)
+        return fd, mmap.mmap(fd, size)
+    except Exception:
+        os.close(fd)
+        raise
+
+
+def boot_id():
+    """Id of the running boot (Linux), or None where the kernel doesn't expose one"""
+    try:
+        with open('/proc/sys/kernel/random/boot_id', 'rb') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def key_tag(key):
+    """Stable non-zero 64-bit hash of a string key (hash() differs per process)"""
+    tag = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little', signed=True)
+    return tag or 1
+
+
+class _RangeLocks:
+    """Thread lock stripe plus an fcntl byte-range lock on the entry"""
+    
+    STRIPES = 64
+    
+    def __init__(self, fd):
+        self._fd = fd
+        self._locks = [threading.Lock() for _ in range(self.STRIPES)]
+    
+    def acquire(self, index, offset, length, shared=False):
+        lock = self._locks[index % self.STRIPES]
+        lock.acquire()
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX, length, offset)
+        except BaseException:
+            lock.release()
+            raise
+    
+    def release(self, index, offset, length):
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, length, offset)
+        finally:
+            self._locks[index % self.STRIPES].release()
+    
+    @contextmanager
+    def locked(self, index, offset, length, shared=False):
+        self.acquire(index, offset, length, shared)
+        try:
+            yield
+        finally:
+            self.release(index, offset, length)
+
+
+class SharedCounters:
+    """Fixed set of named int64 slots shared by all processes mapping `path`"""
+    
+    MAGIC = b'VOLTSHM1'
+    HEADER = struct.Struct('<8sQ')  # magic, layout checksum
+    SLOT = struct.Struct('<q')
+    
+    def __init__(self, path, names):
+        if fcntl is None:
+            raise RuntimeError('Shared counters need fcntl (POSIX)')
+        
+        self.path = path
+        self.names = tuple(names)
+        self._index = {name: self.HEADER.size + i * self.SLOT.size for i, name in enumerate(self.names)}
+        self._lock = threading.Lock()
+        
+        size = self.HEADER.size + self.SLOT.size * len(self.names)
+        header = self.HEADER.pack(self.MAGIC, zlib.crc32(','.join(self.names).encode('utf-8')))
+        self._fd, self._map = _map_file(path, size, header)
+    
+    @contextmanager
+    def locked(self):
+        """Exclusive section across threads and processes"""
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+    
+    def get(self, name):
+        return self.SLOT.unpack_from(self._map, self._index[name])[0]
+    
+    def get_many(self, names):
+        return [self.SLOT.unpack_from(self._map, self._index[name])[0] for name in names]
+    
+    def set(self, name, value):
+        with self.locked():
+            self.SLOT.pack_into(self._map, self._index[name], int(value))
+    
+    def update(self, increments=None, values=None):
+        """
+        Apply several increments and assignments atomically
+        
+        Args:
+            increments: name -> delta
+            values: name -> new value
+        
+        Returns:
+            dict: name -> value after the update, for every touched slot
+        """
+        result = {}
+        with self.locked():
+            for name, delta in (increments or {}).items():
+                offset = self._index[name]
+                value = self.SLOT.unpack_from(self._map, offset)[0] + int(delta)
+                self.SLOT.pack_into(self._map, offset, value)
+                result[name] = value
+            for name, value in (values or {}).items():
+                self.SLOT.pack_into(self._map, self._index[name], int(value))
+                result[name] = int(value)
+        return result
+    
+    def add(self, name, delta=1):
+        return self.update(increments={name: delta})[name]
+
+
+class SharedTable:
+    """
+    Bounded string -> int64 map shared by all processes mapping `path`
+    
+    Keys hash to a set of WAYS entries (tag, value); a full set replaces
+    the entry with the smallest value (for rate limit buckets: the one that
+    refilled longest ago), so memory never grows.
+    
+    clock_id: Values are readings of a clock that only holds within this id
+    (boot_id() for CLOCK_MONOTONIC); the file is reset when it changes.
+    """
+    
+    MAGIC = b'VOLTTBL2'
+    HEADER = struct.Struct('<8sQQ')  # magic, set count, clock id checksum
+    TAG_CACHE = 4096  # Hashed keys kept per process (clients repeat)
+    WAYS = 8
+    ENTRY = struct.Struct('<qq')  # key tag, value
+    SET = struct.Struct('<' + 'qq' * WAYS)
+    
+    def __init__(self, path, sets=4096, clock_id=None):
+        if fcntl is None:
+            raise RuntimeError('Shared table needs fcntl (POSIX)')
+        
+        self.path = path
+        self.sets = sets
+        self.capacity = sets * self.WAYS
+        self.evictions = 0  # By this process
+        self._fd, self._map = _map_file(
+            path, self.HEADER.size + self.SET.size * sets,
+            self.HEADER.pack(self.MAGIC, sets, zlib.crc32(clock_id or b''))
+        )
+        self._locks = _RangeLocks(self._fd)
+        self._tags = {}
+    
+    def _locate(self, key):
+        """(tag, set index, byte offset) of a key, memoized"""
+        location = self._tags.get(key)
+        if location is None:
+            if len(self._tags) >= self.TAG_CACHE:
+                self._tags.clear()
+            tag = key_tag(key)
+            index = tag % self.sets
+            location = self._tags[key] = (tag, index, self.HEADER.size + index * self.SET.size)
+        return location
+    
+    def apply(self, key, func):
+        """
+        Atomically read-modify-write one key
+        
+        Args:
+            key: String key
+            func: Callable(value or None) -> (new value or None to leave it, result)
+        
+        Returns:
+            The result returned by func
+        """
+        tag, index, offset = self._locate(key)
+        locks = self._locks
+        locks.acquire(index, offset, self.SET.size)  # Hot path: no context manager
+        try:
+            entries = self.SET.unpack_from(self._map, offset)
+            tags = entries[0::2]
+            way = tags.index(tag) if tag in tags else None
+            new_value, result = func(entries[2 * way + 1] if way is not None else None)
+            
+            if new_value is not None:
+                if way is None:
+                    if 0 in tags:
+                        way = tags.index(0)
+                    else:
+                        way = min(range(self.WAYS), key=lambda w: entries[2 * w + 1])
+                        self.evictions += 1
+                self.ENTRY.pack_into(self._map, offset + way * self.ENTRY.size, tag, int(new_value))
+        finally:
+            locks.release(index, offset, self.SET.size)
+        return result
+    
+    def count(self):
+        """Occupied entries (scans the whole table)"""
+        body = memoryview(self._map)[self.HEADER.size:]
+        tags = struct.unpack_from(f'<{self.capacity * 2}q', body)[0::2]
+        body.release()
+        return self.capacity - tags.count(0)
+
+
+class SharedBlobs:
+    """
+    Bounded string -> bytes slots shared by all processes mapping `path`
+    
+    Direct-mapped: a key owns slot tag % slots and a colliding key simply
+    replaces it, which is fine for caches. Each entry records when it was
+    stored (wall clock, microseconds).
+    """
+    
+    MAGIC = b'VOLTBLB1'
+    HEADER = struct.Struct('<8sQQ')  # magic, slot count, slot bytes
+    SLOT_HEADER = struct.Struct('<qqQ')  # key tag, stored_at_us, length
+    
+    def __init__(self, path, slots=64, slot_bytes=64 * 1024):
+        if fcntl is None:
+            raise RuntimeError('Shared blobs need fcntl (POSIX)')
+        
+        self.path = path
+        self.slots = slots
+        self.max_bytes = slot_bytes - self.SLOT_HEADER.size
+        self._slot_bytes = slot_bytes
+        self._fd, self._map = _map_file(
+            path, self.HEADER.size + slot_bytes * slots, self.HEADER.pack(self.MAGIC, slots, slot_bytes)
+        )
+        self._locks = _RangeLocks(self._fd)
+    
+    def _slot(self, key):
+        tag = key_tag(key)
+        index = tag % self.slots
+        return tag, index, self.HEADER.size + index * self._slot_bytes
+    
+    def get(self, key):
+        """
+        Returns:
+            tuple: (bytes, stored_at_us) or None if absent
+        """
+        tag, index, offset = self._slot(key)
+        with self._locks.locked(index, offset, self._slot_bytes, shared=True):
+            stored_tag, stored_at_us, length = self.SLOT_HEADER.unpack_from(self._map, offset)
+            if stored_tag != tag:
+                return None
+            start = offset + self.SLOT_HEADER.size
+            return self._map[start:start + length], stored_at_us
+    
+    def set(self, key, data, stored_at_us):
+        """Store data (returns False if it does not fit a slot)"""
+        if len(data) > self.max_bytes:
+            return False
+        tag, index, offset = self._slot(key)
+        with self._locks.locked(index, offset, self._slot_bytes):
+            start = offset + self.SLOT_HEADER.size
+            self._map[start:start + len(data)] = data
+            self.SLOT_HEADER.pack_into(self._map, offset, tag, int(stored_at_us), len(data))
+        return True
+    
+    def delete(self, key):
+        tag, index, offset = self._slot(key)
+        with self._locks.locked(index, offset, self._slot_bytes):
+            if self.SLOT_HEADER.unpack_from(self._map, offset)[0] == tag:
+                self.SLOT_HEADER.pack_into(self._map, offset, 0, 0, 0)
+    
+    def clear(self):
+        for index in range(self.slots):
+            offset = self.HEADER.size + index * self._slot_bytes
+            with self._locks.locked(index, offset, self._slot_bytes):
+                self.SLOT_HEADER.pack_into(self._map, offset, 0, 0, 0)
@@ -0,0 +1,210 @@
+"""
+Per-request / per-tick SQL profiler and N+1 detector
+- before/after_cursor_execute listeners record every statement run by a
+  thread with an active profile: count and time per normalized statement
+  (literals and IN-lists collapsed, so a query issued in a loop groups
+  under one entry)
+- Off by default (VOLTONIC_SQL_PROFILE=1): API requests then carry a
+  Server-Timing header (DB time and query count), simulator ticks are
+  profiled too, and statements repeated at least `repeat_threshold` times
+  in one request/tick are logged as N+1 suspects and listed in /health
+- assert_max_queries() caps the queries of a block regardless of the
+  switch, for tests and benchmark scripts:
+
+    with assert_max_queries(5):
+        client.get('/api/buildings/1/energy-flow')
+"""
+
+import re
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_statement(statement):
+    """SQL with literals replaced by ? and IN (?, ?, ...) lists collapsed"""
+    statement = _STRING_LITERAL.sub('?', statement)
+    statement = _NUMBER_LITERAL.sub('?', statement)
+    statement = _IN_LIST.sub('(?...)', statement)
+    return _WHITESPACE.sub(' ', statement).strip()
+
+
+class QueryProfile:
+    """Statements run by one thread between start and finish"""
+    
+    def __init__(self, label):
+        self.label = label
+        self.started = time.perf_counter()
+        self.finished = None
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = {}  # normalized SQL -> [count, seconds]
+    
+    def record(self, statement, seconds):
+        self.queries += 1
+        self.db_seconds += seconds
+        entry = self.statements.get(statement)
+        if entry is None:
+            self.statements[statement] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+    
+    def repeated(self, threshold):
+        """[(statement, count, seconds)] run at least `threshold` times, most frequent first"""
+        return sorted(
+            ((statement, count, seconds) for statement, (count, seconds) in self.statements.items() if count >= threshold),
+            key=lambda item: item[1], reverse=True
+        )
+    
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+    
+    def server_timing(self):
+        """Server-Timing header value (milliseconds)"""
+        return (
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries", '
+            f'app;dur={self.elapsed() * 1000:.2f}'
+        )
+    
+    def format_report(self, limit=10):
+        """Multi-line summary: totals, then the most frequent statements"""
+        lines = [f"{self.label}: {self.queries} queries, {self.db_seconds * 1000:.1f} ms in the database"]
+        top = sorted(self.statements.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+        for statement, (count, seconds) in top:
+            lines.append(f"  {count:>5}x {seconds * 1000:8.1f} ms  {statement[:200]}")
+        return '\n'.join(lines)
+
+
+class SQLProfiler:
+    """Profile registry: the per-thread active profiles plus recent N+1 suspects"""
+    
+    REPEAT_THRESHOLD = 10
+    RECENT_SUSPECTS = 50
+    
+    def __init__(self):
+        self.enabled = False
+        self.repeat_threshold = self.REPEAT_THRESHOLD
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.profiled = 0
+        self.suspects = deque(maxlen=self.RECENT_SUSPECTS)
+    
+    def configure(self, enabled, repeat_threshold=REPEAT_THRESHOLD):
+        self.enabled = bool(enabled)
+        self.repeat_threshold = max(2, int(repeat_threshold))
+    
+    def _active(self):
+        active = getattr(self._local, 'active', None)
+        if active is None:
+            active = self._local.active = []
+        return active
+    
+    def start(self, label):
+        """Start profiling the current thread; pair with finish() on the same thread"""
+        profile = QueryProfile(label)
+        self._active().append(profile)
+        return profile
+    
+    def finish(self, profile, report=True):
+        """
+        Stop a profile (and any started after it on this thread)
+        
+        Args:
+            report: Log and keep statements repeated at least repeat_threshold times
+        """
+        active = self._active()
+        if profile in active:
+            del active[active.index(profile):]
+        profile.finished = time.perf_counter()
+        if not report:
+            return profile
+        
+        repeated = profile.repeated(self.repeat_threshold)
+        with self._lock:
+            self.profiled += 1
+            for statement, count, seconds in repeated:
+                self.suspects.append({
+                    'label': profile.label,
+                    'statement': statement[:500],
+                    'count': count,
+                    'db_ms': round(seconds * 1000, 1),
+                    'total_queries': profile.queries,
+                    'at': datetime.now().isoformat()
+                })
+        if repeated:
+            statement, count, _ = repeated[0]
+            print(
+                f"🔁 N+1 suspect: {profile.label} ran {profile.queries} queries; "
+                f"{count}x {statement[:160]}"
+                + (f" (+{len(repeated) - 1} more repeated)" if len(repeated) > 1 else '')
+            )
+        return profile
+    
+    @contextmanager
+    def profile(self, label):
+        """Profile a block when the profiler is enabled (yields None otherwise)"""
+        if not self.enabled:
+            yield None
+            return
+        profile = self.start(label)
+        try:
+            yield profile
+        finally:
+            self.finish(profile)
+    
+    def get_stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'repeat_threshold': self.repeat_threshold,
+                'profiled': self.profiled,
+                'recent_suspects': list(self.suspects)[-10:]
+            }
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    if getattr(sql_profiler._local, 'active', None):
+        sql_profiler._local.statement_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    active = getattr(sql_profiler._local, 'active', None)
+    if not active:
+        return
+    seconds = time.perf_counter() - getattr(sql_profiler._local, 'statement_started', time.perf_counter())
+    normalized = normalize_statement(statement)
+    for profile in active:
+        profile.record(normalized, seconds)
+
+
+@contextmanager
+def assert_max_queries(max_queries, label='block'):
+    """
+    Fail when a block runs more than `max_queries` SQL statements
+    
+    Works whether or not the profiler is enabled; the AssertionError
+    carries the per-statement report.
+    """
+    profile = sql_profiler.start(label)
+    try:
+        yield profile
+    finally:
+        sql_profiler.finish(profile, report=False)
+    if profile.queries > max_queries:
+        raise AssertionError(f"Expected at most {max_queries} queries\n{profile.format_report()}")
+
+
+# Global profiler (configured in create_app, used by api_bp hooks and the tick job)
+sql_profiler = SQLProfiler()
@@ -0,0 +1,143 @@
+"""
+Maintained row counters for /health and /stats/summary
+- An after_flush listener adds each flush's inserted/deleted/updated rows of
+  the tracked tables to the system_stat table, in the writer's own
+  transaction: counts commit or roll back with the data and cost one small
+  UPDATE per counter per flush
+- Reading them is one primary-key scan of a 4-row table instead of
+  COUNT(*)/MIN/MAX over tables with millions of rows
+- Counters are created once from full scans (initialize), each with a
+  single INSERT ... SELECT, so a concurrent writer is never missed
+- Bulk Core statements bypass the listener; none touch the tracked tables
+"""
+
+import time
+from sqlalchemy import event, func, insert, literal, select, update
+from sqlalchemy.orm import Session, attributes
+from app.models import db, SystemStat, EnergyLog, AutonomousLog, CancellationPattern
+
+# Counter -> (model, filter column or None); the filter column is a boolean that must be true
+COUNTERS = {
+    'energy_log.rows': (EnergyLog, None),
+    'energy_log.optimized': (EnergyLog, 'optimized'),
+    'autonomous_log.rows': (AutonomousLog, None),
+    'cancellation_pattern.auto_cutoff': (CancellationPattern, 'auto_cutoff_enabled')
+}
+TRACKED_MODELS = {model for model, _ in COUNTERS.values()}
+
+
+class SystemStats:
+    """Counter maintenance and reads"""
+    
+    def __init__(self):
+        self.started_at = time.time()  # Process start, for /health/live
+    
+    @staticmethod
+    def initialize():
+        """
+        Create missing counters from full scans (first start, or a new counter)
+        
+        Returns:
+            int: Counters created
+        """
+        existing = set(db.session.execute(select(SystemStat.name)).scalars())
+        missing = [name for name in COUNTERS if name not in existing]
+        for name in missing:
+            model, flag = COUNTERS[name]
+            if model is EnergyLog and flag is None:
+                columns = [func.min(EnergyLog.timestamp), func.max(EnergyLog.timestamp)]
+            else:
+                columns = [literal(None, db.DateTime), literal(None, db.DateTime)]
+            query = select(literal(name), func.count(), *columns).select_from(model)
+            if flag is not None:
+                query = query.where(getattr(model, flag) == True)
+            db.session.execute(
+                insert(SystemStat).from_select(['name', 'value', 'min_at', 'max_at'], query).prefix_with('OR IGNORE')
+            )
+        db.session.commit()
+        return len(missing)
+    
+    @staticmethod
+    def deltas_in_flush(session):
+        """
+        Counter changes made by a flush (attribute history is still pre-flush here)
+        
+        Returns:
+            tuple: ({counter: delta}, (earliest, latest) inserted EnergyLog timestamps or None)
+        """
+        deltas = {}
+        bounds = None
+        
+        def add(name, delta):
+            deltas[name] = deltas.get(name, 0) + delta
+        
+        def count(obj, sign):
+            for name, (model, flag) in COUNTERS.items():
+                if type(obj) is model and (flag is None or getattr(obj, flag)):
+                    add(name, sign)
+        
+        for obj in session.new:
+            if type(obj) in TRACKED_MODELS:
+                count(obj, 1)
+                if type(obj) is EnergyLog and obj.timestamp is not None:
+                    low, high = bounds or (obj.timestamp, obj.timestamp)
+                    bounds = (min(low, obj.timestamp), max(high, obj.timestamp))
+        for obj in session.deleted:
+            if type(obj) in TRACKED_MODELS:
+                count(obj, -1)
+        for obj in session.dirty:
+            if type(obj) not in TRACKED_MODELS:
+                continue
+            for name, (model, flag) in COUNTERS.items():
+                if type(obj) is not model or flag is None:
+                    continue
+                history = attributes.get_history(obj, flag)
+                if history.added:
+                    before = bool(history.deleted[0]) if history.deleted else False  # New in this session
+                    add(name, int(bool(history.added[0])) - int(before))
+        
+        return {name: delta for name, delta in deltas.items() if delta}, bounds
+    
+    @staticmethod
+    def apply(connection, deltas, bounds):
+        table = SystemStat.__table__
+        for name, delta in deltas.items():
+            values = {'value': table.c.value + delta}
+            if name == 'energy_log.rows' and bounds:
+                low, high = literal(bounds[0], db.DateTime), literal(bounds[1], db.DateTime)
+                values['min_at'] = func.min(func.coalesce(table.c.min_at, low), low)
+                values['max_at'] = func.max(func.coalesce(table.c.max_at, high), high)
+            connection.execute(update(table).where(table.c.name == name).values(**values))
+    
+    @staticmethod
+    def get_counters():
+        """counter -> SystemStat row (one query; missing before initialize())"""
+        return {row.name: row for row in SystemStat.query.all()}
+    
+    @staticmethod
+    def count(counters, name):
+        row = counters.get(name)
+        return row.value if row else 0
+
+
+def _keep_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+# Load the previous value when a flag is set on an expired instance (it would be
+# missing from the attribute history otherwise, and a no-op set would count)
+for _model, _flag in COUNTERS.values():
+    if _flag is not None:
+        event.listen(getattr(_model, _flag), 'set', _keep_previous_value, active_history=True, retval=True)
+
+
+@event.listens_for(Session, 'after_flush')
+def _count_flushed_rows(session, flush_context):
+    """Update the counters in the flushing transaction"""
+    deltas, bounds = SystemStats.deltas_in_flush(session)
+    if deltas:
+        SystemStats.apply(session.connection(), deltas, bounds)
+
+
+# Global stats (initialized in create_app, read by /health and /stats/summary)
+system_stats = SystemStats()
@@ -0,0 +1,243 @@
+"""
+Local IPC between API processes and the worker (Unix domain socket)
+- The scheduler leader (the worker, or the elected API worker when no
+  separate worker runs) serves instance/voltonic-worker.sock
+- API processes keep a subscription open and receive a 'tick' event as soon
+  as a tick commits; shared-memory polling (live_stream.follow_ticks) stays
+  as the fallback while the socket is down
+- Ops (registered in every process) are answered by the leader as
+  request/reply: call_leader() runs them in-process on the leader and over
+  the socket elsewhere. They serve state only the tick process holds (the
+  demand tracker, the anomaly detector); long-running work (training,
+  backfills, exports) goes through the job table instead (app.utils.jobs)
+- Messages are newline-delimited JSON; either side can restart at any time
+  and subscribers reconnect with backoff
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+
+HAS_UNIX_SOCKETS = hasattr(socket, 'AF_UNIX')
+
+
+class WorkerUnavailable(ConnectionError):
+    """No worker is listening on the IPC socket"""
+
+
+def _encode(message):
+    return (json.dumps(message, separators=(',', ':'), default=str) + '\n').encode('utf-8')
+
+
+class WorkerChannel:
+    """Server side: pushes events to subscribers and answers requests"""
+    
+    SEND_TIMEOUT = 2.0  # A stalled subscriber is dropped, never blocks the tick
+    
+    def __init__(self):
+        self.path = None
+        self._server = None
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._handlers = {}
+        self.events_published = 0
+    
+    def register(self, op, handler):
+        """handler(**params) -> JSON-serializable result; runs on a socket thread, without an app context"""
+        self._handlers[op] = handler
+    
+    @property
+    def serving(self):
+        return self._server is not None
+    
+    def call(self, op, **params):
+        """Run a registered op in this process"""
+        handler = self._handlers.get(op)
+        if handler is None:
+            raise ValueError(f"Unknown op: {op}")
+        return handler(**params)
+    
+    def serve(self, path):
+        """Start listening (call only while holding the scheduler lock)"""
+        if self._server is not None or not HAS_UNIX_SOCKETS:
+            return
+        if os.path.exists(path):
+            os.unlink(path)  # Left behind by a previous leader
+        
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(32)
+        self.path = path
+        self._server = server
+        threading.Thread(target=self._accept_loop, name='worker-ipc', daemon=True).start()
+        print(f"🔌 Worker IPC listening on {path}")
+    
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+    
+    def _handle(self, conn):
+        """Serve one connection: a subscription or a sequence of requests"""
+        try:
+            for line in conn.makefile('rb'):
+                message = json.loads(line)
+                op = message.get('op')
+                if op == 'subscribe':
+                    conn.settimeout(self.SEND_TIMEOUT)
+                    with self._lock:
+                        self._subscribers.append(conn)
+                    return  # publish() owns the connection from now on
+                
+                try:
+                    reply = {'id': message.get('id'), 'ok': True, 'result': self.call(op, **message.get('params', {}))}
+                except Exception as e:
+                    reply = {'id': message.get('id'), 'ok': False, 'error': str(e)}
+                conn.sendall(_encode(reply))
+        except (OSError, ValueError):
+            pass
+        conn.close()
+    
+    def publish(self, event, **payload):
+        """Send an event to every subscriber (no-op when not serving)"""
+        if self._server is None:
+            return
+        data = _encode(dict(payload, event=event))
+        with self._lock:
+            subscribers = list(self._subscribers)
+        
+        dead = []
+        for conn in subscribers:
+            try:
+                conn.sendall(data)
+            except OSError:
+                dead.append(conn)
+        with self._lock:
+            for conn in dead:
+                self._subscribers.remove(conn)
+                conn.close()
+            self.events_published += 1
+    
+    def get_status(self):
+        with self._lock:
+            return {
+                'serving': self._server is not None,
+                'path': self.path,
+                'subscribers': len(self._subscribers),
+                'events_published': self.events_published
+            }
+
+
+class WorkerClient:
+    """API side: event subscription with reconnect, and request/reply"""
+    
+    MAX_BACKOFF_SECONDS = 10
+    
+    def __init__(self):
+        self.path = None
+        self.connected = False
+        self.events_received = 0
+        self._thread = None
+    
+    def configure(self, path):
+        self.path = path
+    
+    def available(self):
+        return HAS_UNIX_SOCKETS and self.path is not None and os.path.exists(self.path)
+    
+    def _connect(self, timeout=None):
+        if not self.available():
+            raise WorkerUnavailable('Worker IPC socket not found')
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            raise WorkerUnavailable(f'Worker not reachable: {e}')
+        return sock
+    
+    def subscribe(self, on_event):
+        """
+        Receive events in a background thread until the process exits
+        
+        Args:
+            on_event: Callable(message dict); exceptions are logged, not raised
+        """
+        if self._thread is not None or not HAS_UNIX_SOCKETS:
+            return
+        
+        def run():
+            backoff = 0.5
+            while True:
+                try:
+                    with self._connect() as sock:
+                        sock.sendall(_encode({'op': 'subscribe'}))
+                        self.connected = True
+                        backoff = 0.5
+                        for line in sock.makefile('rb'):
+                            self.events_received += 1
+                            try:
+                                on_event(json.loads(line))
+                            except Exception as e:
+                                print(f"❌ Worker event error: {e}")
+                except (OSError, ValueError):
+                    pass
+                self.connected = False
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.MAX_BACKOFF_SECONDS)
+        
+        self._thread = threading.Thread(target=run, name='worker-subscriber', daemon=True)
+        self._thread.start()
+    
+    def request(self, op, timeout=30, **params):
+        """
+        Run an operation in the worker and wait for its result
+        
+        Raises:
+            WorkerUnavailable: No worker listening, or no reply within `timeout`
+            RuntimeError: The operation failed in the worker
+        """
+        with self._connect(timeout) as sock:
+            try:
+                sock.sendall(_encode({'op': op, 'id': os.getpid(), 'params': params}))
+                line = sock.makefile('rb').readline()
+            except OSError as e:  # Including the timeout
+                raise WorkerUnavailable(f'Worker did not reply: {e}')
+        if not line:
+            raise WorkerUnavailable('Worker closed the connection')
+        reply = json.loads(line)
+        if not reply.get('ok'):
+            raise RuntimeError(reply.get('error') or f'{op} failed in the worker')
+        return reply['result']
+    
+    def get_status(self):
+        return {
+            'path': self.path,
+            'connected': self.connected,
+            'events_received': self.events_received
+        }
+
+
+# Global IPC endpoints (channel: served by the scheduler leader; client: API processes)
+worker_channel = WorkerChannel()
+worker_client = WorkerClient()
+
+
+def call_leader(op, timeout=5, **params):
+    """
+    Run a registered op in the scheduler leader: in-process when this
+    process is the leader, else over the socket
+    
+    Raises:
+        WorkerUnavailable: Not the leader and no leader listening
+        RuntimeError: The op failed in the leader
+    """
+    if worker_channel.serving:
+        return worker_channel.call(op, **params)
+    return worker_client.request(op, timeout=timeout, **params)
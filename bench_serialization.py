@@ -0,0 +1,75 @@
+"""
+Serialization / compression benchmark for the largest API responses
+
+Usage: python bench_serialization.py [rounds]
+
+For each endpoint prints:
+- JSON encode time with Flask's default provider vs the orjson provider
+- bytes on the wire: identity, gzip and br (when brotli is installed)
+- end-to-end request time: first request vs pre-serialized cache hit
+"""
+
+import sys
+import time
+from flask.json.provider import DefaultJSONProvider
+from app import create_app
+from app.models import Building
+from app.utils.json_provider import FastJSONProvider, orjson
+from app.utils.compression import compress_bytes, brotli
+from app.utils.response_cache import response_cache
+
+ROUNDS = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+app = create_app()
+
+
+def best_of(fn, rounds=ROUNDS):
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+with app.app_context():
+    first_building = Building.query.order_by(Building.id).first()
+    endpoints = [
+        '/api/history/campus?hours=168',
+        '/api/buildings',
+        '/api/campus/structure',
+        f'/api/buildings/{first_building.id if first_building else 1}/energy-flow'
+    ]
+    
+    stdlib = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+    client = app.test_client()
+    
+    print(f"\n📦 Serialization benchmark (best of {ROUNDS}, orjson {'on' if orjson else 'NOT installed'}, "
+          f"brotli {'on' if brotli else 'NOT installed'})\n")
+    print(f"{'endpoint':45} {'json ms':>8} {'orjson ms':>9} {'identity':>10} {'gzip':>9} {'br':>9} {'cold ms':>8} {'cached ms':>9}")
+    
+    for url in endpoints:
+        response_cache.clear()
+        
+        started = time.perf_counter()
+        response = client.get(url, headers={'Accept-Encoding': 'identity'})
+        cold_ms = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            print(f"{url:45} ❌ HTTP {response.status_code}")
+            continue
+        
+        payload = response.get_json()
+        json_ms = best_of(lambda: stdlib.dumps(payload, separators=(',', ':')))
+        fast_ms = best_of(lambda: fast.dumps_bytes(payload))
+        
+        body = fast.dumps_bytes(payload)
+        gzip_size = len(compress_bytes(body, 'gzip'))
+        br_size = len(compress_bytes(body, 'br')) if brotli else None
+        
+        cached_ms = best_of(lambda: client.get(url, headers={'Accept-Encoding': 'gzip'}))
+        
+        print(f"{url:45} {json_ms:8.2f} {fast_ms:9.2f} {len(body):10,} {gzip_size:9,} "
+              f"{(f'{br_size:,}' if br_size else '-'):>9} {cold_ms:8.1f} {cached_ms:9.2f}")
+    
+    print(f"\n🗄️  Response cache: {response_cache.get_cache_info()}\n")
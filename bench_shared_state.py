@@ -0,0 +1,84 @@
+"""
+Shared-state benchmark for multi-worker deployments
+
+Usage: python bench_shared_state.py [checks]
+
+Prints:
+- per-check time of the rate limiter, in-process buckets vs the shared table
+- per-lookup time of a @cached function, local LRU hit vs shared blob hit
+- a cross-process check: forked workers hammer one key and must together
+  be allowed exactly the configured budget
+"""
+
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
+from app import create_app
+from app.utils.rate_limiter import RateLimiter
+from app.utils.function_cache import FunctionCache
+from app.utils.shared_state import SharedBlobs
+
+CHECKS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+KEYS = 5_000
+WORKERS = 4
+BUDGET = 1_000
+
+app = create_app()
+
+
+def per_call_us(fn, calls=CHECKS):
+    started = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+def hammer(path, results):
+    limiter = RateLimiter()
+    limiter.attach_shared(path)
+    allowed = sum(
+        1 for _ in range(BUDGET) if not limiter.is_rate_limited('bench:shared-key', BUDGET, 3600)[0]
+    )
+    results.put(allowed)
+
+
+if __name__ == '__main__':
+    workdir = tempfile.mkdtemp(prefix='voltonic-bench-')
+    keys = [f'api.routes.bench:10.0.{i // 256}.{i % 256}' for i in range(KEYS)]
+    
+    local_limiter = RateLimiter()
+    shared_limiter = RateLimiter()
+    shared_limiter.attach_shared(os.path.join(workdir, 'ratelimit.bin'))
+    
+    print(f"\n⏱️  Shared state benchmark ({CHECKS:,} calls, {KEYS:,} keys)\n")
+    print(f"{'operation':40} {'local us':>9} {'shared us':>10}")
+    
+    local_us = per_call_us(lambda i: local_limiter.is_rate_limited(keys[i % KEYS], 1_000_000, 60))
+    shared_us = per_call_us(lambda i: shared_limiter.is_rate_limited(keys[i % KEYS], 1_000_000, 60))
+    print(f"{'rate limit check':40} {local_us:9.2f} {shared_us:10.2f} {'✅' if shared_us < 10 else '❌'}")
+    
+    with app.app_context():
+        prediction = {'predicted_load_kw': 5231.7, 'confidence': 0.91, 'features': list(range(40))}
+        cache = FunctionCache('bench.prediction', shared=True)
+        cache._blobs = SharedBlobs(os.path.join(workdir, 'cache.bin'))
+        cache.lookup('campus', lambda: prediction)
+        
+        local_us = per_call_us(lambda i: cache.lookup('campus', lambda: prediction), CHECKS // 4)
+        shared_us = per_call_us(lambda i: cache._entries.clear() or cache.lookup('campus', lambda: prediction), CHECKS // 4)
+        print(f"{'cached prediction lookup':40} {local_us:9.2f} {shared_us:10.2f}")
+    
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=hammer, args=(os.path.join(workdir, 'ratelimit.bin'), results))
+        for _ in range(WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    allowed = sum(results.get() for _ in workers)
+    for worker in workers:
+        worker.join()
+    
+    print(f"\n🔒 {WORKERS} processes x {BUDGET} requests on one key, budget {BUDGET}: "
+          f"{allowed} allowed {'✅' if allowed == BUDGET else '❌'}\n")
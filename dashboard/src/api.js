@@ -5,11 +5,51 @@ const API_BASE_URL = '/api';
 const api = axios.create({
   baseURL: API_BASE_URL,
   timeout: 10000,
+  // 304 Not Modified is resolved from the ETag cache below
+  validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+});
+
+// Conditional GET: the backend tags responses with a tick-versioned ETag,
+// so polls between simulation ticks come back as empty 304s
+const etagCache = new Map();
+
+api.interceptors.request.use((config) => {
+  if ((config.method || 'get') === 'get') {
+    const cached = etagCache.get(api.getUri(config));
+    if (cached) {
+      config.headers['If-None-Match'] = cached.etag;
+    }
+  }
+  return config;
+});
+
+api.interceptors.response.use((response) => {
+  if ((response.config.method || 'get') !== 'get') {
+    return response;
+  }
+  
+  const key = api.getUri(response.config);
+  if (response.status === 304) {
+    const cached = etagCache.get(key);
+    if (cached) {
+      return { ...response, status: 200, data: cached.data };
+    }
+    return response;
+  }
+  
+  const etag = response.headers.etag;
+  if (etag) {
+    etagCache.set(key, { etag, data: response.data });
+  } else {
+    etagCache.delete(key);
+  }
+  return response;
 });
 
 export const dashboardAPI = {
   // Dashboard & Live Data
   getLiveDashboard: () => api.get('/dashboard/live'),
+  getDashboardBundle: (panels) => api.get('/dashboard/bundle', { params: { panels: panels && panels.join(',') } }),
   getCampusLive: () => api.get('/live/campus'),
   getBuildingsLive: () => api.get('/live/buildings'),
   getBuildingLive: (buildingId) => api.get(`/live/building/${buildingId}`),
@@ -50,8 +90,9 @@ export const dashboardAPI = {
   getRoomDetails: (roomId) => api.get(`/campus/room/${roomId}`),
   
   // Historical Data
-  getRoomHistory: (roomId, hours = 24) => api.get(`/history/room/${roomId}`, { params: { hours } }),
-  getCampusHistory: (hours = 24) => api.get('/history/campus', { params: { hours } }),
+  getRoomHistory: (roomId, hours = 24, maxPoints) => api.get(`/history/room/${roomId}`, { params: { hours, max_points: maxPoints } }),
+  getCampusHistory: (hours = 24, maxPoints) => api.get('/history/campus', { params: { hours, max_points: maxPoints } }),
+  syncChanges: (since, kinds) => api.get('/sync', { params: { since, kinds } }),
   
   // Statistics
   getStatsSummary: () => api.get('/stats/summary'),
@@ -82,4 +123,90 @@ export const dashboardAPI = {
     api.post(`/rooms/${roomId}/power-control`, controlData),
 };
 
+// Live updates: one shared Server-Sent Events connection per page.
+// Listeners get each tick's update ({ campus, buildings, notifications })
+// and typically refetch their (ETag-validated) endpoints in response.
+// Retries after a rejected stream start at the server's Retry-After (15 s).
+const LIVE_RETRY_MIN_MS = 15000;
+const LIVE_RETRY_MAX_MS = 120000;
+const liveListeners = new Set();
+let liveSource = null;
+let liveFallbackTimer = null;
+let liveRetryTimer = null;
+let liveRetryDelay = LIVE_RETRY_MIN_MS;
+
+const dispatchLive = (event) => {
+  const update = event ? JSON.parse(event.data) : null;
+  liveListeners.forEach((listener) => listener(update));
+};
+
+const startLivePolling = () => {
+  if (!liveFallbackTimer) {
+    liveFallbackTimer = setInterval(() => dispatchLive(null), 5000);
+  }
+};
+
+const stopLive = () => {
+  if (liveSource) {
+    liveSource.close();
+    liveSource = null;
+  }
+  if (liveFallbackTimer) {
+    clearInterval(liveFallbackTimer);
+    liveFallbackTimer = null;
+  }
+  if (liveRetryTimer) {
+    clearTimeout(liveRetryTimer);
+    liveRetryTimer = null;
+  }
+};
+
+const openLiveSource = () => {
+  liveRetryTimer = null;
+  liveSource = new EventSource(`${API_BASE_URL}/stream/live`);
+  liveSource.addEventListener('tick', dispatchLive);
+  liveSource.addEventListener('snapshot', dispatchLive);
+  liveSource.onopen = () => {
+    // Streaming again: stop polling and reset the backoff
+    liveRetryDelay = LIVE_RETRY_MIN_MS;
+    if (liveFallbackTimer) {
+      clearInterval(liveFallbackTimer);
+      liveFallbackTimer = null;
+    }
+  };
+  liveSource.onerror = () => {
+    // A dropped connection is retried by EventSource itself (readyState
+    // CONNECTING). A non-200 answer, such as the 503 a worker sends at its
+    // subscriber cap, closes the source for good: poll until a retry works.
+    if (liveSource.readyState !== EventSource.CLOSED) {
+      return;
+    }
+    liveSource.close();
+    liveSource = null;
+    startLivePolling();
+    liveRetryTimer = setTimeout(openLiveSource, liveRetryDelay);
+    liveRetryDelay = Math.min(liveRetryDelay * 2, LIVE_RETRY_MAX_MS);
+  };
+};
+
+export const subscribeLive = (listener) => {
+  liveListeners.add(listener);
+  
+  if (!liveSource && !liveFallbackTimer && !liveRetryTimer) {
+    if (typeof EventSource === 'undefined') {
+      // No SSE support: fall back to the old 5 second polling
+      startLivePolling();
+    } else {
+      openLiveSource();
+    }
+  }
+  
+  return () => {
+    liveListeners.delete(listener);
+    if (liveListeners.size === 0) {
+      stopLive();
+    }
+  };
+};
+
 export default api;
@@ -1,10 +1,13 @@
 import React, { useState, useEffect } from 'react';
-import { dashboardAPI } from '../api';
+import { dashboardAPI, subscribeLive } from '../api';
 import {
   LineChart, Line, BarChart, Bar, AreaChart, Area,
   XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer
 } from 'recharts';
 
+// Server downsamples campus history to roughly one point per chart pixel
+const HISTORY_MAX_POINTS = 400;
+
 function AnalyticsCharts() {
   const [hourlyData, setHourlyData] = useState([]);
   const [dailyData, setDailyData] = useState([]);
@@ -16,10 +19,8 @@ function AnalyticsCharts() {
   useEffect(() => {
     fetchAllData();
 
-    // Auto-refresh every 5 seconds
-    const interval = setInterval(fetchAllData, 5000);
-
-    return () => clearInterval(interval);
+    // Refresh when the simulator pushes a new tick
+    return subscribeLive(fetchAllData);
   }, [timeRange]);
 
   const fetchAllData = async () => {
@@ -27,7 +28,7 @@ function AnalyticsCharts() {
       const [hourlyRes, dailyRes, historyRes] = await Promise.all([
         dashboardAPI.getHourlyAnalytics(timeRange.hourly),
         dashboardAPI.getDailyAnalytics(timeRange.daily),
-        dashboardAPI.getCampusHistory(timeRange.history)
+        dashboardAPI.getCampusHistory(timeRange.history, HISTORY_MAX_POINTS)
       ]);
 
       setHourlyData(hourlyRes.data.data || []);
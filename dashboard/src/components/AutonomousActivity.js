@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { dashboardAPI } from '../api';
+import { dashboardAPI, subscribeLive } from '../api';
 
 function AutonomousActivity() {
   const [logs, setLogs] = useState([]);
@@ -13,14 +13,24 @@ function AutonomousActivity() {
   useEffect(() => {
     fetchData();
     
-    // Refresh notifications every 30 seconds
-    const notifInterval = setInterval(fetchNotifications, 30000);
+    // New notifications arrive with each pushed tick
+    const unsubscribe = subscribeLive((update) => {
+      if (!update) {
+        fetchNotifications();
+      } else if (update.notifications && update.notifications.length > 0) {
+        setNotifications((prev) => {
+          const seen = new Set(prev.map((n) => n.id));
+          const fresh = update.notifications.filter((n) => !seen.has(n.id));
+          return [...fresh, ...prev].slice(0, 20);
+        });
+      }
+    });
     
     // Refresh other data every 5 minutes
     const dataInterval = setInterval(fetchData, 300000);
 
     return () => {
-      clearInterval(notifInterval);
+      unsubscribe();
       clearInterval(dataInterval);
     };
   }, []);
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { dashboardAPI } from '../api';
+import { dashboardAPI, subscribeLive } from '../api';
 
 function BuildingView() {
   const [buildings, setBuildings] = useState([]);
@@ -11,10 +11,8 @@ function BuildingView() {
   useEffect(() => {
     fetchBuildings();
 
-    // Auto-refresh every 5 seconds
-    const interval = setInterval(fetchBuildings, 5000);
-
-    return () => clearInterval(interval);
+    // Refresh when the simulator pushes a new tick
+    return subscribeLive(fetchBuildings);
   }, []);
 
   useEffect(() => {
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { dashboardAPI } from '../api';
+import { dashboardAPI, subscribeLive } from '../api';
 
 // Building Card Component with Isometric View
 function BuildingCard({ building, isSelected, onClick }) {
@@ -292,8 +292,7 @@ function CampusMap() {
 
   useEffect(() => {
     fetchData();
-    const interval = setInterval(fetchData, 5000);
-    return () => clearInterval(interval);
+    return subscribeLive(fetchData);
   }, []);
 
   useEffect(() => {
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { dashboardAPI } from '../api';
+import { dashboardAPI, subscribeLive } from '../api';
 
 function CampusStructure() {
   const [structure, setStructure] = useState(null);
@@ -14,10 +14,8 @@ function CampusStructure() {
   useEffect(() => {
     fetchCampusStructure();
     
-    // Auto-refresh every 5 seconds
-    const interval = setInterval(fetchCampusStructure, 5000);
-    
-    return () => clearInterval(interval);
+    // Refresh when the simulator pushes a new tick
+    return subscribeLive(fetchCampusStructure);
   }, []);
 
   useEffect(() => {
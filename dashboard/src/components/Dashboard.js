@@ -1,29 +1,32 @@
 import React, { useState, useEffect } from 'react';
-import { dashboardAPI } from '../api';
+import { dashboardAPI, subscribeLive } from '../api';
 import LiveData from './LiveData';
 import OptimizationMetrics from './OptimizationMetrics';
 import PredictionCard from './PredictionCard';
 import AutonomousActivity from './AutonomousActivity';
 import SolarStatus from './SolarStatus';
 
+const BUNDLE_PANELS = ['live', 'prediction', 'prediction_30min', 'solar', 'hybrid'];
+
 function Dashboard() {
   const [dashboardData, setDashboardData] = useState(null);
+  const [bundle, setBundle] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
   useEffect(() => {
     fetchDashboardData();
     
-    // Auto-refresh every 5 seconds
-    const interval = setInterval(fetchDashboardData, 5000);
-    
-    return () => clearInterval(interval);
+    // Refresh when the simulator pushes a new tick
+    return subscribeLive(fetchDashboardData);
   }, []);
 
   const fetchDashboardData = async () => {
     try {
-      const response = await dashboardAPI.getLiveDashboard();
-      setDashboardData(response.data.data);
+      // One request (and one shared DB snapshot) for every panel on the page
+      const response = await dashboardAPI.getDashboardBundle(BUNDLE_PANELS);
+      setDashboardData(response.data.data.live);
+      setBundle(response.data);
       setError(null);
     } catch (err) {
       console.error('Error fetching dashboard data:', err);
@@ -51,10 +54,22 @@ function Dashboard() {
         <OptimizationMetrics data={dashboardData?.optimization_savings} />
         
         {/* Next Hour Prediction */}
-        <PredictionCard />
+        <PredictionCard
+          bundled={!!bundle}
+          data={bundle?.data.prediction}
+          error={bundle?.errors.prediction}
+        />
         
         {/* Solar & Power Status */}
-        <SolarStatus />
+        <SolarStatus
+          bundled={!!bundle}
+          solar={bundle?.data.solar}
+          hybrid={bundle?.data.hybrid}
+          prediction30min={bundle?.data.prediction_30min}
+          error={bundle?.errors.solar}
+          hybridError={bundle?.errors.hybrid}
+          prediction30minError={bundle?.errors.prediction_30min}
+        />
       </div>
       
       {/* Autonomous Activity Section */}
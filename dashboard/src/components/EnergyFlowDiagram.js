@@ -1,5 +1,5 @@
 import React, { useState, useEffect, useRef, useLayoutEffect } from 'react';
-import { dashboardAPI } from '../api';
+import { dashboardAPI, subscribeLive } from '../api';
 
 function EnergyFlowDiagram() {
     const [buildings, setBuildings] = useState([]);
@@ -57,23 +57,21 @@ function EnergyFlowDiagram() {
         fetchEnergySources();
     }, []);
 
-    // Poll for Building Data
+    // Refresh Building Data on each pushed tick
     useEffect(() => {
         if (selectedBuilding) {
             fetchEnergyFlow(selectedBuilding);
-            const interval = setInterval(() => fetchEnergyFlow(selectedBuilding), 5000);
-            return () => clearInterval(interval);
+            return subscribeLive(() => fetchEnergyFlow(selectedBuilding));
         } else {
             setEnergyFlow(null);
         }
     }, [selectedBuilding]);
 
-    // Poll for Faculty Data
+    // Refresh Faculty Data on each pushed tick
     useEffect(() => {
         if (selectedFaculty) {
             fetchFacultyData(selectedFaculty);
-            const interval = setInterval(() => fetchFacultyData(selectedFaculty), 5000);
-            return () => clearInterval(interval);
+            return subscribeLive(() => fetchFacultyData(selectedFaculty));
         } else {
             setFacultyData(null);
         }
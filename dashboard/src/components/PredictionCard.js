@@ -1,19 +1,27 @@
 import React, { useState, useEffect } from 'react';
 import { dashboardAPI } from '../api';
 
-function PredictionCard() {
+function PredictionCard({ bundled = false, data = null, error: bundleError = null }) {
   const [prediction, setPrediction] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
   useEffect(() => {
+    // Data supplied by the dashboard bundle: no request of our own
+    if (bundled) {
+      setPrediction(data);
+      setError(bundleError);
+      setLoading(false);
+      return undefined;
+    }
+    
     fetchPrediction();
 
     // Refresh prediction every 10 minutes (matches backend cache TTL)
     const interval = setInterval(fetchPrediction, 600000); // 10 minutes
 
     return () => clearInterval(interval);
-  }, []);
+  }, [bundled, data, bundleError]);
 
   const fetchPrediction = async () => {
     try {
@@ -1,21 +1,39 @@
 import React, { useState, useEffect } from 'react';
 import { dashboardAPI } from '../api';
 
-function SolarStatus() {
+function SolarStatus({
+  bundled = false, solar = null, hybrid = null, prediction30min = null,
+  error: bundleError = null, hybridError = null, prediction30minError = null
+}) {
   const [solarStatus, setSolarStatus] = useState(null);
   const [hybridStatus, setHybridStatus] = useState(null);
   const [prediction30, setPrediction30] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  // Bundle panels fail independently: hybrid and prediction errors per section
+  const [hybridFailed, setHybridFailed] = useState(false);
+  const [prediction30Failed, setPrediction30Failed] = useState(false);
 
   useEffect(() => {
+    // Data supplied by the dashboard bundle: no requests of our own
+    if (bundled) {
+      setSolarStatus(solar);
+      setHybridStatus(hybrid);
+      setPrediction30(prediction30min);
+      setError(bundleError);
+      setHybridFailed(!!hybridError);
+      setPrediction30Failed(!!prediction30minError);
+      setLoading(false);
+      return undefined;
+    }
+    
     fetchData();
     
     // Refresh every 2 minutes
     const interval = setInterval(fetchData, 120000);
     
     return () => clearInterval(interval);
-  }, []);
+  }, [bundled, solar, hybrid, prediction30min, bundleError, hybridError, prediction30minError]);
 
   const fetchData = async () => {
     try {
@@ -170,8 +188,14 @@ function SolarStatus() {
             </div>
           </div>
         )}
+        {prediction30Failed && !prediction30 && (
+          <div className="error">30-min prediction unavailable</div>
+        )}
 
         {/* Hybrid Mode Buildings */}
+        {hybridFailed && !hybridStatus && (
+          <div className="error">Hybrid status unavailable</div>
+        )}
         {hybridStatus && hybridStatus.hybrid_buildings_count > 0 && (
           <div>
             <div style={{ 
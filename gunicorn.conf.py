@@ -0,0 +1,37 @@
+"""
+Gunicorn settings for the production launch mode
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Environment overrides: VOLTONIC_BIND, VOLTONIC_WORKERS, VOLTONIC_THREADS,
+VOLTONIC_SSE_SUBSCRIBERS
+"""
+
+import os
+
+bind = os.environ.get('VOLTONIC_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('VOLTONIC_WORKERS', min(4, (os.cpu_count() or 1) + 1)))
+
+# Threaded workers: every /api/stream/live subscriber holds a thread for as
+# long as it is connected, so SSE gets its own budget on top of the request
+# threads. The app refuses subscribers past that budget with 503, and
+# ordinary requests always keep VOLTONIC_THREADS threads per worker.
+worker_class = 'gthread'
+sse_subscribers = int(os.environ.get('VOLTONIC_SSE_SUBSCRIBERS', 16))
+threads = int(os.environ.get('VOLTONIC_THREADS', 16)) + sse_subscribers
+os.environ['VOLTONIC_SSE_SUBSCRIBERS'] = str(sse_subscribers)  # Read by create_app
+
+# Import the app and load the model once, then fork
+preload_app = True
+
+# The leader worker also runs the simulator and the daily model training
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+
+
+def post_fork(server, worker):
+    from wsgi import on_worker_start
+    on_worker_start()
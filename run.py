@@ -1,11 +1,24 @@
 from app import create_app
-from app.models import db, Room, EnergyLog
+from app.models import db, Room, EnergyLog, OccupancyCubeCell, LoadRollup, CampusSeries
 from app.utils.seed_data import seed_campus
 from app.simulation.engine import IoTSimulator
 from app.prediction.predictor import EnergyPredictor
+from app.analytics.occupancy_cube import OccupancyCube
+from app.analytics.load_rollup import load_rollup
+from app.analytics.campus_series import CampusSeriesStore
+from app.utils.data_version import data_version
+from app.utils.leader import scheduler_leader
+from app.utils.live_stream import live_broadcaster
+from app.utils.worker_ipc import worker_channel, worker_client
+from app.utils.jobs import job_queue
+from app.utils.sql_profiler import sql_profiler
+from app.utils.generate_historical_data import HistoricalDataGenerator
+from app.utils.export_data import stream_export, count_export_rows, DATASETS, FORMATS
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime, timedelta
+import threading
 import atexit
+import os
 
 # Create Flask app
 app = create_app()
@@ -13,6 +26,12 @@ app = create_app()
 # Global predictor instance
 predictor = EnergyPredictor()
 
+# Scheduled and on-demand training never overlap
+training_lock = threading.Lock()
+
+# Backfill jobs rewrite the same tables; run them one at a time
+backfill_lock = threading.Lock()
+
 def initialize_database():
     """Check if database needs seeding"""
     with app.app_context():
@@ -24,12 +43,31 @@ def initialize_database():
             print("\n✅ Database seeded successfully!\n")
         else:
             print(f"\n✅ Database already contains {room_count} rooms\n")
+            
+            # Backfill hour-of-week cube for databases created before it existed
+            if OccupancyCubeCell.query.first() is None and EnergyLog.query.first() is not None:
+                print("🧊 Building hour-of-week cube from existing logs...")
+                cells = OccupancyCube.rebuild()
+                print(f"✅ Hour-of-week cube ready ({cells} cells)\n")
+            
+            # Backfill hourly load rollups/sketches the same way
+            if LoadRollup.query.first() is None and EnergyLog.query.first() is not None:
+                print("📐 Building hourly load rollups from existing logs...")
+                rows = load_rollup.rebuild()
+                print(f"✅ Load rollups ready ({rows} hourly rows)\n")
+            
+            # Backfill the multi-resolution campus series for history charts
+            if CampusSeries.query.first() is None and EnergyLog.query.first() is not None:
+                print("📉 Building campus history series from existing logs...")
+                rows = CampusSeriesStore.rebuild()
+                print(f"✅ Campus series ready ({rows} rows)\n")
 
 def run_simulation_job():
     """Scheduled job to simulate IoT data every 60 seconds"""
     with app.app_context():
         try:
-            IoTSimulator.simulate_all_rooms()
+            with sql_profiler.profile('simulation tick'):
+                IoTSimulator.simulate_all_rooms()
         except Exception as e:
             print(f"❌ Simulation error: {e}")
 
@@ -38,7 +76,8 @@ def train_ml_model_job():
     with app.app_context():
         try:
             print("\n🤖 Starting scheduled model retraining...")
-            predictor.train_model(hours_back=168)
+            with training_lock:
+                predictor.train_model(hours_back=168)
         except Exception as e:
             print(f"❌ Model training error: {e}")
 
@@ -51,7 +90,8 @@ def check_and_train_initial_model():
         
         if log_count >= 100:
             print("\n🤖 Sufficient data found. Training initial ML model...")
-            success, result = predictor.train_model(hours_back=24)
+            with training_lock:
+                success, result = predictor.train_model(hours_back=24)
             if success:
                 print(f"✅ Initial model trained! MAE: {result['mae']} kW\n")
         else:
@@ -94,14 +134,169 @@ def start_simulation_scheduler():
     # Shutdown scheduler on exit
     atexit.register(lambda: scheduler.shutdown())
 
+# Background jobs: submitted through /api/jobs, run by the scheduler leader's job pool
+
+def validate_training_params(params):
+    hours_back = int(params.get('hours_back', 168))
+    if not 1 <= hours_back <= 8760:
+        raise ValueError('hours_back must be between 1 and 8760')
+    return {'hours_back': hours_back}
+
+def run_training_job(job):
+    """Job 'train': retrain the ML model (also queued by POST /prediction/train)"""
+    with training_lock:
+        success, result = predictor.train_model(hours_back=job.params['hours_back'], progress=job.progress)
+    if not success:
+        raise ValueError(result)
+    return result
+
+def rebuild_rollups(job, start_percent=0):
+    """Recompute the cube, load rollups and campus series from EnergyLog"""
+    span = 100 - start_percent
+    job.progress(start_percent, 'Rebuilding hour-of-week cube')
+    cells = OccupancyCube.rebuild()
+    job.progress(start_percent + span * 0.4, 'Rebuilding hourly load rollups')
+    rollups = load_rollup.rebuild()
+    job.progress(start_percent + span * 0.8, 'Rebuilding campus series')
+    series = CampusSeriesStore.rebuild()
+    
+    # Cached analytics and history endpoints depend on the 'tick' version
+    data_version.bump('tick')
+    return {'cube_cells': cells, 'load_rollups': rollups, 'campus_series': series}
+
+def run_rollup_job(job):
+    """Job 'rebuild_rollups': recompute all rollups (after imports or manual fixes)"""
+    with backfill_lock:
+        return rebuild_rollups(job)
+
+def validate_history_params(params):
+    days = int(params.get('days', 7))
+    interval_minutes = int(params.get('interval_minutes', 60))
+    force = bool(params.get('force', False))
+    if not 1 <= days <= 365:
+        raise ValueError('days must be between 1 and 365')
+    if not 5 <= interval_minutes <= 1440:
+        raise ValueError('interval_minutes must be between 5 and 1440')
+    
+    # Same safeguard as the interactive generator
+    if not force and EnergyLog.query.first() is not None:
+        raise ValueError('Database already contains energy logs; pass "force": true to add history anyway')
+    return {'days': days, 'interval_minutes': interval_minutes, 'force': force}
+
+def run_history_job(job):
+    """Job 'generate_history': simulated logs for the past N days, then the rollups"""
+    with backfill_lock:
+        logs = HistoricalDataGenerator.generate_historical_logs(
+            days_back=job.params['days'],
+            interval_minutes=job.params['interval_minutes'],
+            progress=lambda percent, message: job.progress(percent * 0.8, message)
+        )
+        result = rebuild_rollups(job, start_percent=80)
+    return {'logs_created': logs, **result}
+
+def validate_export_params(params):
+    dataset = params.get('dataset')
+    fmt = params.get('format', 'csv')
+    if dataset not in DATASETS:
+        raise ValueError(f"dataset must be one of: {list(DATASETS)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of: {list(FORMATS)}")
+    
+    normalized = {'dataset': dataset, 'format': fmt, 'gzip': bool(params.get('gzip', False))}
+    for key in ('start', 'end'):
+        if params.get(key):
+            normalized[key] = datetime.fromisoformat(str(params[key])).isoformat()
+    for key in ('after_id', 'room_id', 'building_id', 'limit'):
+        if params.get(key) is not None:
+            normalized[key] = int(params[key])
+    return normalized
+
+def run_export_job(job):
+    """Job 'export': write a dataset export to instance/exports for download"""
+    params = dict(job.params)
+    dataset, fmt, compress = params.pop('dataset'), params.pop('format'), params.pop('gzip')
+    filters = {
+        key: datetime.fromisoformat(value) if key in ('start', 'end') else value
+        for key, value in params.items()
+    }
+    
+    job.progress(0, 'Counting rows')
+    total = count_export_rows(dataset, **filters)
+    exported = {'rows': 0, 'bytes': 0}
+    
+    def on_chunk(rows):
+        job.progress(100 * exported['rows'] / total if total else 0, f'Exporting {dataset}')
+        exported['rows'] += len(rows)
+    
+    os.makedirs(app.config['EXPORT_DIR'], exist_ok=True)
+    filename = f"job-{job.job_id}-{dataset}.{fmt}" + ('.gz' if compress else '')
+    path = os.path.join(app.config['EXPORT_DIR'], filename)
+    part_path = f"{path}.part"
+    try:
+        with open(part_path, 'wb') as out:
+            for block in stream_export(dataset, fmt, compress, on_chunk=on_chunk, **filters):
+                out.write(block)
+                exported['bytes'] += len(block)
+        os.replace(part_path, path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    
+    return {'file': filename, 'format': fmt, 'gzip': compress, **exported}
+
+job_queue.register('train', run_training_job, validate_training_params, unique=True)
+job_queue.register('generate_history', run_history_job, validate_history_params)
+job_queue.register('rebuild_rollups', run_rollup_job, unique=True)
+job_queue.register('export', run_export_job, validate_export_params)
+
+def start_leader_services():
+    """Leader-only work: the worker socket first (API processes can connect
+    while the first tick runs), then the job pool and the scheduler"""
+    worker_channel.serve(app.config['WORKER_SOCKET_PATH'])
+    job_queue.start(app)
+    start_simulation_scheduler()
+
+def elect_scheduler_leader():
+    """Run the scheduler only in the process holding the scheduler lock
+    
+    Other processes (extra workers, a second run.py, worker.py) take over
+    the scheduler automatically if the leader dies.
+    """
+    scheduler_leader.start(app.config['SCHEDULER_LOCK_PATH'], on_elected=start_leader_services)
+
+def on_worker_event(message):
+    if message.get('event') == 'tick':
+        live_broadcaster.publish_remote_tick(app, datetime.fromisoformat(message['tick_id']))
+
+def follow_remote_ticks():
+    """Publish ticks simulated by another process to this process's SSE clients
+    
+    The worker socket pushes each tick as it commits; polling the shared tick
+    id covers the gaps while the worker restarts.
+    """
+    worker_client.configure(app.config['WORKER_SOCKET_PATH'])
+    worker_client.subscribe(on_worker_event)
+    live_broadcaster.follow_ticks(app, lambda: scheduler_leader.is_leader)
+
+def start_api_process():
+    """Background services of a process that serves the API"""
+    if app.config['PROCESS_ROLE'] != 'api':
+        elect_scheduler_leader()
+    follow_remote_ticks()
+
 if __name__ == "__main__":
     print("⚡ VOLTONIC Backend Starting...\n")
     
-    # Initialize database
-    initialize_database()
+    # New ETag epoch for this deployment
+    data_version.start_epoch()
     
-    # Start IoT simulation
-    start_simulation_scheduler()
+    # Initialize database (worker.py owns seeding when the API runs alone)
+    if app.config['PROCESS_ROLE'] != 'api':
+        initialize_database()
+    
+    # Start IoT simulation (if no other process is already running it)
+    start_api_process()
     
     # Run Flask app
     print("\n🚀 Starting Flask server on http://127.0.0.1:5000\n")
@@ -61,6 +61,30 @@ def test_endpoint(name, method, endpoint, data=None, params=None):
         print(f" {name}: {str(e)}")
         return False
 
+def test_raw_endpoint(name, endpoint, params=None, content_type=None):
+    """Test a non-JSON endpoint (file download, event stream, metrics): status and first line"""
+    url = endpoint if endpoint.startswith('http') else f"{BASE_URL}{endpoint}"
+    
+    try:
+        with requests.get(url, params=params, stream=True, timeout=10) as response:
+            if response.status_code != 200:
+                print(f" {name}: HTTP {response.status_code}")
+                return False
+            if content_type and not response.headers.get('Content-Type', '').startswith(content_type):
+                print(f" {name}: Content-Type {response.headers.get('Content-Type')}")
+                return False
+            first_line = next(response.iter_lines(), b'')
+            print(f" {name}")
+            print(f"   First line: {first_line[:80]}")
+            return True
+            
+    except requests.exceptions.ConnectionError:
+        print(f"{name}: Connection failed (Is the server running?)")
+        return False
+    except Exception as e:
+        print(f" {name}: {str(e)}")
+        return False
+
 def run_all_tests():
     """Run comprehensive API tests"""
     print("\n" + "="*70)
@@ -241,6 +265,57 @@ def run_all_tests():
         "/stats/summary"
     ))
     
+    # ========================================================================
+    # SYNC, BUNDLE, JOBS, EXPORT, STREAM, METRICS
+    # ========================================================================
+    print_section("Sync, Bundle, Jobs, Export, Stream & Metrics")
+    
+    results.append(test_endpoint(
+        "Sync Cursor",
+        "GET",
+        "/sync"
+    ))
+    
+    results.append(test_endpoint(
+        "Sync Changes (ticks since 0)",
+        "GET",
+        "/sync",
+        params={'since': 0, 'kinds': 'tick', 'limit': 10}
+    ))
+    
+    results.append(test_endpoint(
+        "Dashboard Bundle",
+        "GET",
+        "/dashboard/bundle",
+        params={'panels': 'live,buildings,notifications'}
+    ))
+    
+    results.append(test_endpoint(
+        "Background Jobs",
+        "GET",
+        "/jobs",
+        params={'limit': 10}
+    ))
+    
+    results.append(test_raw_endpoint(
+        "Export Energy Log (CSV)",
+        "/export/energy_log",
+        params={'limit': 10},
+        content_type='text/csv'
+    ))
+    
+    results.append(test_raw_endpoint(
+        "Live Stream (SSE)",
+        "/stream/live",
+        content_type='text/event-stream'
+    ))
+    
+    results.append(test_raw_endpoint(
+        "Prometheus Metrics",
+        BASE_URL.rsplit('/api', 1)[0] + "/metrics",
+        content_type='text/plain'
+    ))
+    
     # ========================================================================
     # SUMMARY
     # ========================================================================
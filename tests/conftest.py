@@ -0,0 +1,39 @@
+"""
+Shared fixtures: one seeded campus with two simulated ticks per test session
+
+The app runs in-process (app.test_client()) on a temporary instance folder,
+so the database and the shared state files of a dev server are untouched.
+"""
+
+import os
+import pytest
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    instance_path = tmp_path_factory.mktemp('instance')
+    os.environ['VOLTONIC_INSTANCE_PATH'] = str(instance_path)
+    
+    from app import create_app
+    from app.utils.seed_data import seed_campus
+    from app.simulation.engine import IoTSimulator
+    
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        seed_campus()
+        IoTSimulator.simulate_all_rooms()
+        IoTSimulator.simulate_all_rooms()
+    yield app
+    os.environ.pop('VOLTONIC_INSTANCE_PATH', None)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
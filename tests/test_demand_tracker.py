@@ -0,0 +1,60 @@
+"""
+Demand tracker reads from processes that don't run the simulator tick
+"""
+
+import pytest
+import numpy as np
+from app.analytics.demand_tracker import DemandTracker, demand_tracker
+from app.utils.worker_ipc import WorkerChannel, worker_client
+
+
+@pytest.fixture
+def leader_socket(tmp_path):
+    """A leader channel answering for the tick process's tracker"""
+    channel = WorkerChannel()
+    channel.register('demand.top_wasters', demand_tracker.get_top_wasters)
+    channel.register('demand.peaks', demand_tracker.get_peaks)
+    path = str(tmp_path / 'worker.sock')
+    channel.serve(path)
+    worker_client.configure(path)
+    yield channel
+    worker_client.configure(None)
+    channel._server.close()
+
+
+def test_follower_reads_the_leader_state(app_context, leader_socket):
+    follower = DemandTracker()  # Never sees a tick
+    
+    assert demand_tracker.get_top_wasters(5)['wasters']
+    assert follower.live_top_wasters(5) == demand_tracker.get_top_wasters(5)
+    assert follower.live_peaks('day') == demand_tracker.get_peaks('day')
+    assert follower.day is None
+
+
+def test_follower_rebuilds_without_a_leader(app_context):
+    follower = DemandTracker()
+    
+    top = follower.live_top_wasters(5)
+    expected = demand_tracker.get_top_wasters(5)
+    assert top['day'] == expected['day']
+    # Same ranking: waste rounded as reported, ties broken by room id
+    assert [(w['wasted_kwh'], w['room_id']) for w in top['wasters']] == \
+        [(w['wasted_kwh'], w['room_id']) for w in expected['wasters']]
+    
+    peaks = follower.live_peaks('day')
+    expected = demand_tracker.get_peaks('day')
+    assert peaks['campus']['samples'] == expected['campus']['samples'] == 2
+    assert peaks['campus']['peak_kw'] == pytest.approx(expected['campus']['peak_kw'], abs=0.01)
+    assert len(peaks['buildings']) == len(expected['buildings'])
+
+
+def test_invalid_window(app_context):
+    with pytest.raises(ValueError):
+        DemandTracker().live_peaks('week')
+
+
+def test_ranking_breaks_ties_by_room_id():
+    tracker = DemandTracker()
+    tracker._add_waste(np.array([9, 4, 7, 2, 5]), np.array([1.0, 2.0, 1.0, 1.0 + 1e-12, 2.0]))
+    tracker._refresh_top()
+    assert [room_id for room_id, _ in tracker._top_wasters] == [4, 5, 2, 7, 9]
@@ -0,0 +1,103 @@
+"""
+Smoke tests for the bundle, export, jobs, live stream and metrics endpoints
+"""
+
+import gzip
+
+
+def test_dashboard_bundle(client):
+    response = client.get('/api/dashboard/bundle?panels=live,buildings')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert set(body['data']) == {'live', 'buildings'}
+    assert body['errors'] == {}
+    
+    # Unchanged data: conditional GET
+    etag = response.headers['ETag']
+    assert client.get('/api/dashboard/bundle?panels=live,buildings', headers={'If-None-Match': etag}).status_code == 304
+    
+    assert client.get('/api/dashboard/bundle?panels=nope').status_code == 400
+
+
+def test_live_savings_use_the_optimized_counter(client, app_context):
+    from app.models import EnergyLog
+    optimized = EnergyLog.query.filter(EnergyLog.optimized == True).count()
+    
+    bundle = client.get('/api/dashboard/bundle?panels=live').get_json()['data']['live']
+    assert bundle['optimization_savings']['total_optimizations'] == optimized
+    live = client.get('/api/dashboard/live').get_json()['data']
+    assert live['optimization_savings'] == bundle['optimization_savings']
+
+
+def test_export_csv_and_gzip(client):
+    response = client.get('/api/export/energy_log?limit=5')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    lines = response.get_data(as_text=True).strip().split('\n')
+    assert lines[0].startswith('id,timestamp,room_id')
+    assert len(lines) == 6
+    
+    response = client.get('/api/export/energy_log?limit=5&format=ndjson&gzip=1')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/gzip'
+    assert 'Content-Encoding' not in response.headers
+    assert len(gzip.decompress(response.get_data()).strip().split(b'\n')) == 5
+    
+    assert client.get('/api/export/nope').status_code == 404
+    assert client.get('/api/export/energy_log?format=xml').status_code == 400
+
+
+def test_jobs(client):
+    response = client.get('/api/jobs')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'success'
+    
+    assert client.get('/api/jobs?status=bogus').status_code == 400
+    assert client.get('/api/jobs/999999').status_code == 404
+    assert client.post('/api/jobs', json={}).status_code == 400
+    assert client.post('/api/jobs', json={'kind': 'bogus'}).status_code == 400
+
+
+def test_live_stream_starts_with_a_snapshot(client):
+    response = client.get('/api/stream/live', buffered=False)
+    try:
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        chunks = iter(response.response)
+        assert next(chunks).startswith(b'retry:')
+        snapshot = next(chunks).decode()
+        assert snapshot.startswith('id: ') and '\nevent: snapshot\n' in snapshot
+    finally:
+        response.close()
+
+
+def test_live_stream_subscriber_cap(client):
+    from app.utils.live_stream import live_broadcaster
+    cap = live_broadcaster.max_subscribers
+    live_broadcaster.configure(1)
+    try:
+        first = client.get('/api/stream/live', buffered=False)
+        assert first.status_code == 200
+        
+        refused = client.get('/api/stream/live', buffered=False)
+        assert refused.status_code == 503
+        assert refused.headers['Retry-After'] == '15'
+        
+        # Closing the stream frees its slot, even before it was read
+        first.close()
+        second = client.get('/api/stream/live', buffered=False)
+        assert second.status_code == 200
+        second.close()
+        assert live_broadcaster.subscribers == 0
+    finally:
+        live_broadcaster.configure(cap)
+
+
+def test_metrics(client):
+    client.get('/api/stats/summary')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert '# TYPE voltonic_http_requests_total counter' in text
+    assert 'voltonic_http_requests_total{method="GET",route="/api/stats/summary",status="200"}' in text
@@ -0,0 +1,33 @@
+"""
+Shared function cache tier across restarts
+"""
+
+from app.utils import shared_state
+from app.utils.data_version import data_version
+from app.utils.function_cache import FunctionCache
+
+
+def shared_cache(blobs):
+    cache = FunctionCache('test.shared', depends_on=('topology',), shared=True)
+    cache._blobs = blobs
+    return cache
+
+
+def test_shared_entry_serves_other_processes(app_context, tmp_path):
+    blobs = shared_state.SharedBlobs(str(tmp_path / 'cache.bin'), slots=4, slot_bytes=1024)
+    assert shared_cache(blobs).lookup('key', lambda: {'v': 1}) == ({'v': 1}, False)
+    
+    # Another process: empty local tier, same shared file
+    assert shared_cache(blobs).lookup('key', lambda: {'v': 2}) == ({'v': 1}, True)
+
+
+def test_shared_entry_from_a_previous_epoch_is_stale(app_context, tmp_path, monkeypatch):
+    blobs = shared_state.SharedBlobs(str(tmp_path / 'cache.bin'), slots=4, slot_bytes=1024)
+    shared_cache(blobs).lookup('key', lambda: {'v': 1})
+    
+    # Restart: the domain counters are unchanged, the epoch is new
+    monkeypatch.setattr(data_version, 'get_epoch', lambda: 'next-deployment')
+    assert shared_cache(blobs).lookup('key', lambda: {'v': 2}) == ({'v': 2}, False)
+    
+    data_version.bump('topology')
+    assert shared_cache(blobs).lookup('key', lambda: {'v': 3}) == ({'v': 3}, False)
@@ -0,0 +1,70 @@
+"""
+Job pool: final status writes and worker resilience
+"""
+
+from sqlalchemy.exc import OperationalError
+from app.models import db, Job
+from app.utils.jobs import JobQueue
+
+
+def make_queue(app, handler):
+    queue = JobQueue()
+    queue._app = app
+    queue.register('test', handler)
+    return queue
+
+
+def submit_and_claim(queue):
+    job, _ = queue.submit('test', {})
+    assert queue._claim() == job.id
+    return job.id
+
+
+def job_status(job_id):
+    return db.session.get(Job, job_id, populate_existing=True).status
+
+
+def test_final_status_is_retried_while_the_database_is_locked(app, app_context, monkeypatch):
+    queue = make_queue(app, lambda context: {'ok': True})
+    queue.FINISH_RETRIES = 3
+    job_id = submit_and_claim(queue)
+    
+    commit = db.session.commit
+    failures = {'left': 2}
+    
+    def locked_commit():
+        if failures['left']:
+            failures['left'] -= 1
+            raise OperationalError('COMMIT', {}, Exception('database is locked'))
+        commit()
+    
+    monkeypatch.setattr(db.session, 'commit', locked_commit)
+    queue._execute(job_id)
+    monkeypatch.undo()
+    
+    assert failures['left'] == 0
+    assert job_status(job_id) == 'succeeded'
+    assert queue.finished['succeeded'] == 1
+
+
+def test_failing_handler_marks_the_job_failed(app, app_context):
+    def handler(context):
+        raise RuntimeError('boom')
+    
+    queue = make_queue(app, handler)
+    job_id = submit_and_claim(queue)
+    queue._execute(job_id)
+    
+    job = db.session.get(Job, job_id, populate_existing=True)
+    assert job.status == 'failed' and job.error == 'boom'
+    assert queue.running == {}
+
+
+def test_vanished_job_is_skipped(app, app_context):
+    queue = make_queue(app, lambda context: None)
+    job_id = submit_and_claim(queue)
+    db.session.query(Job).filter(Job.id == job_id).delete()
+    db.session.commit()
+    
+    queue._execute(job_id)  # No exception: the worker thread keeps going
+    assert queue.running == {}
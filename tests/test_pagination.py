@@ -0,0 +1,126 @@
+"""
+Keyset pagination: forward/back paging across page boundaries, empty pages
+and malformed cursors (/api/campus/rooms ascending, /api/history/room descending)
+"""
+
+from app.utils.pagination import encode_cursor
+
+
+def get_page(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def rooms_page(client, limit, cursor=None, **filters):
+    params = '&'.join([f'limit={limit}'] + [f'{key}={value}' for key, value in filters.items()])
+    if cursor:
+        params += f'&cursor={cursor}'
+    body = get_page(client, f'/api/campus/rooms?{params}')
+    return [room['id'] for room in body['data']], body['pagination']
+
+
+def test_forward_paging_covers_every_room_once(client, app_context):
+    from app.models import Room
+    expected = [room_id for (room_id,) in Room.query.with_entities(Room.id).order_by(Room.id)]
+    
+    seen, cursor, pages = [], None, []
+    while True:
+        ids, pagination = rooms_page(client, 500, cursor)
+        pages.append(len(ids))
+        seen.extend(ids)
+        if not pagination['has_more']:
+            assert pagination['next_cursor'] is None
+            break
+        cursor = pagination['next_cursor']
+    
+    assert seen == expected
+    # The last page is the partial one
+    assert pages == [500] * (len(expected) // 500) + [len(expected) % 500]
+
+
+def test_first_page_has_no_prev_cursor(client):
+    ids, pagination = rooms_page(client, 100)
+    assert len(ids) == 100
+    assert pagination['has_more'] is True
+    assert pagination['prev_cursor'] is None
+    assert pagination['next_cursor'] is not None
+
+
+def test_back_paging_returns_the_same_pages(client):
+    page1, p1 = rooms_page(client, 100)
+    page2, p2 = rooms_page(client, 100, p1['next_cursor'])
+    page3, p3 = rooms_page(client, 100, p2['next_cursor'])
+    assert page1[-1] < page2[0] and page2[-1] < page3[0]
+    
+    back2, b2 = rooms_page(client, 100, p3['prev_cursor'])
+    assert back2 == page2
+    assert b2['has_more'] is True and b2['prev_cursor'] is not None
+    
+    back1, b1 = rooms_page(client, 100, b2['prev_cursor'])
+    assert back1 == page1
+    assert b1['prev_cursor'] is None  # Back at the start
+    
+    # And forward again from a page reached backwards
+    forward2, _ = rooms_page(client, 100, b1['next_cursor'])
+    assert forward2 == page2
+
+
+def test_back_paging_from_the_last_page(client, app_context):
+    from app.models import Room
+    total = Room.query.count()
+    
+    cursor, pages = None, []
+    while True:
+        ids, pagination = rooms_page(client, 400, cursor)
+        pages.append((ids, pagination))
+        if not pagination['has_more']:
+            break
+        cursor = pagination['next_cursor']
+    
+    last_ids, last = pages[-1]
+    assert len(last_ids) == total % 400
+    previous_ids, _ = rooms_page(client, 400, last['prev_cursor'])
+    assert previous_ids == pages[-2][0]
+
+
+def test_empty_pages(client, app_context):
+    from app.models import Room
+    
+    ids, pagination = rooms_page(client, 100, type='no_such_type')
+    assert ids == []
+    assert pagination == {'limit': 100, 'has_more': False, 'next_cursor': None, 'prev_cursor': None}
+    
+    # A cursor past the last row
+    max_id = Room.query.with_entities(Room.id).order_by(Room.id.desc()).first()[0]
+    ids, pagination = rooms_page(client, 100, encode_cursor('next', [max_id]))
+    assert ids == []
+    assert pagination['has_more'] is False
+    assert pagination['next_cursor'] is None
+
+
+def test_malformed_cursors_are_rejected(client):
+    for cursor in ('not-a-cursor', '%%%', encode_cursor('sideways', [1]), encode_cursor('next', [1, 2])):
+        response = client.get(f'/api/campus/rooms?limit=10&cursor={cursor}')
+        assert response.status_code == 400, cursor
+        assert response.get_json()['status'] == 'error'
+    
+    # Timestamp keys must decode as datetimes
+    response = client.get(f"/api/history/room/1?limit=1&cursor={encode_cursor('next', ['yesterday', 1])}")
+    assert response.status_code == 400
+
+
+def test_descending_history_paging(client):
+    # Two ticks: one reading per room per tick, newest first
+    body = get_page(client, '/api/history/room/1?limit=1')
+    newest, p1 = body['data'], body['pagination']
+    assert len(newest) == 1 and p1['has_more'] is True and p1['prev_cursor'] is None
+    
+    body = get_page(client, f"/api/history/room/1?limit=1&cursor={p1['next_cursor']}")
+    older, p2 = body['data'], body['pagination']
+    assert older[0]['timestamp'] < newest[0]['timestamp']
+    assert p2['has_more'] is False and p2['next_cursor'] is None
+    
+    body = get_page(client, f"/api/history/room/1?limit=1&cursor={p2['prev_cursor']}")
+    assert body['data'] == newest
+    assert body['pagination']['prev_cursor'] is None
@@ -0,0 +1,30 @@
+"""
+Per-endpoint SQL query caps (N+1 regressions fail here, not in production)
+
+Each request runs cold: bumping the tick, grid and model domains
+invalidates the ETag response cache and the @cached function results
+first. The topology snapshot is loaded beforehand (rebuilt only on edits).
+"""
+
+import pytest
+from app.analytics.topology import topology
+from app.utils.data_version import data_version
+from app.utils.sql_profiler import assert_max_queries
+
+# url -> max queries for a cold request
+QUERY_CAPS = {
+    '/api/analytics/building-comparison': 4,
+    '/api/buildings/1/energy-flow': 2,
+    '/api/autonomous/risky-schedules': 1,
+    '/api/autonomous/prediction-accuracy': 1,
+    '/api/prediction/room-occupancy': 2,
+}
+
+
+@pytest.mark.parametrize('url', list(QUERY_CAPS))
+def test_endpoint_query_cap(client, app_context, url):
+    topology.get()  # Loaded once per topology edit, not per request
+    data_version.bump('tick', 'grid', 'model')
+    with assert_max_queries(QUERY_CAPS[url], label=url):
+        response = client.get(url)
+    assert response.status_code == 200, response.get_json()
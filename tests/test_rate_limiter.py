@@ -0,0 +1,38 @@
+"""
+Shared rate limit table across reboots (CLOCK_MONOTONIC restarts at zero)
+"""
+
+import time
+from app.utils import shared_state
+from app.utils.rate_limiter import RateLimiter
+
+
+def test_table_resets_when_the_boot_changes(tmp_path):
+    path = str(tmp_path / 'ratelimit.bin')
+    table = shared_state.SharedTable(path, sets=16, clock_id=b'boot-1')
+    table.apply('client', lambda value: (12345, None))
+    
+    same_boot = shared_state.SharedTable(path, sets=16, clock_id=b'boot-1')
+    assert same_boot.apply('client', lambda value: (None, value)) == 12345
+    
+    next_boot = shared_state.SharedTable(path, sets=16, clock_id=b'boot-2')
+    assert next_boot.apply('client', lambda value: (None, value)) is None
+
+
+def test_tat_from_another_clock_is_capped(tmp_path):
+    limiter = RateLimiter()
+    limiter.attach_shared(str(tmp_path / 'ratelimit.bin'))
+    
+    # A bucket written ten days ahead of this clock (the previous boot's uptime)
+    future_us = int((time.monotonic() + 10 * 86400) * 1_000_000)
+    limiter._shared.apply('scope:client', lambda value: (future_us, None))
+    
+    limited, retry_after = limiter.is_rate_limited('scope:client', max_requests=10, window_seconds=60)
+    assert limited and retry_after <= 6  # One interval, not ten days
+
+
+def test_shared_budget(tmp_path):
+    limiter = RateLimiter()
+    limiter.attach_shared(str(tmp_path / 'ratelimit.bin'))
+    results = [limiter.is_rate_limited('scope:client', max_requests=3, window_seconds=60)[0] for _ in range(4)]
+    assert results == [False, False, False, True]
@@ -0,0 +1,77 @@
+"""
+Incremental sync (/api/sync): cursors, config edits and expired cursors
+"""
+
+from app.models import db, ChangeLog
+
+
+def current_cursor(client):
+    response = client.get('/api/sync')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['changes'] == [] and body['has_more'] is False
+    return int(body['cursor'])
+
+
+def test_sync_returns_room_edit(client):
+    cursor = current_cursor(client)
+    
+    response = client.put('/api/rooms/5', json={'name': 'Synced Room', 'capacity': 42})
+    assert response.status_code == 200
+    
+    body = client.get(f'/api/sync?since={cursor}').get_json()
+    assert body['status'] == 'success'
+    rooms = [change for change in body['changes'] if change['kind'] == 'room']
+    assert len(rooms) == 1
+    assert rooms[0]['op'] == 'update' and rooms[0]['id'] == 5
+    assert rooms[0]['data']['name'] == 'Synced Room'
+    assert int(body['cursor']) > cursor
+    
+    # Nothing new after the returned cursor
+    again = client.get(f"/api/sync?since={body['cursor']}").get_json()
+    assert again['changes'] == [] and again['cursor'] == body['cursor']
+
+
+def test_sync_pages_with_limit_and_kinds(client):
+    # The two simulated ticks, one page each
+    body = client.get('/api/sync?since=0&kinds=tick&limit=1').get_json()
+    assert body['count'] == 1 and body['has_more'] is True
+    assert body['changes'][0]['kind'] == 'tick'
+    
+    body = client.get(f"/api/sync?since={body['cursor']}&kinds=tick&limit=1").get_json()
+    assert body['count'] == 1 and body['has_more'] is False
+    
+    response = client.get('/api/sync?since=0&kinds=tick,weather')
+    assert response.status_code == 400
+
+
+def test_malformed_cursor(client):
+    response = client.get('/api/sync?since=abc')
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Invalid cursor'
+
+
+def test_cursor_ahead_of_the_log_is_expired(client):
+    cursor = current_cursor(client)
+    
+    response = client.get(f'/api/sync?since={cursor + 100}')
+    assert response.status_code == 410
+    assert int(response.get_json()['cursor']) == cursor
+
+
+def test_pruned_cursor_is_expired(client, app_context):
+    oldest = db.session.query(db.func.min(ChangeLog.seq)).scalar()
+    response = client.get(f'/api/sync?since={oldest}')
+    assert response.status_code == 200
+    
+    # Drop the oldest changes, as the retention prune in record_tick does
+    ChangeLog.query.filter(ChangeLog.seq <= oldest + 1).delete(synchronize_session=False)
+    db.session.commit()
+    
+    response = client.get(f'/api/sync?since={oldest}')
+    assert response.status_code == 410
+    body = response.get_json()
+    assert body['status'] == 'error'
+    
+    # The fresh cursor from the 410 is valid
+    assert client.get(f"/api/sync?since={body['cursor']}").status_code == 200
@@ -0,0 +1,37 @@
+"""
+Voltonic worker: simulation, rollups and ML training in their own process
+
+    python worker.py
+    VOLTONIC_ROLE=api gunicorn -c gunicorn.conf.py wsgi:app
+
+The worker seeds/backfills the database and joins the same scheduler
+election as the API processes (with VOLTONIC_ROLE=api they stay out of it),
+so exactly one scheduler runs even if a second worker is started. The
+leader serves instance/voltonic-worker.sock (API processes receive each
+tick there) and runs the job pool: training, backfills and exports queued
+through /api/jobs. Either side can be restarted on its own; API processes
+reconnect and keep serving reads, and queued jobs wait for the worker.
+"""
+
+import signal
+import threading
+from run import initialize_database, elect_scheduler_leader
+
+
+def main():
+    print("⚙️  VOLTONIC Worker Starting...\n")
+    
+    initialize_database()
+    
+    # Scheduler + worker socket once this process holds the scheduler lock
+    elect_scheduler_leader()
+    
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    stop.wait()
+    print("\n👋 VOLTONIC Worker stopped")
+
+
+if __name__ == '__main__':
+    main()
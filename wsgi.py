@@ -0,0 +1,37 @@
+"""
+WSGI entry point for the production launch mode
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn imports this module once in the master (preload_app): the app, the
+database check/seed and the ML model are loaded before forking, so workers
+start warm and share those pages copy-on-write. Each worker then runs
+on_worker_start() (gunicorn.conf.py post_fork): it joins the scheduler
+election - exactly one worker runs the simulation and training jobs, and
+another takes over if it dies - and follows ticks for its SSE clients.
+
+With VOLTONIC_ROLE=api the workers skip the election and the seed: a
+separate worker.py runs the jobs and pushes ticks over the worker socket.
+"""
+
+from run import app, initialize_database, start_api_process
+from app.models import db
+from app.api.routes import predictor
+from app.utils.data_version import data_version
+
+# New ETag epoch for this deployment (counters are shared by all workers)
+data_version.start_epoch()
+
+if app.config['PROCESS_ROLE'] != 'api':
+    initialize_database()
+
+with app.app_context():
+    predictor.load_model()
+
+
+def on_worker_start():
+    """Per-worker startup, called right after fork"""
+    with app.app_context():
+        # Never reuse SQLite connections opened by the master
+        db.engine.dispose(close=False)
+    start_api_process()